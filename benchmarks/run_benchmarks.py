@@ -0,0 +1,224 @@
+import argparse
+import io
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import redirect_stdout
+from datetime import datetime, timezone
+from benchmarks.synthetic_diagram import add_diagram_arguments, parse_relationships, write_synthetic_diagram
+from decode.convert_to_readable import DecodeAndDecompress
+from parsers.style_parser import StyleParser
+from parsers.syntax_parser import SyntaxParser
+from generators.java_generator import JavaCodeGenerator
+from version import __version__
+
+STAGES = ("decode", "convert_to_style_tree", "convert_to_sytax_tree", "generate_code", "generate_files")
+
+
+class _RenderOnlyJavaCodeGenerator(JavaCodeGenerator):
+    """
+    JavaCodeGenerator whose generate_code stops before writing, so that
+    rendering and writing can be timed as separate stages
+    """
+
+    def generate_files(self):
+        return True
+
+
+def run_scenario(scenario, repeat, work_dir):
+    """
+    Synthesize the diagram of a scenario and time every pipeline stage on it
+
+    Parameters:
+        scenario: keyword arguments of write_synthetic_diagram
+        repeat: number of timed runs of the whole pipeline
+        work_dir: directory for the diagram and the generated files
+
+    Returns:
+        result: dictionary containing scenario, counts and per stage timings
+    """
+
+    diagram_path = os.path.join(work_dir, "synthetic.drawio")
+    output_dir = os.path.join(work_dir, "code")
+    diagram_size = write_synthetic_diagram(diagram_path, **scenario)
+
+    timings = {stage: list() for stage in STAGES}
+    counts = dict()
+
+    for _ in range(repeat):
+        with redirect_stdout(io.StringIO()):
+            start = time.perf_counter()
+            decoded_xml = DecodeAndDecompress.convert(diagram_path)
+            timings['decode'].append(time.perf_counter() - start)
+
+            start = time.perf_counter()
+            style_tree = StyleParser(decoded_xml).convert_to_style_tree()
+            timings['convert_to_style_tree'].append(time.perf_counter() - start)
+
+            start = time.perf_counter()
+            syntax_tree = SyntaxParser(style_tree, models=True).convert_to_sytax_tree()
+            timings['convert_to_sytax_tree'].append(time.perf_counter() - start)
+
+            generator = _RenderOnlyJavaCodeGenerator(syntax_tree, output_dir)
+            start = time.perf_counter()
+            generated = generator.generate_code()
+            timings['generate_code'].append(time.perf_counter() - start)
+
+            start = time.perf_counter()
+            written = JavaCodeGenerator.generate_files(generator)
+            timings['generate_files'].append(time.perf_counter() - start)
+
+        if decoded_xml is False or style_tree is False or syntax_tree is None or not generated or not written:
+            raise RuntimeError(f"pipeline failed for scenario {scenario}")
+
+    counts['diagram_bytes'] = diagram_size
+    counts['xml_bytes'] = len(decoded_xml)
+    counts['cells'] = len(style_tree['root']['cells'])
+    counts['relationships'] = len(style_tree['root']['relationships'])
+    counts['classes'] = len(syntax_tree)
+    counts['members'] = sum(len(c['properties']) + len(c['methods']) for c in syntax_tree.values())
+    counts['files'] = len(generator.get_files())
+    counts['code_bytes'] = sum(len(contents) for _, contents in generator.get_files())
+
+    return {
+        'scenario': scenario,
+        'counts': counts,
+        'stages': {stage: _summarize(runs) for stage, runs in timings.items()}
+    }
+
+
+def _label(scenario):
+    return (
+        f"classes={scenario['classes']} members={scenario['members']} "
+        f"depth={scenario['depth']} format={scenario['cell_format']}"
+    )
+
+
+def _summarize(runs):
+    return {
+        'min': min(runs),
+        'median': statistics.median(runs),
+        'mean': statistics.mean(runs),
+        'runs': runs
+    }
+
+
+def _git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_benchmarks(scenarios, repeat=3):
+    """
+    Run every scenario and collect the results with the environment they ran in
+
+    Parameters:
+        scenarios: list of keyword arguments of write_synthetic_diagram
+        repeat: number of timed runs per scenario
+
+    Returns:
+        report: dictionary containing meta and results, ready to be dumped as JSON
+    """
+
+    results = list()
+    for scenario in scenarios:
+        with tempfile.TemporaryDirectory() as work_dir:
+            result = run_scenario(scenario, repeat, work_dir)
+
+        results.append(result)
+        medians = ", ".join(f"{stage} {result['stages'][stage]['median'] * 1000:.1f}ms" for stage in STAGES)
+        print(f"{_label(scenario)}: {medians}", file=sys.stderr)
+
+    return {
+        'meta': {
+            'version': __version__,
+            'commit': _git_commit(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'timestamp': datetime.now(timezone.utc).isoformat(),
+            'repeat': repeat
+        },
+        'results': results
+    }
+
+
+def compare_reports(baseline, current):
+    """
+    Compare the median of every stage between two reports
+
+    Parameters:
+        baseline: earlier report
+        current: new report
+
+    Returns:
+        lines: one line per scenario and stage with the ratio current / baseline
+    """
+
+    baseline_results = {json.dumps(r['scenario'], sort_keys=True): r for r in baseline['results']}
+    lines = list()
+    for result in current['results']:
+        key = json.dumps(result['scenario'], sort_keys=True)
+        if key not in baseline_results:
+            lines.append(f"{_label(result['scenario'])}: not in the baseline")
+            continue
+
+        for stage in STAGES:
+            before = baseline_results[key]['stages'][stage]['median']
+            after = result['stages'][stage]['median']
+            ratio = after / before if before else float("inf")
+            lines.append(f"{_label(result['scenario'])} {stage}: {before * 1000:.1f}ms -> {after * 1000:.1f}ms ({ratio:.2f}x)")
+
+    return lines
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Time every pipeline stage on synthetic draw.io diagrams")
+    parser.add_argument("--classes", type=int, nargs="+", default=[100, 1000], help="class counts to run (default: 100 1000)")
+    add_diagram_arguments(parser)
+    parser.add_argument("--repeat", type=int, default=3, help="timed runs per scenario (default: 3)")
+    parser.add_argument("-o", "--output", default=None, help="write the JSON report here instead of stdout")
+    parser.add_argument("--compare", default=None, help="JSON report of an earlier run to compare against")
+    args = parser.parse_args(argv)
+
+    scenarios = [
+        {
+            'classes': classes,
+            'members': args.members,
+            'depth': args.depth,
+            'cell_format': args.cell_format,
+            'relationships': list(parse_relationships(args.relationships)),
+            'interface_ratio': args.interface_ratio,
+            'seed': args.seed,
+            'compressed': not args.uncompressed,
+            'pages': args.pages
+        }
+        for classes in args.classes
+    ]
+
+    report = run_benchmarks(scenarios, args.repeat)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(json.dumps(report, indent=4))
+    else:
+        print(json.dumps(report, indent=4))
+
+    if args.compare:
+        with open(args.compare) as f:
+            for line in compare_reports(json.load(f), report):
+                print(line, file=sys.stderr)
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,252 @@
+import argparse
+import base64
+import random
+import zlib
+from urllib.parse import quote
+from xml.sax.saxutils import escape, quoteattr
+
+RELATIONSHIP_STYLES = {
+    'extends': "endArrow=block;endFill=0;html=1;",
+    'implements': "endArrow=block;endFill=0;dashed=1;html=1;",
+    'association': "endArrow=none;html=1;",
+    'aggregation': "endArrow=diamondThin;endFill=0;html=1;",
+    'composition': "endArrow=diamondThin;endFill=1;html=1;"
+}
+RELATIONSHIP_TYPES = tuple(RELATIONSHIP_STYLES)
+CELL_FORMATS = ("swimlane", "html", "mixed")
+
+SWIMLANE_STYLE = (
+    "swimlane;fontStyle={};align=center;verticalAlign=top;childLayout=stackLayout;horizontal=1;"
+    "startSize=26;horizontalStack=0;resizeParent=1;resizeLast=0;collapsible=1;marginBottom=0;"
+    "rounded=0;shadow=0;strokeWidth=1;"
+)
+HTML_STYLE = "verticalAlign=top;align=left;overflow=fill;fontSize=12;fontFamily=Helvetica;html=1;{}"
+ROW_STYLE = (
+    "text;align=left;verticalAlign=top;spacingLeft=4;spacingRight=4;overflow=hidden;rotatable=0;"
+    "points=[[0,0.5],[1,0.5]];portConstraint=eastwest;"
+)
+LINE_STYLE = (
+    "line;html=1;strokeWidth=1;align=left;verticalAlign=middle;spacingTop=-1;spacingLeft=3;"
+    "spacingRight=3;rotatable=0;labelPosition=right;points=[];portConstraint=eastwest;"
+)
+NESTED_STYLE = "text;html=1;strokeColor=none;fillColor=none;"
+
+
+def synthesize_diagram_xml(
+    classes=100, members=10, depth=1, cell_format="swimlane",
+    relationships=RELATIONSHIP_TYPES, interface_ratio=0.1, seed=0
+):
+    """
+    Build the XML of a synthetic UML class diagram
+
+    Parameters:
+        classes: number of classes
+        members: number of properties and of methods per class
+        depth: how deep below each class the relationship end points sit,
+            1 attaches the edges to the class cell itself
+        cell_format: 'swimlane', 'html' or 'mixed'
+        relationships: relationship types to draw, one edge per class and type
+        interface_ratio: fraction of the classes that are interfaces
+        seed: seed of the random generator, the same arguments give the same XML
+
+    Returns:
+        xml: the mxGraphModel XML of the diagram
+    """
+
+    if cell_format not in CELL_FORMATS:
+        raise ValueError(f"unknown cell format '{cell_format}', expected one of {CELL_FORMATS}")
+
+    rng = random.Random(seed)
+    interface_every = max(1, round(1 / interface_ratio)) if interface_ratio else 0
+
+    cells = ['<mxCell id="0"/>', '<mxCell id="1" parent="0"/>']
+    edges = list()
+    anchors = list()
+    interfaces = list()
+    concrete = list()
+
+    for i in range(classes):
+        is_interface = interface_every and i % interface_every == 0
+        is_html = cell_format == "html" or (cell_format == "mixed" and i % 2 == 1)
+        name = f"Interface{i}" if is_interface else f"Class{i}"
+
+        if is_html:
+            anchors.append(_html_class(cells, i, name, is_interface, members, depth))
+        else:
+            anchors.append(_swimlane_class(cells, i, name, is_interface, members, depth))
+
+        # only refer to earlier classes so inheritance never forms a cycle
+        for relationship in relationships:
+            if relationship == 'implements':
+                target = rng.choice(interfaces) if interfaces else None
+            elif relationship == 'extends':
+                target = rng.choice(concrete) if concrete and not is_interface else None
+            else:
+                target = rng.randrange(i) if i else None
+
+            if target is not None:
+                edges.append((relationship, i, target))
+
+        (interfaces if is_interface else concrete).append(i)
+
+    for number, (relationship, source, target) in enumerate(edges):
+        cells.append(
+            f'<mxCell id="e{number}" value="" style="{RELATIONSHIP_STYLES[relationship]}" parent="1" '
+            f'source="{anchors[source]}" target="{anchors[target]}" edge="1">'
+            '<mxGeometry relative="1" as="geometry"/></mxCell>'
+        )
+
+    return '<mxGraphModel dx="1000" dy="1000" grid="1" gridSize="10"><root>' + "".join(cells) + "</root></mxGraphModel>"
+
+
+def _cell(cells, cell_id, value, style, parent):
+    cells.append(
+        f'<mxCell id="{cell_id}" value={quoteattr(value)} style="{style}" parent="{parent}" vertex="1">'
+        '<mxGeometry width="160" height="26" as="geometry"/></mxCell>'
+    )
+
+
+def _is_abstract(i, is_interface):
+    # an italic (abstract) title would hide the <<interface>> marker
+    return not is_interface and i % 7 == 3
+
+
+def _nest(cells, cell_id, depth):
+    """
+    Nest depth - 2 empty cells below the separator line cell_id, which sits one
+    level below its class, and return the deepest one
+    """
+
+    for level in range(2, depth):
+        nested_id = f"{cell_id}-n{level}"
+        _cell(cells, nested_id, "", NESTED_STYLE, cell_id)
+        cell_id = nested_id
+
+    return cell_id
+
+
+def _swimlane_class(cells, i, name, is_interface, members, depth):
+    class_id = f"c{i}"
+    value = f"<<interface>>{name}" if is_interface else name
+    _cell(cells, class_id, value, SWIMLANE_STYLE.format(2 if _is_abstract(i, is_interface) else 0), "1")
+
+    if not is_interface:
+        for j in range(members):
+            _cell(cells, f"{class_id}-p{j}", f"-field{j}: int", ROW_STYLE, class_id)
+
+    line_id = f"{class_id}-line"
+    _cell(cells, line_id, "", LINE_STYLE, class_id)
+    for j in range(members):
+        _cell(cells, f"{class_id}-m{j}", f"+method{i}x{j}: void", ROW_STYLE, class_id)
+
+    return class_id if depth <= 1 else _nest(cells, line_id, depth)
+
+
+def _html_class(cells, i, name, is_interface, members, depth):
+    class_id = f"c{i}"
+    title = f"<i>{escape('<<interface>>')}</i><br><b>{name}</b>" if is_interface else f"<b>{name}</b>"
+    properties = "" if is_interface else "<br>".join(f"- field{j}: int" for j in range(members))
+    methods = "<br>".join(f"+ method{i}x{j}: void" for j in range(members))
+    value = (
+        f'<p style="margin:0px;margin-top:4px;text-align:center;">{title}</p><hr size="1"/>'
+        f'<p style="margin:0px;margin-left:4px;">{properties}</p><hr size="1"/>'
+        f'<p style="margin:0px;margin-left:4px;">{methods}</p>'
+    )
+    _cell(cells, class_id, value, HTML_STYLE.format("fontStyle=2;" if _is_abstract(i, is_interface) else ""), "1")
+
+    if depth <= 1:
+        return class_id
+
+    # rows below an html class are read as members, a separator line is not
+    line_id = f"{class_id}-line"
+    _cell(cells, line_id, "", LINE_STYLE, class_id)
+    return _nest(cells, line_id, depth)
+
+
+def encode_drawio(xml, compressed=True, pages=1):
+    """
+    Wrap the diagram XML in a .drawio mxfile
+
+    Parameters:
+        xml: the mxGraphModel XML
+        compressed: store the pages deflated, base64 and URL encoded like draw.io does
+        pages: number of copies of the page to store
+
+    Returns:
+        content: contents of the .drawio file
+    """
+
+    if compressed:
+        compressor = zlib.compressobj(9, zlib.DEFLATED, -15)
+        deflated = compressor.compress(quote(xml, safe="~()*!.'").encode("utf8")) + compressor.flush()
+        body = base64.b64encode(deflated).decode("ascii")
+    else:
+        body = xml
+
+    diagrams = "".join(
+        f'<diagram id="page-{page}" name="Page-{page + 1}">{body}</diagram>' for page in range(pages)
+    )
+    return f'<mxfile host="synthetic" type="device">{diagrams}</mxfile>'
+
+
+def write_synthetic_diagram(file_path, compressed=True, pages=1, **kwargs):
+    """
+    Synthesize a diagram and write it as a .drawio file
+
+    Parameters:
+        file_path: path of the .drawio file
+        compressed: store the pages compressed
+        pages: number of pages
+        kwargs: forwarded to synthesize_diagram_xml
+
+    Returns:
+        size: number of characters written
+    """
+
+    content = encode_drawio(synthesize_diagram_xml(**kwargs), compressed, pages)
+    with open(file_path, "w") as f:
+        f.write(content)
+
+    return len(content)
+
+
+def add_diagram_arguments(parser):
+    """
+    Add the synthetic diagram options to an argparse parser
+    """
+
+    parser.add_argument("--members", type=int, default=10, help="properties and methods per class (default: 10)")
+    parser.add_argument("--depth", type=int, default=1, help="nesting depth of the relationship end points (default: 1)")
+    parser.add_argument("--format", dest="cell_format", choices=CELL_FORMATS, default="swimlane", help="class cell format (default: swimlane)")
+    parser.add_argument(
+        "--relationships", default=",".join(RELATIONSHIP_TYPES),
+        help=f"comma separated relationship types (default: {','.join(RELATIONSHIP_TYPES)})"
+    )
+    parser.add_argument("--interface-ratio", type=float, default=0.1, help="fraction of interfaces (default: 0.1)")
+    parser.add_argument("--seed", type=int, default=0, help="random seed (default: 0)")
+    parser.add_argument("--uncompressed", action="store_true", help="store the pages as plain XML")
+    parser.add_argument("--pages", type=int, default=1, help="number of pages (default: 1)")
+
+
+def parse_relationships(text):
+    relationships = tuple(r for r in text.split(",") if r)
+    for r in relationships:
+        if r not in RELATIONSHIP_STYLES:
+            raise ValueError(f"unknown relationship type '{r}', expected some of {RELATIONSHIP_TYPES}")
+
+    return relationships
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Write a synthetic draw.io UML class diagram")
+    parser.add_argument("output", help="path of the .drawio file")
+    parser.add_argument("--classes", type=int, default=100, help="number of classes (default: 100)")
+    add_diagram_arguments(parser)
+    args = parser.parse_args()
+
+    size = write_synthetic_diagram(
+        args.output, compressed=not args.uncompressed, pages=args.pages,
+        classes=args.classes, members=args.members, depth=args.depth, cell_format=args.cell_format,
+        relationships=parse_relationships(args.relationships), interface_ratio=args.interface_ratio, seed=args.seed
+    )
+    print(f"wrote {args.output} ({size} bytes)")
@@ -1,42 +1,403 @@
 from urllib.parse import unquote
+import io
+import os
+import re
+import struct
 import zlib
-from bs4 import BeautifulSoup as bs
+from lxml import etree
+from profiling.instrumentation import NULL_INSTRUMENTATION
 import base64
+import binascii
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+PNG_KEYWORDS = (b"mxfile", b"mxGraphModel")
+SVG_TAG = "{http://www.w3.org/2000/svg}svg"
+CONTAINER_TAGS = ("mxfile", "diagram", "mxGraphModel", SVG_TAG, "svg")
+SNIFF_SIZE = 4096
+XML_ROOT = re.compile(rb"\s*(<\?xml[^>]*\?>)?\s*<(mxfile|mxGraphModel)\b")
+UTF8_DECLARATION = re.compile(rb"encoding=[\"']utf-?8[\"']", re.IGNORECASE)
+# quoted attribute values may hold a '>', e.g. name="A -> B"
+DIAGRAM_TAG = re.compile(rb"<diagram\b(?:[^>\"']|\"[^\"]*\"|'[^']*')*?(/?)>")
+# a '%' that does not start a %XX escape
+INVALID_ESCAPE = re.compile(rb"%(?![0-9A-Fa-f]{2})")
 
 class DecodeAndDecompress:
+
+  # size of the compressed slices fed to the decompressor and of the largest
+  # block it is allowed to produce in one step
+  CHUNK_SIZE = 64 * 1024
   
   @staticmethod
-  def convert(drawio_filepath):
+  def convert(drawio_filepath, max_decompressed_size=None, instrumentation=NULL_INSTRUMENTATION):
     """
     References:
       https://drawio-app.com/extracting-the-xml-from-mxfiles/
       https://github.com/pzl/drawio-read/blob/master/read.py
 
-    Convert the DrawIO file to raw XML
+    Convert the first page of the DrawIO file to raw XML
 
     Paramters:
-      drawio_filepath: file path to the .drawio file
+      drawio_filepath: file path to the .drawio file, its bytes or a binary file object
+      max_decompressed_size: optional cap, in bytes, on the inflated page
+      instrumentation: optional Instrumentation recording the decode stage
     
     Returns:
       decoded_xml: decode and decompressed xml
     """
 
     try:
-      with open(drawio_filepath, "r") as f:
-        content = f.readlines()
-        content = "".join(content)
-    
-      drawio_file_raw = bs(content, "lxml")
-      diagram_tag = drawio_file_raw.find("diagram")
-      diagram_tag_text = base64.b64decode(diagram_tag.text)
-
-      decoded_xml = unquote(zlib.decompress(diagram_tag_text,-15).decode('utf8'))
+      for diagram in DecodeAndDecompress.iter_diagrams(drawio_filepath, max_decompressed_size, instrumentation):
+        return diagram['xml']
 
-      return decoded_xml
+      raise ValueError(f"no <diagram> element found in {drawio_filepath}")
       
     except Exception as e:
       print(f"DecodeAndDecompress.convert ERROR: {e}")
       return False
+
+  @staticmethod
+  def iter_diagrams(drawio_filepath, max_decompressed_size=None, instrumentation=NULL_INSTRUMENTATION):
+    """
+    Decode every page of the DrawIO file, one page at a time
+
+    Paramters:
+      drawio_filepath: file path to the .drawio file, its bytes or a binary file object
+      max_decompressed_size: optional cap, in bytes, on each inflated page
+      instrumentation: optional Instrumentation recording a decode stage per page
+
+    Returns:
+      generator: yields a dictionary containing id, name, payload, xml per <diagram>
+    """
+
+    for diagram in DecodeAndDecompress.iter_payloads(drawio_filepath):
+      with instrumentation.stage("decode") as record:
+        diagram['xml'] = DecodeAndDecompress.decode_payload(diagram['payload'], max_decompressed_size)
+        record.count('pages', 1)
+        record.count('payload_bytes', len(diagram['payload']))
+        record.count('xml_bytes', len(diagram['xml']))
+
+      yield diagram
+
+  @staticmethod
+  def iter_payloads(drawio_filepath):
+    """
+    Incrementally parse the diagram file and yield the raw content of each
+    page, releasing every page once it has been consumed. The container is
+    sniffed: a .drawio mxfile, a bare <mxGraphModel> (plain .xml export), a
+    .drawio.svg (mxfile in the content attribute of the <svg>) or a
+    .drawio.png (mxfile in a tEXt/zTXt/iTXt chunk)
+
+    Paramters:
+      drawio_filepath: file path to the diagram file, or its raw contents
+        as bytes, or a binary file object
+
+    Returns:
+      generator: yields a dictionary containing id, name, payload per page;
+        the payload is the compressed text of the <diagram> or, for
+        uncompressed pages, the <mxGraphModel> XML itself
+    """
+
+    # the file opened here, closed however the stream below is replaced
+    opened = None
+    if isinstance(drawio_filepath, (bytes, bytearray, memoryview)):
+      stream = io.BytesIO(drawio_filepath)
+    elif isinstance(drawio_filepath, (str, os.PathLike)):
+      stream = opened = open(drawio_filepath, "rb")
+    else:
+      stream = drawio_filepath
+
+    try:
+      header = DecodeAndDecompress._peek(stream, SNIFF_SIZE)
+      if header.startswith(PNG_SIGNATURE):
+        stream = io.BytesIO(DecodeAndDecompress._read_png_mxfile(stream))
+        header = DecodeAndDecompress._peek(stream, SNIFF_SIZE)
+
+      if b"<mxGraphModel" in header:
+        # uncompressed pages: cut them out of the raw text instead of building
+        # and serializing a tree of the whole file
+        data = stream.read()
+        pages = DecodeAndDecompress._slice_pages(data)
+        if pages is not None:
+          yield from pages
+          return
+        stream = io.BytesIO(data)
+
+      yield from DecodeAndDecompress._iter_pages(stream)
+    finally:
+      if stream is not drawio_filepath:
+        stream.close()
+      if opened is not None:
+        opened.close()
+
+  @staticmethod
+  def _peek(stream, size):
+    """
+    Read the first bytes of a stream without consuming them
+
+    Paramters:
+      stream: binary file object, rewound if it is seekable and buffered otherwise
+      size: number of bytes
+
+    Returns:
+      header: up to size bytes
+    """
+
+    if hasattr(stream, "peek"):
+      return stream.peek(size)[:size]
+
+    if stream.seekable():
+      position = stream.tell()
+      header = stream.read(size)
+      stream.seek(position)
+      return header
+
+    raise ValueError("the diagram stream can neither be peeked nor rewound")
+
+  @staticmethod
+  def _iter_pages(stream):
+    """
+    Yield the pages of an mxfile, a bare mxGraphModel or a .drawio.svg
+
+    Paramters:
+      stream: binary file object holding the XML
+
+    Returns:
+      generator: yields a dictionary containing id, name, payload per page
+    """
+
+    context = etree.iterparse(stream, events=("start", "end"), tag=CONTAINER_TAGS, huge_tree=True)
+    root = None
+
+    for event, element in context:
+      if root is None:
+        if element.getparent() is not None:
+          raise ValueError(f"not a draw.io diagram, unexpected root element around <{element.tag}>")
+        root = element.tag
+
+        if root == SVG_TAG:
+          content = element.get("content")
+          if not content:
+            raise ValueError("the SVG does not embed a draw.io diagram")
+          yield from DecodeAndDecompress._iter_pages(io.BytesIO(content.encode("utf8")))
+          return
+
+      if event != "end":
+        continue
+
+      if element.tag == "diagram":
+        model = element.find("mxGraphModel")
+        if model is not None:
+          # uncompressed page, hand over the model as it is
+          payload = etree.tostring(model, encoding="unicode")
+        else:
+          payload = element.text or ""
+
+        diagram = {
+          'id': element.get('id'),
+          'name': element.get('name'),
+          'payload': payload
+        }
+
+        # drop the page and any already processed siblings before moving on 
+        element.clear()
+        while element.getprevious() is not None:
+          del element.getparent()[0]
+
+        yield diagram
+      elif element.tag == "mxGraphModel" and element.getparent() is None:
+        # plain XML export, the whole file is the only page
+        yield {
+          'id': None,
+          'name': None,
+          'payload': etree.tostring(element, encoding="unicode")
+        }
+
+  @staticmethod
+  def _slice_pages(data):
+    """
+    Split the raw text of an mxfile, or a bare mxGraphModel, into pages
+    without parsing the models
+
+    Paramters:
+      data: UTF-8 bytes of the file
+
+    Returns:
+      pages: list of dictionaries containing id, name, payload, None when
+        the file needs a real XML parser (comments, CDATA, other encodings)
+    """
+
+    root = XML_ROOT.match(data)
+    if root is None or b"<!--" in data or b"<![CDATA[" in data:
+      return None
+    if root.group(1) and b"encoding" in root.group(1) and not UTF8_DECLARATION.search(root.group(1)):
+      return None
+
+    if root.group(2) == b"mxGraphModel":
+      return [{'id': None, 'name': None, 'payload': data[root.start(2) - 1:].rstrip().decode("utf8")}]
+
+    pages = list()
+    for tag in DIAGRAM_TAG.finditer(data, root.end()):
+      if tag.group(1):
+        body = b""
+      else:
+        end = data.find(b"</diagram>", tag.end())
+        if end < 0:
+          return None
+        body = data[tag.end():end]
+
+      if b"&" in body and body.lstrip()[:1] != b"<":
+        return None  # escaped text payload, leave it to the parser
+
+      try:
+        attributes = etree.fromstring(tag.group(0)[:-1].rstrip(b"/") + b"/>")
+      except etree.XMLSyntaxError:
+        return None
+      pages.append({
+        'id': attributes.get('id'),
+        'name': attributes.get('name'),
+        'payload': (body.strip() if body.lstrip()[:1] == b"<" else body).decode("utf8")
+      })
+
+    return pages
+
+  @staticmethod
+  def _read_png_mxfile(stream):
+    """
+    Extract the mxfile draw.io embeds in a text chunk of a .drawio.png
+
+    Paramters:
+      stream: binary file object positioned at the PNG signature
+
+    Returns:
+      mxfile: the mxfile XML as bytes
+    """
+
+    stream.read(len(PNG_SIGNATURE))
+
+    while True:
+      head = stream.read(8)
+      if len(head) < 8:
+        break
+
+      length, chunk_type = struct.unpack(">I4s", head)
+      data = stream.read(length)
+      stream.read(4)  # crc
+
+      if chunk_type == b"IEND":
+        break
+      if chunk_type not in (b"tEXt", b"zTXt", b"iTXt"):
+        continue
+
+      keyword, _, rest = data.partition(b"\0")
+      if keyword not in PNG_KEYWORDS:
+        continue
+
+      if chunk_type == b"tEXt":
+        text = rest.decode("latin-1")
+      elif chunk_type == b"zTXt":
+        text = zlib.decompress(rest[1:]).decode("latin-1")
+      else:
+        compressed, rest = rest[0], rest[2:]
+        _, _, rest = rest.partition(b"\0")  # language
+        _, _, rest = rest.partition(b"\0")  # translated keyword
+        text = (zlib.decompress(rest) if compressed else rest).decode("utf8")
+
+      if text[:3].upper() == "%3C":
+        text = unquote(text)
+      return text.encode("utf8")
+
+    raise ValueError("the PNG does not embed a draw.io diagram")
+
+  @staticmethod
+  def decode_payload(payload, max_decompressed_size=None):
+    """
+    Decode the content of a page, sniffing its format: XML is returned as it
+    is, URL encoded XML is only unquoted and anything else is taken as base64,
+    raw deflate and URL encoded (the compressed draw.io format)
+
+    Paramters:
+      payload: page payload as yielded by iter_payloads
+      max_decompressed_size: optional cap, in bytes, on the inflated data
+
+    Returns:
+      decoded_xml: decode and decompressed xml
+    """
+
+    text = payload.lstrip()
+    if text[:1] == "<" or text[:3].upper() == "%3C":
+      if max_decompressed_size is not None and len(text) > max_decompressed_size:
+        raise ValueError(f"decompressed diagram exceeds {max_decompressed_size} bytes")
+      return text if text[:1] == "<" else DecodeAndDecompress._unquote(text.encode("utf8"))
+
+    compressed = base64.b64decode(payload)
+    inflated = b"".join(DecodeAndDecompress._inflate(compressed, max_decompressed_size))
+
+    if inflated.lstrip()[:1] == b"<":
+      # deflated but not URL encoded
+      return inflated.decode('utf8')
+
+    return DecodeAndDecompress._unquote(inflated)
+
+  @staticmethod
+  def _unquote(data):
+    """
+    URL decode UTF-8 bytes. binascii's quoted-printable decoder does the work
+    in C when every '%' starts a valid escape (turning '%XX' into '=XX' after
+    escaping the literal '='), which is many times faster than
+    urllib.parse.unquote; anything else goes through unquote
+
+    Paramters:
+      data: URL encoded bytes
+
+    Returns:
+      text: the decoded text
+    """
+
+    if INVALID_ESCAPE.search(data) is None:
+      try:
+        return binascii.a2b_qp(data.replace(b"=", b"=3D").replace(b"%", b"=")).decode("utf8")
+      except UnicodeDecodeError:
+        pass
+
+    return unquote(data.decode('utf8'))
+
+  @staticmethod
+  def _inflate(compressed, max_decompressed_size=None):
+    """
+    Incrementally inflate raw deflate data, never producing more than
+    CHUNK_SIZE bytes per step so that the size cap is enforced early
+
+    Paramters:
+      compressed: raw deflate bytes
+      max_decompressed_size: optional cap, in bytes, on the inflated data
+
+    Returns:
+      generator: yields the inflated data in blocks
+    """
+
+    chunk_size = DecodeAndDecompress.CHUNK_SIZE
+    decompressor = zlib.decompressobj(-15)
+    total = 0
+
+    for start in range(0, len(compressed), chunk_size):
+      data = compressed[start:start + chunk_size]
+
+      while data and not decompressor.eof:
+        block = decompressor.decompress(data, chunk_size)
+        data = decompressor.unconsumed_tail
+        total += len(block)
+
+        if max_decompressed_size is not None and total > max_decompressed_size:
+          raise ValueError(f"decompressed diagram exceeds {max_decompressed_size} bytes")
+
+        yield block
+
+    block = decompressor.flush()
+    total += len(block)
+    if max_decompressed_size is not None and total > max_decompressed_size:
+      raise ValueError(f"decompressed diagram exceeds {max_decompressed_size} bytes")
+
+    yield block
     
   @staticmethod
   def write_xml_file(xml_file_name, decoded_xml):
@@ -58,4 +419,4 @@ class DecodeAndDecompress:
       return True
     except Exception as e:
       print(f"DecodeAndDecompress.write_xml_file ERROR: {e}")
-      return False
\ No newline at end of file
+      return False
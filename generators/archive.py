@@ -0,0 +1,142 @@
+import bz2
+import gzip
+import io
+import lzma
+import os
+import tarfile
+import tempfile
+import zipfile
+
+ARCHIVE_FORMATS = ("zip", "tar", "tar.gz", "tar.bz2", "tar.xz")
+
+# every entry gets the same timestamp and permissions so that the same
+# sources always give a byte identical archive; 1980-01-01 is the earliest
+# time a zip file can store
+FIXED_DATE_TIME = (1980, 1, 1, 0, 0, 0)
+FIXED_MTIME = 315532800
+FILE_MODE = 0o644
+
+
+class ArchiveWriter:
+    """
+    Stream files into a single zip or tar archive with fixed metadata.
+    The archive is written to a temporary file next to file_path and only
+    renamed into place by close(), so readers never see a partial archive.
+
+    Parameters:
+        file_path: path of the archive
+        archive_format: one of ARCHIVE_FORMATS, 'zip' is deflate compressed,
+            'tar' is uncompressed and the tar.* formats are compressed
+        mode: permission bits of the archive file
+    """
+
+    def __init__(self, file_path, archive_format, mode=0o644):
+        if archive_format not in ARCHIVE_FORMATS:
+            raise ValueError(f"unknown archive format '{archive_format}', expected one of {ARCHIVE_FORMATS}")
+
+        self.file_path = file_path
+        self.archive_format = archive_format
+        self.mode = mode
+        self.entries = 0
+        self.__streams = list()
+
+        directory = os.path.dirname(file_path) or "."
+        fd, self.__temp_path = tempfile.mkstemp(
+            prefix=f".{os.path.basename(file_path)}.", suffix=".tmp", dir=directory
+        )
+        raw = os.fdopen(fd, "wb")
+        self.__streams.append(raw)
+
+        if archive_format == "zip":
+            self.__archive = zipfile.ZipFile(raw, "w", zipfile.ZIP_DEFLATED)
+        else:
+            compression = archive_format[4:]
+            if compression == "gz":
+                # an empty name and a zero mtime keep the gzip header reproducible
+                stream = gzip.GzipFile(filename="", mode="wb", fileobj=raw, mtime=0)
+            elif compression == "bz2":
+                stream = bz2.BZ2File(raw, "wb")
+            elif compression == "xz":
+                stream = lzma.LZMAFile(raw, "wb")
+            else:
+                stream = raw
+            if stream is not raw:
+                self.__streams.append(stream)
+            self.__archive = tarfile.open(fileobj=stream, mode="w", format=tarfile.GNU_FORMAT)
+
+    def add(self, name, contents):
+        """
+        Add a file to the archive
+
+        Parameters:
+            name: name of the file inside the archive
+            contents: contents of the file, str (written as UTF-8) or bytes
+        """
+
+        data = contents.encode("utf8") if isinstance(contents, str) else contents
+
+        if self.archive_format == "zip":
+            info = zipfile.ZipInfo(name, date_time=FIXED_DATE_TIME)
+            info.compress_type = zipfile.ZIP_DEFLATED
+            info.create_system = 3  # unix, so the permissions below are honoured
+            info.external_attr = (0o100000 | FILE_MODE) << 16
+            self.__archive.writestr(info, data)
+        else:
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            info.mtime = FIXED_MTIME
+            info.mode = FILE_MODE
+            info.uid = info.gid = 0
+            info.uname = info.gname = ""
+            self.__archive.addfile(info, io.BytesIO(data))
+
+        self.entries += 1
+
+    def close(self, keep_unchanged=False):
+        """
+        Finish the archive and move it into place
+
+        Parameters:
+            keep_unchanged: leave an existing archive with identical contents untouched
+
+        Returns:
+            bytes_written: size of the archive, None if it was unchanged
+        """
+
+        self.__archive.close()
+        for stream in reversed(self.__streams):
+            stream.close()
+
+        size = os.path.getsize(self.__temp_path)
+        if keep_unchanged and _same_contents(self.__temp_path, self.file_path, size):
+            os.remove(self.__temp_path)
+            return None
+
+        os.chmod(self.__temp_path, self.mode)
+        os.replace(self.__temp_path, self.file_path)
+        return size
+
+    def abort(self):
+        """
+        Drop the partially written archive
+        """
+
+        for stream in reversed(self.__streams):
+            try:
+                stream.close()
+            except Exception:
+                pass
+        try:
+            os.remove(self.__temp_path)
+        except OSError:
+            pass
+
+
+def _same_contents(new_path, old_path, size):
+    try:
+        if os.path.getsize(old_path) != size:
+            return False
+        with open(new_path, "rb") as new, open(old_path, "rb") as old:
+            return new.read() == old.read()
+    except OSError:
+        return False
@@ -0,0 +1,98 @@
+import hashlib
+import json
+import os
+import tempfile
+from version import OUTPUT_STAMP
+
+# written into the output directory, next to the generated files
+MANIFEST_NAME = ".java_code_generator.json"
+
+
+def fingerprint(data):
+    """
+    Hash the representation of data. The generator passes the fields of the
+    Class, Property and Method models and the names their Relationships refer
+    to as lists, tuples and strings, whose order is fixed by the parser
+
+    Parameters:
+        data: nested lists, tuples and strings
+
+    Returns:
+        fingerprint: hex digest
+    """
+
+    return hashlib.sha256(repr(data).encode("utf8")).hexdigest()
+
+
+def load_manifest(directory):
+    """
+    Load the fingerprint manifest of an output directory
+
+    Parameters:
+        directory: the output directory
+
+    Returns:
+        manifest: dictionary containing version (the output stamp, see version.py) and files, None if there is no readable manifest
+    """
+
+    try:
+        with open(os.path.join(directory, MANIFEST_NAME), "r", encoding="utf8") as f:
+            manifest = json.load(f)
+        if not isinstance(manifest, dict) or not isinstance(manifest.get('files'), dict):
+            raise ValueError("unexpected layout")
+        return manifest
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        print(f"load_manifest: ignoring unreadable manifest in {directory} ({e})")
+        return None
+
+
+def write_manifest(directory, files):
+    """
+    Atomically write the fingerprint manifest of an output directory
+
+    Parameters:
+        directory: the output directory
+        files: dictionary of file name to its entry (own, inherited, size, mtime_ns, sha256)
+    """
+
+    fd, temp_path = tempfile.mkstemp(prefix=f"{MANIFEST_NAME}.", suffix=".tmp", dir=directory)
+    try:
+        with os.fdopen(fd, "w", encoding="utf8") as f:
+            json.dump({'version': OUTPUT_STAMP, 'files': files}, f, separators=(",", ":"))
+        os.replace(temp_path, os.path.join(directory, MANIFEST_NAME))
+    except BaseException:
+        os.remove(temp_path)
+        raise
+
+
+def change_reason(previous, own, inherited, path):
+    """
+    Tell why a file has to be generated again
+
+    Parameters:
+        previous: manifest entry of the last run, None if the file was not generated then
+        own: fingerprint of the class itself
+        inherited: fingerprint of what the class takes from its parents and interfaces
+        path: path of the generated file
+
+    Returns:
+        reason: string, None if the file on disk is still up to date
+    """
+
+    if previous is None:
+        return "new class"
+    if previous.get('own') != own:
+        return "class changed"
+    if previous.get('inherited') != inherited:
+        return "parents or interfaces changed"
+
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return "file missing"
+    if stat.st_size != previous.get('size') or stat.st_mtime_ns != previous.get('mtime_ns'):
+        return "file modified on disk"
+
+    return None
@@ -1,59 +1,316 @@
+import hashlib
+import os
 import re
+import tempfile
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from generators.archive import ARCHIVE_FORMATS, ArchiveWriter
 from generators.code_generator import CodeGeneratorInterface
+from generators.fingerprints import change_reason, fingerprint, load_manifest, write_manifest
+from parsers.models import Method, Property, as_models
+from parsers.relationship_graph import RelationshipGraph
+from profiling.instrumentation import NULL_INSTRUMENTATION
+from version import OUTPUT_STAMP
+
+# precompiled templates for every snippet of a generated file
+PROPERTY_TEMPLATE = "\t{} {} {};\n".format
+METHOD_TEMPLATE = "\t{} {} {}() {{}}\n".format
+GETTER_TEMPLATE = "\tpublic {0} get{1}() {{\n \t\treturn this.{2}; \n\t}}\n".format
+SETTER_TEMPLATE = "\tpublic void set{1}({0} {2}) {{\n \t\tthis.{2} = {2}; \n\t}}\n".format
+INTERFACE_STUB_TEMPLATE = "\t {} {} {}() {{\n \t\t// ***requires implementation*** \n\t}}\n".format
+MULTIPLE_SPACES = re.compile(' +')
+
+# generator rendering the jobs of a worker process, set once per worker by _init_render_worker
+_renderer = None
 
 class JavaCodeGenerator(CodeGeneratorInterface):
     """
     Generate Java code
 
     Parameters:
-        syntax_tree: syntax_tree of the drawio file 
-        file_path: path for the code files to be written to 
+        syntax_tree: syntax_tree of the drawio file, of models or in its dictionary form
+            (converted to models once, see parsers/models.py)
+        file_path: path for the code files to be written to, None to only
+            generate them in memory (see get_sources)
+        write_if_changed: only rewrite files whose contents changed, atomically and in parallel
+        write_workers: number of threads writing the changed files
+        archive_format: write every file into the single archive f"{file_path}.{archive_format}"
+            instead of the directory file_path, one of ARCHIVE_FORMATS
+        streaming: render each class and hand it to its sink (the directory, the
+            archive or sink) right away instead of keeping every file until the end
+        sink: optional callable taking (file_name, contents) that receives the files
+            instead of file_path when streaming
+        collect: keep the rendered headers, properties and methods (and, when
+            streaming, the files) for the getters, defaults to not streaming
+        incremental: only render and write the classes whose fingerprint changed since the
+            last run into file_path, see generate_incremental
+        render_workers: number of worker processes rendering the classes, see generate_parallel;
+            1 renders them one after another
+        relationship_graph: optional RelationshipGraph of the syntax tree, built on first use when not given
+        instrumentation: optional Instrumentation recording the stages
     """
 
-    def __init__(self, syntax_tree, file_path):
-        self.__syntax_tree = syntax_tree
-        self.file_path = file_path.strip('/')
+    FILE_EXTENSION = ".java"
+
+    def __init__(self, syntax_tree, file_path, write_if_changed=False, write_workers=4,
+                 archive_format=None, streaming=False, sink=None, collect=None, incremental=False,
+                 render_workers=1, relationship_graph=None, instrumentation=NULL_INSTRUMENTATION):
+        if archive_format is not None and archive_format not in ARCHIVE_FORMATS:
+            raise ValueError(f"unknown archive format '{archive_format}', expected one of {ARCHIVE_FORMATS}")
+        if incremental and (file_path is None or archive_format is not None or sink is not None):
+            raise ValueError("incremental generation needs an output directory")
+        if render_workers > 1 and (streaming or incremental):
+            raise ValueError("parallel rendering cannot be combined with streaming or incremental generation")
+
+        self.__syntax_tree = as_models(syntax_tree)
+        self.file_path = file_path.rstrip('/') if file_path is not None else None
+        self.write_if_changed = write_if_changed
+        self.write_workers = write_workers
+        self.archive_format = archive_format
+        self.streaming = streaming
+        self.sink = sink
+        self.collect = not streaming if collect is None else collect
+        self.incremental = incremental
+        self.render_workers = render_workers
+        self.instrumentation = instrumentation
+        self.__written_files = list()
+        self.__unchanged_files = list()
+        self.__bytes_written = 0
         self.__classes = list()
         self.__properties = list()
         self.__methods = list()
         self.__files = list()
+        self.__relationship_graph = relationship_graph
+        self.__interface_cycles = None
+        self.__stubs = dict()
+        self.__digests = dict()
+        self.__changes = list()
+        self.__render_errors = list()
+        self.__interface_fingerprints = dict()
+        self.__interface_signatures = dict()
     
     def generate_code(self):
         """
         Use the syntax tree to generate code files for the UML class diagrams 
+
+        Returns:
+            boolean: True if successful, False if unsuccessful
         """
         
         print("<<< GENERATING CODE FILES FROM SYNTAX TREE >>>")
 
+        if self.incremental:
+            return self.generate_incremental()
+        if self.streaming:
+            return self.generate_streaming()
+        if self.render_workers > 1:
+            return self.generate_parallel()
+
         try:
-            for _, _class in self.__syntax_tree.items():
-                file = ""
-                
-                inheritance = ""
-                if len(_class['relationships']['extends']) > 0:
-                    inheritance += "extends "
-                    inheritance += ",".join([self.__syntax_tree[r]['name'] for r in _class['relationships']['extends']]).strip(",")
-                    
-                implementation = "" 
-                if len(_class['relationships']['implements']) > 0:
-                    implementation += "implements "
-                    implementation += ",".join([self.__syntax_tree[r]['name'] for r in _class['relationships']['implements']]).strip(",")
-
-                interface_methods = list()
-                self.get_interface_methods(_class['relationships']['implements'], interface_methods)
-
-                file += self.generate_classes(_class['type'], _class['name'], inheritance, implementation)
-                file += "\n"
-                file += self.generate_properties(_class['properties'])
-                file += "\n"
-                file += self.generate_methods(_class['methods'], _class['properties'], _class['type'], interface_methods)
-                file += "}\n" 
-                self.__files.append([_class['name'], file])
-
-            self.generate_files()
+            with self.instrumentation.stage("generate_code") as record:
+                self.get_interface_cycles()
+                parts = list()
+                for _class in self.__syntax_tree.values():
+                    self._render_class(_class, parts)
+                    self.__files.append([_class.name, "".join(parts)])
+                    parts.clear()
+
+                record.count('classes', len(self.__files))
+
+            if self.file_path is None:
+                return True
+            return self.generate_files()
         
         except Exception as e:
             print(f"JavaCodeGenerator.generate_code ERROR: {e}")
+            return False
+
+    def _render_class(self, _class, parts):
+        """
+        Render the complete file of a class
+
+        Parameters:
+            _class: the class from the syntax tree
+            parts: list the rendered snippets are appended to
+        """
+
+        inheritance, implementation, closure = self._get_clauses(_class)
+        self._render_file(
+            _class.type, _class.name, _class.properties, _class.methods, inheritance, implementation, closure, parts
+        )
+
+    def _get_clauses(self, _class):
+        """
+        Get what the file of a class takes from the rest of the syntax tree
+
+        Parameters:
+            _class: the class from the syntax tree
+
+        Returns:
+            inheritance: the extends clause, naming the parents
+            implementation: the implements clause, naming the interfaces
+            closure: ids of the interface closure, see get_interface_closure
+        """
+
+        relationships = _class.relationships
+
+        inheritance = ""
+        if len(relationships.extends) > 0:
+            inheritance = "extends " + ",".join([self.__syntax_tree[r].name for r in relationships.extends]).strip(",")
+
+        implementation = ""
+        if len(relationships.implements) > 0:
+            implementation = "implements " + ",".join([self.__syntax_tree[r].name for r in relationships.implements]).strip(",")
+
+        return inheritance, implementation, self.get_interface_closure(relationships.implements)
+
+    def _render_file(self, class_type, class_name, properties, methods, inheritance, implementation, closure, parts):
+        """
+        Render the complete file of a class from its parts
+
+        Parameters:
+            class_type: type of class; 'class', 'abstract', 'interface'
+            class_name: name of class
+            properties: dictionary of Property
+            methods: dictionary of Method
+            inheritance: the extends clause
+            implementation: the implements clause
+            closure: ids of the interface closure, whose methods get stubs
+            parts: list the rendered snippets are appended to
+        """
+
+        # methods with the same signature get one stub
+        interface_signatures = dict()
+        for i in closure:
+            interface_signatures.update(dict.fromkeys(self._get_interface_signatures(i)))
+
+        parts.append(self.generate_classes(class_type, class_name, inheritance, implementation))
+        parts.append("\n")
+        self._render_properties(properties, parts)
+        parts.append("\n")
+        self._render_methods(methods, properties, class_type, interface_signatures, parts)
+        parts.append("}\n")
+
+    def _get_render_job(self, _class):
+        """
+        Collect everything the file of a class is rendered from, so that it
+        renders without the rest of the syntax tree given the method
+        signatures of its interface closure (see _get_interface_signatures).
+        The job holds plain tuples, which pickle several times faster than models.
+
+        Parameters:
+            _class: the class from the syntax tree
+
+        Returns:
+            job: tuple of the type and name of the class, the (access, name, type) of its
+                properties, the (access, name, return_type) of its methods and its clauses
+        """
+
+        return (
+            _class.type,
+            _class.name,
+            [(p.access, p.name, p.type) for p in _class.properties.values()],
+            [(m.access, m.name, m.return_type) for m in _class.methods.values()]
+        ) + self._get_clauses(_class)
+
+    def _render_isolated(self, job):
+        """
+        Render one class from its render job, a failure only affects that class
+
+        Parameters:
+            job: the job of the class, see _get_render_job
+
+        Returns:
+            name: name of the class
+            contents: the rendered file, None if it failed
+            error: the error message if it failed, None otherwise
+        """
+
+        class_type, class_name, property_fields, method_fields, inheritance, implementation, closure = job
+        collected = (len(self.__classes), len(self.__properties), len(self.__methods))
+        parts = list()
+        try:
+            properties = {key: Property(*fields) for key, fields in enumerate(property_fields)}
+            methods = {key: Method(*fields) for key, fields in enumerate(method_fields)}
+            self._render_file(class_type, class_name, properties, methods, inheritance, implementation, closure, parts)
+            return class_name, "".join(parts), None
+        except Exception as e:
+            # drop the snippets of the failed class
+            for snippets, length in zip((self.__classes, self.__properties, self.__methods), collected):
+                del snippets[length:]
+            return class_name, None, str(e)
+
+    def generate_parallel(self):
+        """
+        Render the classes on render_workers processes. Each worker gets the
+        render jobs of its classes only (see _get_render_job), the files are
+        collected in the order of the syntax tree. A class that fails to
+        render is reported by get_render_errors and the files of the other
+        classes are still written.
+
+        Returns:
+            boolean: True if successful, False if any class or the writing failed
+        """
+
+        try:
+            with self.instrumentation.stage("generate_code") as record:
+                self.get_interface_cycles()
+                jobs = list()
+                results = list()  # None where the result of a job goes
+                for _class in self.__syntax_tree.values():
+                    try:
+                        jobs.append(self._get_render_job(_class))
+                        results.append(None)
+                    except Exception as e:
+                        results.append((_class.name, None, str(e), None))
+
+                workers = min(self.render_workers, len(jobs))
+                if workers <= 1:
+                    rendered = [self._render_isolated(job) + (None,) for job in jobs]
+                else:
+                    # a few chunks per worker keep the pickling overhead low and the workers busy
+                    chunksize = max(1, len(jobs) // (workers * 4))
+                    # every worker gets the interface signatures once, the jobs only refer to them
+                    interface_signatures = {i: self._get_interface_signatures(i) for job in jobs for i in job[-1]}
+                    with ProcessPoolExecutor(
+                        max_workers=workers, initializer=_init_render_worker,
+                        initargs=(self.collect, interface_signatures)
+                    ) as executor:
+                        rendered = list(executor.map(_render_in_worker, jobs, chunksize=chunksize))
+
+                rendered = iter(rendered)
+                results = [result if result is not None else next(rendered) for result in results]
+
+                for name, contents, error, snippets in results:
+                    if error is not None:
+                        print(f"JavaCodeGenerator.generate_parallel ERROR: class {name}: {error}")
+                        self.__render_errors.append({'name': name, 'error': error})
+                        continue
+                    if snippets is not None:
+                        self.__classes.extend(snippets[0])
+                        self.__properties.extend(snippets[1])
+                        self.__methods.extend(snippets[2])
+                    self.__files.append([name, contents])
+
+                record.count('classes', len(self.__files))
+                record.count('classes_failed', len(self.__render_errors))
+                record.count('render_workers', workers)
+
+            if self.file_path is not None and not self.generate_files():
+                return False
+            return not self.__render_errors
+
+        except Exception as e:
+            print(f"JavaCodeGenerator.generate_parallel ERROR: {e}")
+            return False
+
+    def get_render_errors(self):
+        """
+        Getter for the classes generate_parallel could not render, a list of
+        dictionaries containing name and error
+        """
+
+        return self.__render_errors
 
     def generate_classes(self, class_type, class_name, extends, implements):
         """
@@ -72,9 +329,11 @@ class JavaCodeGenerator(CodeGeneratorInterface):
         type_of_class = "public class" if class_type == "class" else class_type
         type_of_class = class_type + " class" if class_type == "abstract" else type_of_class
 
-        class_header = f"{type_of_class} {class_name} {extends} {implements}" + " {\n"
-        class_header = re.sub(' +', ' ', class_header)
-        self.__classes.append(class_header)
+        class_header = " ".join([part for part in (type_of_class, class_name, extends, implements) if part]) + " {\n"
+        if "  " in class_header:
+            class_header = MULTIPLE_SPACES.sub(' ', class_header)
+        if self.collect:
+            self.__classes.append(class_header)
         return class_header
    
     def get_classes(self):
@@ -89,19 +348,30 @@ class JavaCodeGenerator(CodeGeneratorInterface):
         Generate properties for the class 
 
         Parameters:
-            properties: dictionary of properties
+            properties: dictionary of properties, Property models or dictionaries
 
         Returns:
             properties_string: string of the properties
         """
 
-        properties_string = ""
-        for _, _property_value in properties.items():
-            p = f"\t{_property_value['access']} {_property_value['type']} {_property_value['name']};\n"
-            self.__properties.append(p)
-            properties_string += p 
- 
-        return properties_string
+        parts = list()
+        self._render_properties({key: Property.from_dict(p) for key, p in properties.items()}, parts)
+        return "".join(parts)
+
+    def _render_properties(self, properties, parts):
+        """
+        Render the properties of a class 
+
+        Parameters:
+            properties: dictionary of Property
+            parts: list the rendered snippets are appended to
+        """
+
+        for _property_value in properties.values():
+            p = PROPERTY_TEMPLATE(_property_value.access, _property_value.type, _property_value.name)
+            if self.collect:
+                self.__properties.append(p)
+            parts.append(p)
 
     def get_properties(self):
         """
@@ -115,8 +385,8 @@ class JavaCodeGenerator(CodeGeneratorInterface):
         Generate methods for the class
 
         Parameters:
-            methods: dictionary of methods
-            properties: dictionary of properties
+            methods: dictionary of methods, Method models or dictionaries
+            properties: dictionary of properties, Property models or dictionaries
             class_type: type of current class
             interface_method: methods of implemented interfaces
         
@@ -124,34 +394,75 @@ class JavaCodeGenerator(CodeGeneratorInterface):
             methods_string: string of the methods 
         """
         
-        methods_string = ""
-        for _, method_value in methods.items():
-            m = f"\t{method_value['access']} {method_value['return_type']} {method_value['name']}() {{}}\n";
-            methods_string += m + "\n"
-            self.__methods.append(m)
+        parts = list()
+        self._render_methods(
+            {key: Method.from_dict(m) for key, m in methods.items()},
+            {key: Property.from_dict(p) for key, p in properties.items()},
+            class_type,
+            [(m['access'], m['return_type'], m['name']) for m in interface_methods],
+            parts
+        )
+        return "".join(parts)
+
+    def _render_methods(self, methods, properties, class_type, interface_signatures, parts):
+        """
+        Render the methods of a class
+
+        Parameters:
+            methods: dictionary of Method
+            properties: dictionary of Property
+            class_type: type of current class
+            interface_signatures: (access, return_type, name) of the methods of implemented interfaces
+            parts: list the rendered snippets are appended to
+        """
+
+        start = len(parts)
+        for method_value in methods.values():
+            m = METHOD_TEMPLATE(method_value.access, method_value.return_type, method_value.name)
+            parts.append(m)
+            parts.append("\n")
 
         # getter and setter methods
         if class_type == "class" or class_type == "abstract":
-            for _, _property_value in properties.items():
-                if _property_value['access'] == "private":
-                    getter = (f"\tpublic {_property_value['type']} get{_property_value['name'][0].upper() + _property_value['name'][1:]}()"
-                              f" {{\n \t\treturn this.{_property_value['name']}; \n\t}}\n");
-                    methods_string += getter + "\n"
-                    self.__methods.append(getter)
-
-                    setter = (f"\tpublic void set{_property_value['name'][0].upper() + _property_value['name'][1:]}({_property_value['type']} {_property_value['name']})"
-                              f" {{\n \t\tthis.{_property_value['name']} = {_property_value['name']}; \n\t}}\n")
-                    methods_string += setter + "\n"
-                    self.__methods.append(setter)
+            for _property_value in properties.values():
+                if _property_value.access == "private":
+                    name = _property_value.name
+                    capitalized = name[0].upper() + name[1:]
+
+                    getter = GETTER_TEMPLATE(_property_value.type, capitalized, name)
+                    parts.append(getter)
+                    parts.append("\n")
+
+                    setter = SETTER_TEMPLATE(_property_value.type, capitalized, name)
+                    parts.append(setter)
+                    parts.append("\n")
             
-            for interface_method in interface_methods:
-                comment = "// ***requires implementation***"
-                m = (f"\t {interface_method['access']} {interface_method['return_type']} {interface_method['name']}()"
-                     f" {{\n \t\t{comment} \n\t}}\n")
-                methods_string += m + "\n"
-                self.__methods.append(m)
+            for signature in interface_signatures:
+                m = self._render_interface_stub(signature)
+                parts.append(m)
+                parts.append("\n")
 
-        return methods_string
+        if self.collect:
+            # every method snippet is followed by a "\n" part
+            self.__methods.extend(parts[start::2])
+
+    def _render_interface_stub(self, signature):
+        """
+        Render the stub of an interface method, stubs are cached by signature
+        since every implementor of an interface renders the same ones
+
+        Parameters:
+            signature: (access, return_type, name) of the method of the implemented interface
+
+        Returns:
+            stub: string of the stub method
+        """
+
+        stub = self.__stubs.get(signature)
+        if stub is None:
+            stub = self.__stubs[signature] = INTERFACE_STUB_TEMPLATE(*signature)
+
+        return stub
 
     def get_methods(self):
         """
@@ -162,17 +473,93 @@ class JavaCodeGenerator(CodeGeneratorInterface):
 
     def get_interface_methods(self, implements, interface_list): 
         """
-        Get the interface methods that require implementation
+        Get the interface methods that require implementation, each interface
+        of the transitive closure contributes its methods once and methods
+        with the same signature are only listed once
         
         Parameters:
             implements: list of interfaces
             interface_list: list of interface methods
         """
 
+        seen_methods = set()
+        for i in self.get_interface_closure(implements):
+            for method in self.__syntax_tree[i].methods.values():
+                signature = (method.access, method.return_type, method.name)
+                if signature not in seen_methods:
+                    seen_methods.add(signature)
+                    interface_list.append(method)
+
+    def _get_interface_signatures(self, interface_id):
+        """
+        Get the (access, return_type, name) signatures of the methods of an
+        interface, computed once per interface and shared by its implementors
+
+        Parameters:
+            interface_id: id of the interface
+
+        Returns:
+            signatures: list of method signatures
+        """
+
+        signatures = self.__interface_signatures.get(interface_id)
+        if signatures is None:
+            signatures = self.__interface_signatures[interface_id] = [
+                (m.access, m.return_type, m.name) for m in self.__syntax_tree[interface_id].methods.values()
+            ]
+
+        return signatures
+
+    def _use_interface_signatures(self, interface_signatures):
+        # render workers get the signatures of the interfaces instead of the syntax tree
+        self.__interface_signatures = interface_signatures
+
+    def get_interface_closure(self, implements):
+        """
+        Get the transitive closure of the implemented interfaces, deduplicated
+        and in depth-first order; the closure of each interface is computed
+        once by the relationship graph and shared by all implementors
+
+        Parameters:
+            implements: list of interfaces
+
+        Returns:
+            closure: list of interface ids
+        """
+
+        closure = list()
+        seen = set()
         for i in implements:
-            interface_obj = self.__syntax_tree[i]
-            interface_list += interface_obj['methods'].values()
-            self.get_interface_methods(interface_obj['relationships']['implements'], interface_list)
+            for interface_id in self.get_relationship_graph().closure(i, 'implements'):
+                if interface_id not in seen:
+                    seen.add(interface_id)
+                    closure.append(interface_id)
+
+        return closure
+
+    def get_interface_cycles(self):
+        """
+        Getter for the interface cycles of the syntax tree, each cycle is
+        a list of interface ids starting and ending with the same interface
+        """
+
+        if self.__interface_cycles is None:
+            self.__interface_cycles = self.get_relationship_graph().cycles('implements')
+            for cycle in self.__interface_cycles:
+                names = " -> ".join(self.__syntax_tree[i].name for i in cycle)
+                print(f"JavaCodeGenerator: interface cycle detected: {names}")
+
+        return self.__interface_cycles
+
+    def get_relationship_graph(self):
+        """
+        Getter for the relationship graph of the syntax tree, built on first use
+        """
+
+        if self.__relationship_graph is None:
+            self.__relationship_graph = RelationshipGraph(self.__syntax_tree)
+
+        return self.__relationship_graph
 
     def generate_files(self):
         """
@@ -182,16 +569,429 @@ class JavaCodeGenerator(CodeGeneratorInterface):
             boolean: True if successful, False if unsuccessful
         """
 
+        if self.archive_format is not None:
+            return self.generate_archive()
+
         print(f"<<< WRITING FILES TO {self.file_path} >>>")
 
         try:
-            for file in self.get_files():
-                file_name = file[0] + ".java"
-                file_contents = file[1]
-                with open(self.file_path + f"/{file_name}", "w") as f:
-                    f.write(file_contents)
+            with self.instrumentation.stage("generate_files") as record:
+                os.makedirs(self.file_path, exist_ok=True)
+
+                if not self.write_if_changed:
+                    for file in self.get_files():
+                        file_name = file[0] + ".java"
+                        file_contents = file[1]
+                        with open(self.file_path + f"/{file_name}", "w") as f:
+                            f.write(file_contents)
+                            self.__bytes_written += f.tell()
+                        self.__written_files.append(file_name)
+                else:
+                    # later classes with the same name overwrite earlier ones, as above
+                    files = {file[0] + ".java": file[1] for file in self.get_files()}
+
+                    umask = os.umask(0)
+                    os.umask(umask)
+                    mode = 0o666 & ~umask
+
+                    with ThreadPoolExecutor(max_workers=self.write_workers) as executor:
+                        written = list(executor.map(lambda f: self._write_file_if_changed(f[0], f[1], mode), files.items()))
+
+                    for file_name, bytes_written in zip(files, written):
+                        if bytes_written is not None:
+                            self.__written_files.append(file_name)
+                            self.__bytes_written += bytes_written
+                        else:
+                            self.__unchanged_files.append(file_name)
+
+                record.count('files_written', len(self.__written_files))
+                record.count('files_unchanged', len(self.__unchanged_files))
+                record.count('bytes_written', self.__bytes_written)
+
+            return True
         except Exception as e:
             print(f"JavaCodeGenerator.generate_files ERROR: {e}")            
+            return False
+
+    def generate_archive(self):
+        """
+        Write the generated code into a single archive, the files sorted by
+        name and with fixed timestamps so that the archive is reproducible
+
+        Returns:
+            boolean: True if successful, False if unsuccessful
+        """
+
+        archive_path = self.get_archive_path()
+        print(f"<<< WRITING FILES TO {archive_path} >>>")
+
+        try:
+            with self.instrumentation.stage("generate_files") as record:
+                os.makedirs(os.path.dirname(archive_path) or ".", exist_ok=True)
+
+                # later classes with the same name overwrite earlier ones, as on disk
+                files = {file[0] + ".java": file[1] for file in self.get_files()}
+
+                umask = os.umask(0)
+                os.umask(umask)
+                writer = ArchiveWriter(archive_path, self.archive_format, 0o666 & ~umask)
+                try:
+                    for file_name in sorted(files):
+                        writer.add(file_name, files[file_name])
+                    bytes_written = writer.close(keep_unchanged=self.write_if_changed)
+                except BaseException:
+                    writer.abort()
+                    raise
+
+                if bytes_written is not None:
+                    self.__written_files.append(os.path.basename(archive_path))
+                    self.__bytes_written += bytes_written
+                else:
+                    self.__unchanged_files.append(os.path.basename(archive_path))
+
+                record.count('archive_entries', writer.entries)
+                record.count('files_written', len(self.__written_files))
+                record.count('files_unchanged', len(self.__unchanged_files))
+                record.count('bytes_written', self.__bytes_written)
+
+            return True
+        except Exception as e:
+            print(f"JavaCodeGenerator.generate_archive ERROR: {e}")
+            return False
+
+    def get_archive_path(self):
+        """
+        Getter for the path of the archive written in archive mode, None otherwise
+        """
+
+        if self.archive_format is None or self.file_path is None:
+            return None
+
+        return f"{self.file_path}.{self.archive_format}"
+
+    def generate_streaming(self):
+        """
+        Render the classes one at a time and flush each file to its sink right
+        away, so that only one rendered file is held at a time. Of several
+        classes with the same name only the last one is rendered, as it is the
+        one that ends up on disk; archives get their files sorted by name.
+
+        Returns:
+            boolean: True if successful, False if unsuccessful
+        """
+
+        classes = dict()
+        for _class in self.__syntax_tree.values():
+            classes.pop(_class.name, None)
+            classes[_class.name] = _class
+
+        try:
+            with self.instrumentation.stage("generate_code") as record:
+                self.get_interface_cycles()
+                if self.sink is not None:
+                    for file_name, contents in self._iter_rendered(classes.values()):
+                        self.sink(file_name, contents)
+                        self.__written_files.append(file_name)
+                elif self.archive_format is not None:
+                    self._stream_to_archive([classes[name] for name in sorted(classes, key=lambda n: n + ".java")])
+                elif self.file_path is not None:
+                    print(f"<<< STREAMING FILES TO {self.file_path} >>>")
+                    self._stream_to_directory(classes.values())
+                else:
+                    for _ in self._iter_rendered(classes.values()):
+                        pass
+
+                record.count('classes', len(classes))
+                record.count('files_written', len(self.__written_files))
+                record.count('files_unchanged', len(self.__unchanged_files))
+                record.count('bytes_written', self.__bytes_written)
+
+            return True
+        except Exception as e:
+            print(f"JavaCodeGenerator.generate_streaming ERROR: {e}")
+            return False
+
+    def generate_incremental(self):
+        """
+        Render and write only the classes whose inputs changed since the last
+        run. The fingerprints of every class (see get_class_fingerprint) are
+        kept in a manifest in file_path; a class is rendered again when its
+        fingerprints differ or its file is missing or was modified on disk,
+        and every class is when the manifest was written by another output
+        version (see version.py). Files of classes removed from the diagram are left in place. Which
+        classes were rendered and why is reported by get_changes.
+
+        Returns:
+            boolean: True if successful, False if unsuccessful
+        """
+
+        classes = dict()
+        for _class in self.__syntax_tree.values():
+            classes.pop(_class.name, None)
+            classes[_class.name] = _class
+
+        try:
+            with self.instrumentation.stage("generate_code") as record:
+                self.get_interface_cycles()
+                os.makedirs(self.file_path, exist_ok=True)
+
+                manifest = load_manifest(self.file_path)
+                previous = manifest['files'] if manifest is not None else dict()
+                version_changed = manifest is not None and manifest.get('version') != OUTPUT_STAMP
+
+                entries = dict()
+                changed = list()
+                for name, _class in classes.items():
+                    file_name = name + ".java"
+                    own, inherited = self.get_class_fingerprint(_class)
+                    if version_changed:
+                        reason = "generator version changed"
+                    else:
+                        reason = change_reason(previous.get(file_name), own, inherited, os.path.join(self.file_path, file_name))
+
+                    if reason is None:
+                        entry = entries[file_name] = previous[file_name]
+                        self.__digests[file_name] = (entry['size'], entry['sha256'])
+                        self.__unchanged_files.append(file_name)
+                    else:
+                        entries[file_name] = {'own': own, 'inherited': inherited}
+                        changed.append(_class)
+                        self.__changes.append({'name': name, 'reason': reason})
+
+                for file_name in previous:
+                    if file_name not in entries:
+                        self.__changes.append({'name': file_name[:-len(".java")], 'reason': "removed, file left in place"})
+
+                print(f"<<< WRITING {len(changed)} OF {len(classes)} FILES TO {self.file_path} >>>")
+                self._stream_to_directory(changed)
+
+                for _class in changed:
+                    file_name = _class.name + ".java"
+                    size, digest = self.__digests[file_name]
+                    stat = os.stat(os.path.join(self.file_path, file_name))
+                    entries[file_name].update(size=size, sha256=digest, mtime_ns=stat.st_mtime_ns)
+                write_manifest(self.file_path, entries)
+
+                record.count('classes', len(classes))
+                record.count('classes_changed', len(changed))
+                record.count('files_written', len(self.__written_files))
+                record.count('files_unchanged', len(self.__unchanged_files))
+                record.count('bytes_written', self.__bytes_written)
+
+            return True
+        except Exception as e:
+            print(f"JavaCodeGenerator.generate_incremental ERROR: {e}")
+            return False
+
+    def get_class_fingerprint(self, _class):
+        """
+        Fingerprint the inputs of the Java file of a class
+
+        Parameters:
+            _class: the class from the syntax tree
+
+        Returns:
+            own: fingerprint of the type, name, properties and methods of the class
+            inherited: fingerprint of the names of its parents and interfaces and of
+                the methods of the transitive interface set, which it gets stubs for
+        """
+
+        relationships = _class.relationships
+        own = fingerprint([
+            _class.type,
+            _class.name,
+            [(p.access, p.name, p.type) for p in _class.properties.values()],
+            [(m.access, m.name, m.return_type) for m in _class.methods.values()]
+        ])
+
+        # the stubs of a class follow from the methods of its interface closure,
+        # each interface is fingerprinted once and shared by its implementors
+        interfaces = list()
+        for i in self.get_interface_closure(relationships.implements):
+            interface_fingerprint = self.__interface_fingerprints.get(i)
+            if interface_fingerprint is None:
+                interface_fingerprint = self.__interface_fingerprints[i] = fingerprint(self._get_interface_signatures(i))
+            interfaces.append(interface_fingerprint)
+
+        inherited = fingerprint([
+            [self.__syntax_tree[r].name for r in relationships.extends],
+            [self.__syntax_tree[r].name for r in relationships.implements],
+            interfaces
+        ])
+
+        return own, inherited
+
+    def get_changes(self):
+        """
+        Getter for the classes generate_incremental rendered again or found
+        removed, a list of dictionaries containing name and reason
+        """
+
+        return self.__changes
+
+    def _iter_rendered(self, classes):
+        """
+        Render classes one at a time
+
+        Parameters:
+            classes: the classes from the syntax tree
+
+        Returns:
+            generator: yields file_name, contents per class
+        """
+
+        parts = list()
+        for _class in classes:
+            self._render_class(_class, parts)
+            contents = "".join(parts)
+            parts.clear()
+
+            if self.collect:
+                self.__files.append([_class.name, contents])
+
+            yield _class.name + ".java", contents
+
+    def _record_digest(self, file_name, data):
+        self.__digests[file_name] = (len(data), hashlib.sha256(data).hexdigest())
+
+    def _stream_to_directory(self, classes):
+        """
+        Write every class to file_path as soon as it is rendered, with
+        write_if_changed at most 2 * write_workers files are in flight
+        """
+
+        os.makedirs(self.file_path, exist_ok=True)
+
+        if not self.write_if_changed:
+            for file_name, contents in self._iter_rendered(classes):
+                data = contents.encode("utf8")
+                with open(os.path.join(self.file_path, file_name), "wb") as f:
+                    f.write(data)
+                self._record_digest(file_name, data)
+                self.__written_files.append(file_name)
+                self.__bytes_written += len(data)
+            return
+
+        umask = os.umask(0)
+        os.umask(umask)
+        mode = 0o666 & ~umask
+
+        def finish(pending):
+            file_name, future = pending
+            bytes_written = future.result()
+            if bytes_written is not None:
+                self.__written_files.append(file_name)
+                self.__bytes_written += bytes_written
+            else:
+                self.__unchanged_files.append(file_name)
+
+        in_flight = deque()
+        with ThreadPoolExecutor(max_workers=self.write_workers) as executor:
+            for file_name, contents in self._iter_rendered(classes):
+                self._record_digest(file_name, contents.encode("utf8"))
+                in_flight.append((file_name, executor.submit(self._write_file_if_changed, file_name, contents, mode)))
+                if len(in_flight) >= 2 * self.write_workers:
+                    finish(in_flight.popleft())
+
+            while in_flight:
+                finish(in_flight.popleft())
+
+    def _stream_to_archive(self, classes):
+        """
+        Add every class to the archive as soon as it is rendered
+        """
+
+        archive_path = self.get_archive_path()
+        print(f"<<< STREAMING FILES TO {archive_path} >>>")
+        os.makedirs(os.path.dirname(archive_path) or ".", exist_ok=True)
+
+        umask = os.umask(0)
+        os.umask(umask)
+        writer = ArchiveWriter(archive_path, self.archive_format, 0o666 & ~umask)
+        try:
+            for file_name, contents in self._iter_rendered(classes):
+                writer.add(file_name, contents)
+            bytes_written = writer.close(keep_unchanged=self.write_if_changed)
+        except BaseException:
+            writer.abort()
+            raise
+
+        if bytes_written is not None:
+            self.__written_files.append(os.path.basename(archive_path))
+            self.__bytes_written += bytes_written
+        else:
+            self.__unchanged_files.append(os.path.basename(archive_path))
+
+    def get_output_digests(self):
+        """
+        Getter for the size and sha256 of every file streamed to file_path,
+        or with incremental of every file of the syntax tree in file_path
+
+        Returns:
+            digests: dictionary of file name to (size, hex digest)
+        """
+
+        return self.__digests
+
+    def _write_file_if_changed(self, file_name, file_contents, mode):
+        """
+        Write a file through a temporary file and a rename, unless the
+        existing file already has the same contents
+
+        Parameters:
+            file_name: name of the file inside file_path
+            file_contents: contents of the file
+            mode: permission bits for newly created files
+
+        Returns:
+            bytes_written: size of the written file, None if it was unchanged
+        """
+
+        path = os.path.join(self.file_path, file_name)
+        data = file_contents.encode("utf8")
+
+        try:
+            stat = os.stat(path)
+            mode = stat.st_mode & 0o777
+            if stat.st_size == len(data):
+                with open(path, "rb") as f:
+                    if f.read() == data:
+                        return None
+        except FileNotFoundError:
+            pass
+
+        fd, temp_path = tempfile.mkstemp(prefix=f".{file_name}.", suffix=".tmp", dir=self.file_path)
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.chmod(temp_path, mode)
+            os.replace(temp_path, path)
+        except BaseException:
+            os.remove(temp_path)
+            raise
+
+        return len(data)
+
+    def get_written_files(self):
+        """
+        Getter for the names of the files written by generate_files
+        """
+
+        return self.__written_files
+
+    def get_bytes_written(self):
+        """
+        Getter for the number of bytes written by generate_files
+        """
+
+        return self.__bytes_written
+
+    def get_unchanged_files(self):
+        """
+        Getter for the names of the files left untouched by generate_files
+        """
+
+        return self.__unchanged_files
 
     def get_files(self):
         """
@@ -199,3 +999,31 @@ class JavaCodeGenerator(CodeGeneratorInterface):
         """
 
         return self.__files
+
+    def get_sources(self):
+        """
+        Getter for the generated sources by class name, later classes with
+        the same name replace earlier ones as they do on disk
+        """
+
+        return {name: contents for name, contents in self.__files}
+
+
+def _init_render_worker(collect, interface_signatures):
+    global _renderer
+    _renderer = JavaCodeGenerator(dict(), None, collect=collect)
+    _renderer._use_interface_signatures(interface_signatures)
+
+
+def _render_in_worker(job):
+    """
+    Render a job on the generator of the worker, used by the process pool;
+    the collected snippets of the class are handed back with the file
+    """
+
+    name, contents, error = _renderer._render_isolated(job)
+    collected = (_renderer.get_classes(), _renderer.get_properties(), _renderer.get_methods())
+    snippets = tuple(list(c) for c in collected) if _renderer.collect else None
+    for c in collected:
+        c.clear()
+    return name, contents, error, snippets
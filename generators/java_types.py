@@ -0,0 +1,34 @@
+import re
+
+# collections whose element type the other backends map to an array
+COLLECTION_TYPE = re.compile(r'^(?:java\.util\.)?(?:List|ArrayList|LinkedList|Set|HashSet|TreeSet|Collection|Iterable)<(.+)>$')
+MAP_TYPE = re.compile(r'^(?:java\.util\.)?(?:Map|HashMap|TreeMap|LinkedHashMap)<([^,<>]+),(.+)>$')
+
+
+def split_java_type(java_type):
+    """
+    Split the Java type of a member into its shape and its component types,
+    e.g. 'int[]' and 'List<Account>' are arrays, 'Map<String, Account>' is a map
+
+    Parameters:
+        java_type: type as written in the diagram, spaces already removed by the parser
+
+    Returns:
+        kind: 'array', 'map' or 'scalar'
+        components: tuple of the element type ('array'), the key and value types
+            ('map') or the type itself ('scalar')
+    """
+
+    java_type = java_type.strip()
+    if java_type.endswith("[]"):
+        return "array", (java_type[:-2],)
+
+    match = COLLECTION_TYPE.match(java_type)
+    if match:
+        return "array", (match.group(1).strip(),)
+
+    match = MAP_TYPE.match(java_type)
+    if match:
+        return "map", (match.group(1).strip(), match.group(2).strip())
+
+    return "scalar", (java_type,)
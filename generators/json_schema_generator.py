@@ -0,0 +1,222 @@
+import json
+import os
+from generators.code_generator import CodeGeneratorInterface
+from generators.java_types import split_java_type
+from profiling.instrumentation import NULL_INSTRUMENTATION
+
+SCHEMA_DIALECT = "https://json-schema.org/draft/2020-12/schema"
+
+JSON_SCHEMA_TYPES = {
+    'byte': "integer", 'short': "integer", 'int': "integer", 'long': "integer",
+    'Byte': "integer", 'Short': "integer", 'Integer': "integer", 'Long': "integer", 'BigInteger': "integer",
+    'float': "number", 'double': "number", 'Float': "number", 'Double': "number", 'BigDecimal': "number",
+    'boolean': "boolean", 'Boolean': "boolean",
+    'char': "string", 'Character': "string", 'String': "string"
+}
+
+class JsonSchemaGenerator(CodeGeneratorInterface):
+    """
+    Generate a JSON schema per class describing the data it holds: its
+    properties, with the schemas of its parent classes combined through
+    allOf. Methods are not part of a data schema.
+
+    Parameters:
+        syntax_tree: syntax_tree of the drawio file, of Class models (see parsers/models.py)
+            or in its dictionary form, both are read like dictionaries
+        file_path: path for the .schema.json files to be written to, None to only generate them in memory
+        instrumentation: optional Instrumentation recording the stages
+    """
+
+    FILE_EXTENSION = ".schema.json"
+
+    def __init__(self, syntax_tree, file_path, instrumentation=NULL_INSTRUMENTATION):
+        self.__syntax_tree = syntax_tree
+        self.file_path = file_path.rstrip('/') if file_path is not None else None
+        self.instrumentation = instrumentation
+        self.__class_names = {_class['name'] for _class in syntax_tree.values()}
+        self.__classes = list()
+        self.__properties = list()
+        self.__files = list()
+        self.__written_files = list()
+        self.__bytes_written = 0
+
+    def generate_code(self):
+        """
+        Use the syntax tree to generate a JSON schema for every class
+
+        Returns:
+            boolean: True if successful, False if unsuccessful
+        """
+
+        print("<<< GENERATING JSON SCHEMAS FROM SYNTAX TREE >>>")
+
+        try:
+            with self.instrumentation.stage("generate_code") as record:
+                for _class in self.__syntax_tree.values():
+                    extends = [self.__syntax_tree[r]['name'] for r in _class['relationships']['extends']]
+                    schema = self.generate_classes(_class['type'], _class['name'], extends, [])
+                    schema['properties'] = self.generate_properties(_class['properties'])
+                    self.__files.append([_class['name'], json.dumps(schema, indent=2) + "\n"])
+
+                record.count('classes', len(self.__files))
+
+            if self.file_path is None:
+                return True
+            return self.generate_files()
+
+        except Exception as e:
+            print(f"JsonSchemaGenerator.generate_code ERROR: {e}")
+            return False
+
+    def generate_classes(self, class_type, class_name, extends, implements):
+        """
+        Generate the top level of the schema of a class
+
+        Parameters:
+            class_type: type of class; 'class', 'abstract', 'interface'
+            class_name: name of class
+            extends: names of the parent classes
+            implements: names of the implemented interfaces, which carry no data
+
+        Returns:
+            schema: dictionary of the schema, without its properties
+        """
+
+        schema = {
+            '$schema': SCHEMA_DIALECT,
+            '$id': class_name + self.FILE_EXTENSION,
+            'title': class_name,
+            'description': f"{class_type} {class_name}",
+            'type': "object"
+        }
+        if extends:
+            schema['allOf'] = [{'$ref': name + self.FILE_EXTENSION} for name in extends]
+
+        self.__classes.append(schema)
+        return schema
+
+    def get_classes(self):
+        """
+        Getter for the class schemas
+        """
+
+        return self.__classes
+
+    def generate_properties(self, properties):
+        """
+        Generate the schemas of the properties of a class
+
+        Parameters:
+            properties: dictionary of properties, Property models or dictionaries
+
+        Returns:
+            properties_schema: dictionary of property name to its schema
+        """
+
+        properties_schema = dict()
+        for _property_value in properties.values():
+            property_schema = self.to_schema(_property_value['type'])
+            self.__properties.append(property_schema)
+            properties_schema[_property_value['name']] = property_schema
+
+        return properties_schema
+
+    def get_properties(self):
+        """
+        Getter for the property schemas
+        """
+
+        return self.__properties
+
+    def generate_methods(self, methods):
+        """
+        Methods are not part of a data schema
+
+        Returns:
+            methods_schema: empty dictionary
+        """
+
+        return dict()
+
+    def get_methods(self):
+        """
+        Getter for the methods, always empty
+        """
+
+        return list()
+
+    def to_schema(self, java_type):
+        """
+        Map a Java type to a schema, classes of the diagram are referenced by
+        their schema and unknown types accept any value
+
+        Parameters:
+            java_type: type as written in the diagram
+
+        Returns:
+            schema: dictionary of the schema
+        """
+
+        kind, components = split_java_type(java_type)
+        if kind == "array":
+            return {'type': "array", 'items': self.to_schema(components[0])}
+        if kind == "map":
+            return {'type': "object", 'additionalProperties': self.to_schema(components[1])}
+
+        if java_type in self.__class_names:
+            return {'$ref': java_type + self.FILE_EXTENSION}
+        if java_type in JSON_SCHEMA_TYPES:
+            return {'type': JSON_SCHEMA_TYPES[java_type]}
+
+        return {'description': f"Java type {java_type}"}
+
+    def generate_files(self):
+        """
+        Write the schemas to file
+
+        Returns:
+            boolean: True if successful, False if unsuccessful
+        """
+
+        print(f"<<< WRITING FILES TO {self.file_path} >>>")
+
+        try:
+            with self.instrumentation.stage("generate_files") as record:
+                os.makedirs(self.file_path, exist_ok=True)
+
+                for name, contents in self.__files:
+                    file_name = name + self.FILE_EXTENSION
+                    with open(os.path.join(self.file_path, file_name), "w") as f:
+                        f.write(contents)
+                        self.__bytes_written += f.tell()
+                    self.__written_files.append(file_name)
+
+                record.count('files_written', len(self.__written_files))
+                record.count('bytes_written', self.__bytes_written)
+
+            return True
+        except Exception as e:
+            print(f"JsonSchemaGenerator.generate_files ERROR: {e}")
+            return False
+
+    def get_written_files(self):
+        """
+        Getter for the names of the files written by generate_files
+        """
+
+        return self.__written_files
+
+    def get_files(self):
+        """
+        Getter for the files
+        """
+
+        return self.__files
+
+    def get_sources(self):
+        """
+        Getter for the generated schemas by class name, later classes with
+        the same name replace earlier ones as they do on disk
+        """
+
+        return {name: contents for name, contents in self.__files}
@@ -0,0 +1,54 @@
+from generators.java_generator import JavaCodeGenerator
+from generators.json_schema_generator import JsonSchemaGenerator
+from generators.typescript_generator import TypeScriptCodeGenerator
+
+DEFAULT_TARGET = "java"
+
+# target name -> CodeGeneratorInterface implementation, constructed as
+# generator_class(syntax_tree, file_path, **options) and run with generate_code()
+GENERATORS = {
+    'java': JavaCodeGenerator,
+    'typescript': TypeScriptCodeGenerator,
+    'json-schema': JsonSchemaGenerator
+}
+
+
+def register_generator(target, generator_class):
+    """
+    Register a backend under a target name, replacing any backend of that name
+
+    Parameters:
+        target: name of the target, e.g. 'kotlin'
+        generator_class: CodeGeneratorInterface implementation taking
+            (syntax_tree, file_path, **options), with a FILE_EXTENSION
+    """
+
+    GENERATORS[target] = generator_class
+
+
+def get_generator(target):
+    """
+    Look up the backend of a target
+
+    Parameters:
+        target: name of the target
+
+    Returns:
+        generator_class: the registered CodeGeneratorInterface implementation
+    """
+
+    try:
+        return GENERATORS[target]
+    except KeyError:
+        raise ValueError(f"unknown target '{target}', expected one of {available_targets()}") from None
+
+
+def available_targets():
+    """
+    Names of the registered targets
+
+    Returns:
+        targets: tuple of target names, in registration order
+    """
+
+    return tuple(GENERATORS)
@@ -0,0 +1,244 @@
+import os
+from generators.code_generator import CodeGeneratorInterface
+from generators.java_types import split_java_type
+from profiling.instrumentation import NULL_INSTRUMENTATION
+
+TYPESCRIPT_TYPES = {
+    'byte': "number", 'short': "number", 'int': "number", 'long': "number",
+    'float': "number", 'double': "number",
+    'Byte': "number", 'Short': "number", 'Integer': "number", 'Long': "number",
+    'Float': "number", 'Double': "number", 'BigDecimal': "number", 'BigInteger': "number",
+    'boolean': "boolean", 'Boolean': "boolean",
+    'char': "string", 'Character': "string", 'String': "string",
+    'void': "void", 'Object': "unknown", 'Date': "Date"
+}
+
+class TypeScriptCodeGenerator(CodeGeneratorInterface):
+    """
+    Generate a TypeScript interface per class, describing its shape: every
+    property and the non-private methods, extending the interfaces of its
+    parent classes and of the interfaces it implements
+
+    Parameters:
+        syntax_tree: syntax_tree of the drawio file, of Class models (see parsers/models.py)
+            or in its dictionary form, both are read like dictionaries
+        file_path: path for the .ts files to be written to, None to only generate them in memory
+        instrumentation: optional Instrumentation recording the stages
+    """
+
+    FILE_EXTENSION = ".ts"
+
+    def __init__(self, syntax_tree, file_path, instrumentation=NULL_INSTRUMENTATION):
+        self.__syntax_tree = syntax_tree
+        self.file_path = file_path.rstrip('/') if file_path is not None else None
+        self.instrumentation = instrumentation
+        self.__class_names = {_class['name'] for _class in syntax_tree.values()}
+        self.__classes = list()
+        self.__properties = list()
+        self.__methods = list()
+        self.__files = list()
+        self.__written_files = list()
+        self.__bytes_written = 0
+
+    def generate_code(self):
+        """
+        Use the syntax tree to generate TypeScript files for the UML class diagrams
+
+        Returns:
+            boolean: True if successful, False if unsuccessful
+        """
+
+        print("<<< GENERATING TYPESCRIPT FILES FROM SYNTAX TREE >>>")
+
+        try:
+            with self.instrumentation.stage("generate_code") as record:
+                for _class in self.__syntax_tree.values():
+                    relationships = _class['relationships']
+                    parents = [
+                        self.__syntax_tree[r]['name'] for r in relationships['extends'] + relationships['implements']
+                    ]
+                    referenced = set(parents)
+
+                    header = self.generate_classes(_class['type'], _class['name'], parents, [])
+                    properties = self.generate_properties(_class['properties'], referenced)
+                    methods = self.generate_methods(_class['methods'], referenced)
+
+                    imports = "".join(
+                        f'import {{ {name} }} from "./{name}";\n'
+                        for name in sorted(referenced) if name != _class['name']
+                    )
+                    self.__files.append([
+                        _class['name'], (imports + "\n" if imports else "") + header + properties + methods + "}\n"
+                    ])
+
+                record.count('classes', len(self.__files))
+
+            if self.file_path is None:
+                return True
+            return self.generate_files()
+
+        except Exception as e:
+            print(f"TypeScriptCodeGenerator.generate_code ERROR: {e}")
+            return False
+
+    def generate_classes(self, class_type, class_name, extends, implements):
+        """
+        Generate the interface header
+
+        Parameters:
+            class_type: type of class; 'class', 'abstract', 'interface'
+            class_name: name of class
+            extends: names of the parent classes
+            implements: names of the implemented interfaces
+
+        Returns:
+            class_header: interface header string
+        """
+
+        parents = list(dict.fromkeys(extends + implements))
+        inheritance = f" extends {', '.join(parents)}" if parents else ""
+        class_header = f"/** {class_type} {class_name} */\nexport interface {class_name}{inheritance} {{\n"
+        self.__classes.append(class_header)
+        return class_header
+
+    def get_classes(self):
+        """
+        Getter for classes
+        """
+
+        return self.__classes
+
+    def generate_properties(self, properties, referenced=None):
+        """
+        Generate the properties of the interface
+
+        Parameters:
+            properties: dictionary of properties, Property models or dictionaries
+            referenced: optional set collecting the diagram classes the types refer to
+
+        Returns:
+            properties_string: string of the properties
+        """
+
+        parts = list()
+        for _property_value in properties.values():
+            p = f"    {_property_value['name']}: {self.to_typescript_type(_property_value['type'], referenced)};\n"
+            self.__properties.append(p)
+            parts.append(p)
+
+        return "".join(parts)
+
+    def get_properties(self):
+        """
+        Getter for properties
+        """
+
+        return self.__properties
+
+    def generate_methods(self, methods, referenced=None):
+        """
+        Generate the methods of the interface, private methods are not part of it
+
+        Parameters:
+            methods: dictionary of methods, Method models or dictionaries
+            referenced: optional set collecting the diagram classes the types refer to
+
+        Returns:
+            methods_string: string of the methods
+        """
+
+        parts = list()
+        for method_value in methods.values():
+            if method_value['access'] == "private":
+                continue
+            m = f"    {method_value['name']}(): {self.to_typescript_type(method_value['return_type'], referenced)};\n"
+            self.__methods.append(m)
+            parts.append(m)
+
+        return "".join(parts)
+
+    def get_methods(self):
+        """
+        Getter for the methods
+        """
+
+        return self.__methods
+
+    def to_typescript_type(self, java_type, referenced=None):
+        """
+        Map a Java type to a TypeScript type, classes of the diagram keep their
+        name and unknown types become 'unknown'
+
+        Parameters:
+            java_type: type as written in the diagram
+            referenced: optional set collecting the diagram classes the type refers to
+
+        Returns:
+            typescript_type: string of the TypeScript type
+        """
+
+        kind, components = split_java_type(java_type)
+        if kind == "array":
+            element = self.to_typescript_type(components[0], referenced)
+            return f"{element}[]" if element.isidentifier() else f"({element})[]"
+        if kind == "map":
+            key, value = (self.to_typescript_type(c, referenced) for c in components)
+            return f"Record<{key}, {value}>"
+
+        if java_type in self.__class_names:
+            if referenced is not None:
+                referenced.add(java_type)
+            return java_type
+
+        return TYPESCRIPT_TYPES.get(java_type, "unknown")
+
+    def generate_files(self):
+        """
+        Write generated code to file
+
+        Returns:
+            boolean: True if successful, False if unsuccessful
+        """
+
+        print(f"<<< WRITING FILES TO {self.file_path} >>>")
+
+        try:
+            with self.instrumentation.stage("generate_files") as record:
+                os.makedirs(self.file_path, exist_ok=True)
+
+                for name, contents in self.__files:
+                    file_name = name + self.FILE_EXTENSION
+                    with open(os.path.join(self.file_path, file_name), "w") as f:
+                        f.write(contents)
+                        self.__bytes_written += f.tell()
+                    self.__written_files.append(file_name)
+
+                record.count('files_written', len(self.__written_files))
+                record.count('bytes_written', self.__bytes_written)
+
+            return True
+        except Exception as e:
+            print(f"TypeScriptCodeGenerator.generate_files ERROR: {e}")
+            return False
+
+    def get_written_files(self):
+        """
+        Getter for the names of the files written by generate_files
+        """
+
+        return self.__written_files
+
+    def get_files(self):
+        """
+        Getter for the files
+        """
+
+        return self.__files
+
+    def get_sources(self):
+        """
+        Getter for the generated sources by class name, later classes with
+        the same name replace earlier ones as they do on disk
+        """
+
+        return {name: contents for name, contents in self.__files}
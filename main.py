@@ -1,27 +1,216 @@
-import json
-from decode.convert_to_readable import DecodeAndDecompress
-from parsers.style_parser import StyleParser
-from parsers.syntax_parser import SyntaxParser
-from generators.java_generator import JavaCodeGenerator
+import argparse
+import os
+import sys
+from generators.archive import ARCHIVE_FORMATS
+from generators.registry import available_targets
+from pipeline.cache import DEFAULT_CACHE_DIR, DEFAULT_MAX_BYTES, DiagramCache
+from pipeline.runner import collect_diagrams, run_batch
+from pipeline.watch import DEFAULT_DEBOUNCE, DEFAULT_INTERVAL, DiagramWatcher
+from profiling.instrumentation import Instrumentation
 
-def json_to_file(file_name, data):
-    with open(file_name, "w") as f:
-        f.write(json.dumps(data, indent=4))
 
-decoded_xml = DecodeAndDecompress.convert("examples/simple_class_diagram.drawio")
-# decoded_xml = DecodeAndDecompress.convert("diagram_single_class.drawio")
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Generate Java code from draw.io UML class diagrams"
+    )
+    parser.add_argument(
+        "paths", nargs="+",
+        help=".drawio files and/or directories to search for them"
+    )
+    parser.add_argument(
+        "-o", "--output", default="generated",
+        help="root output directory, each diagram gets its own sub directory (default: generated)"
+    )
+    parser.add_argument(
+        "-j", "--workers", type=int, default=os.cpu_count(),
+        help="number of worker processes (default: CPU count)"
+    )
+    parser.add_argument(
+        "--dump-dir", default=None,
+        help="also write the decoded XML, style tree and syntax tree of each diagram here"
+    )
+    parser.add_argument(
+        "--write-if-changed", action="store_true",
+        help="only rewrite .java files whose contents changed, atomically and on a thread pool"
+    )
+    parser.add_argument(
+        "--archive", choices=ARCHIVE_FORMATS, default=None,
+        help="write the code of each diagram into one reproducible archive next to its output directory"
+    )
+    parser.add_argument(
+        "--streaming", action="store_true",
+        help="write each class as soon as it is rendered, keeping memory bounded on very large models"
+    )
+    parser.add_argument(
+        "--target", dest="targets", action="append", choices=available_targets(), default=None,
+        help="generate this target from the one parse, repeatable; every target gets its own "
+             "sub directory and the targets run in parallel (default: Java directly into the output directory)"
+    )
+    parser.add_argument(
+        "--incremental", action="store_true",
+        help="only regenerate the classes whose inputs changed since the last run, tracked in a manifest in the output directory"
+    )
+    parser.add_argument(
+        "--render-workers", type=int, default=1,
+        help="render the classes of each diagram on this many worker processes, a class that fails "
+             "is reported on its own; ignored when several diagrams run on the --workers pool "
+             "(default: %(default)s, one after another)"
+    )
+    parser.add_argument(
+        "--cache-dir", default=DEFAULT_CACHE_DIR,
+        help=f"directory of the decode/parse cache (default: {DEFAULT_CACHE_DIR})"
+    )
+    parser.add_argument(
+        "--cache-size", type=int, default=DEFAULT_MAX_BYTES // (1024 * 1024),
+        help="size bound of the cache in MB, least recently used entries are evicted (default: %(default)s)"
+    )
+    parser.add_argument(
+        "--no-cache", action="store_true",
+        help="bypass the cache, always decode, parse and generate every diagram"
+    )
+    parser.add_argument(
+        "--clear-cache", action="store_true",
+        help="empty the cache before running"
+    )
+    parser.add_argument(
+        "--all-pages", action="store_true",
+        help="parse every page of a diagram in parallel and merge them into one model, classes are matched by name"
+    )
+    parser.add_argument(
+        "--watch", action="store_true",
+        help="keep running and regenerate every diagram whose contents change, until interrupted"
+    )
+    parser.add_argument(
+        "--watch-interval", type=float, default=DEFAULT_INTERVAL,
+        help="seconds between two polls of the watched paths (default: %(default)s)"
+    )
+    parser.add_argument(
+        "--debounce", type=float, default=DEFAULT_DEBOUNCE,
+        help="seconds a changed diagram has to stay unchanged before it is regenerated (default: %(default)s)"
+    )
+    parser.add_argument(
+        "--profile", default=None, metavar="PATH",
+        help="record wall time, peak memory and counters of every stage and write them to PATH"
+    )
+    parser.add_argument(
+        "--profile-format", choices=("json", "chrome"), default="json",
+        help="'json' summary and records or a 'chrome' trace for chrome://tracing / Perfetto (default: json)"
+    )
 
-DecodeAndDecompress.write_xml_file("examples/simple_class_diagram", decoded_xml)
+    args = parser.parse_args(argv)
+    if args.incremental and args.archive:
+        parser.error("--incremental writes into the output directory and cannot be combined with --archive")
+    if args.targets and args.archive:
+        parser.error("--target writes into directories and cannot be combined with --archive")
+    if args.render_workers > 1 and (args.streaming or args.incremental):
+        parser.error("--render-workers cannot be combined with --streaming or --incremental")
+    return args
 
-parser_style = StyleParser(decoded_xml)
-style_tree = parser_style.convert_to_style_tree()
-# print(json.dumps(style_tree, indent=4))
-json_to_file("examples/simple_class_style_tree.json", style_tree)
 
-parser_syntax = SyntaxParser(style_tree)
-syntax_tree = parser_syntax.convert_to_sytax_tree()
-#  print(json.dumps(syntax_tree, indent=4))
-json_to_file("examples/simple_class_syntax_tree.json", syntax_tree)
+def print_result(result):
+    """
+    Print the summary line of a diagram
 
-java_code_gen = JavaCodeGenerator(syntax_tree, "examples/example_code")
-java_code_gen.generate_code()
+    Returns:
+        failed: True if the diagram failed
+    """
+
+    if result['skipped']:
+        print(f"SKIPPED {result['path']} -> {result['output']} (unchanged)")
+    elif result['ok']:
+        cached = ", cached" if result['cached'] else ""
+        collisions = f", {len(result['collisions'])} name collisions" if result['collisions'] else ""
+        changes = f", {len(result['changes'])} changed" if result['changes'] else ""
+        print(
+            f"OK      {result['path']} -> {result['output']} "
+            f"({result['classes']} classes{cached}{collisions}{changes}, {result['seconds']:.2f}s)"
+        )
+        for change in result['changes']:
+            print(f"          {change['name']}: {change['reason']}")
+        for target in result['targets']:
+            print(f"          {target['target']}: {target['files']} files, {target['seconds']:.2f}s -> {target['output']}")
+    else:
+        print(f"FAILED  {result['path']}: {result['error']}")
+
+    return not result['ok']
+
+
+def watch(args, cache, profile):
+    """
+    Regenerate the diagrams of args.paths whenever they change, until interrupted.
+    With --profile the profile is written after every rebuild and then cleared,
+    so a long session does not pile up records
+    """
+
+    watcher = DiagramWatcher(
+        args.paths, args.output, args.dump_dir, interval=args.watch_interval, debounce=args.debounce,
+        cache=cache, write_if_changed=args.write_if_changed, profile=bool(args.profile),
+        all_pages=args.all_pages, page_workers=1, archive_format=args.archive,
+        streaming=args.streaming, incremental=args.incremental, targets=args.targets, target_workers=1,
+        render_workers=args.render_workers
+    )
+
+    def on_result(result):
+        print_result(result)
+        if result['profile']:
+            profile.extend(result['profile'])
+            profile.write(args.profile, args.profile_format)
+            profile.clear()
+            print(f"profile written to {args.profile}")
+
+    print(f"watching {', '.join(args.paths)}, press Ctrl-C to stop")
+    try:
+        watcher.run(on_result)
+    except KeyboardInterrupt:
+        pass
+
+
+def main(argv=None):
+    """
+    Run the pipeline over every diagram and print a per-file summary
+
+    Returns:
+        exit_code: 0 if every diagram succeeded, 1 if any failed, 2 if none were found
+    """
+
+    args = parse_args(argv)
+
+    cache = DiagramCache(args.cache_dir, args.cache_size * 1024 * 1024)
+    if args.clear_cache:
+        print(f"cleared {cache.clear()} cache entries from {args.cache_dir}")
+    if args.no_cache:
+        cache = None
+
+    profile = Instrumentation()
+    if args.watch:
+        watch(args, cache, profile)
+        return 0
+
+    if not collect_diagrams(args.paths):
+        print("no .drawio files found")
+        return 2
+
+    failed = 0
+    total = 0
+    for result in run_batch(
+        args.paths, args.output, args.workers, args.dump_dir,
+        cache=cache, write_if_changed=args.write_if_changed, profile=bool(args.profile),
+        all_pages=args.all_pages, archive_format=args.archive, streaming=args.streaming,
+        incremental=args.incremental, targets=args.targets, render_workers=args.render_workers
+    ):
+        total += 1
+        if result['profile']:
+            profile.extend(result['profile'])
+        if print_result(result):
+            failed += 1
+
+    print(f"{total - failed}/{total} diagrams generated")
+
+    if args.profile:
+        profile.write(args.profile, args.profile_format)
+        print(f"profile written to {args.profile}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,118 @@
+from functools import lru_cache
+from html.parser import HTMLParser
+
+# whitespace libxml2 treats as blank
+BLANKS = " \t\n\r\f"
+
+class HtmlTextExtractor(HTMLParser):
+  """
+  Streaming tag stripper that keeps the text of an HTML fragment, decoding
+  character references on the way. It follows what BeautifulSoup with the
+  lxml parser returns for .text:
+    - the contents of <script>/<style> and comments are dropped
+    - blanks at the start of the document are dropped
+    - a blank text node between two tags collapses to one '\\n' or ' '
+    - end tags without a matching start tag are ignored, the text around
+      them stays one text node
+    - line endings are normalised to '\\n'
+    - a trailing unfinished tag is dropped
+  """
+
+  SKIPPED_TAGS = ("script", "style")
+  VOID_TAGS = frozenset((
+    "area", "base", "br", "col", "embed", "hr", "img", "input", "link", "meta", "param", "source", "track", "wbr"
+  ))
+
+  def __init__(self):
+    super().__init__(convert_charrefs=True)
+    self.parts = list()
+    self.pending = list()
+    self.open_tags = list()
+    self.skipping = None
+    self.in_document = False
+
+  def handle_starttag(self, tag, attrs):
+    self.flush()
+    self.in_document = True
+    if tag in self.SKIPPED_TAGS:
+      self.skipping = tag
+    elif tag not in self.VOID_TAGS:
+      self.open_tags.append(tag)
+
+  def handle_startendtag(self, tag, attrs):
+    self.flush()
+    self.in_document = True
+
+  def handle_endtag(self, tag):
+    if tag == self.skipping:
+      self.skipping = None
+      return
+
+    if tag in self.open_tags:
+      self.flush()
+      del self.open_tags[len(self.open_tags) - 1 - self.open_tags[::-1].index(tag):]
+    elif not self.in_document and not "".join(self.pending).strip(BLANKS):
+      self.pending = list()
+      self.in_document = True
+
+  def handle_comment(self, data):
+    self.flush()
+
+  def handle_data(self, data):
+    if self.skipping:
+      return
+
+    if "\r" in data:
+      data = data.replace("\r\n", "\n").replace("\r", "\n")
+    self.pending.append(data)
+
+  def flush(self):
+    """
+    End the current text node
+    """
+
+    if not self.pending:
+      return
+
+    data = "".join(self.pending)
+    self.pending = list()
+
+    if not self.in_document:
+      data = data.lstrip(BLANKS)
+      if not data:
+        return
+      self.in_document = True
+    elif not data.strip(BLANKS):
+      data = "\n" if "\n" in data else " "
+
+    self.parts.append(data)
+
+  def close(self):
+    rawdata = self.rawdata
+    if len(rawdata) > 1 and rawdata[0] == "<" and (rawdata[1].isalpha() or rawdata[1] in "/!?"):
+      self.rawdata = ""  # unfinished tag, lxml drops it as well
+
+    super().close()
+    self.flush()
+
+  def get_text(self):
+    return "".join(self.parts)
+
+@lru_cache(maxsize=8192)
+def html_to_text(fragment):
+  """
+  Extract the text of an HTML fragment, memoized since diagrams repeat the
+  same fragments (separators, empty paragraphs, common members) many times
+
+  Parameters:
+    fragment: HTML fragment
+
+  Returns:
+    text: the text of the fragment
+  """
+
+  parser = HtmlTextExtractor()
+  parser.feed(fragment)
+  parser.close()
+
+  return parser.get_text()
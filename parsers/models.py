@@ -0,0 +1,232 @@
+import sys
+
+RELATIONSHIP_KINDS = ("implements", "extends", "association", "aggregation", "composition")
+
+class _Model:
+  """
+  Base of the slotted syntax tree models. Fields are plain attributes; for
+  code written against the dictionary syntax tree every model also reads and
+  writes like a dictionary of its fields, e.g. _class['name'] or
+  relationships['extends'], in the field order of the JSON syntax tree.
+  """
+
+  __slots__ = ()
+
+  def __getitem__(self, key):
+    if key in self.__slots__:
+      return getattr(self, key)
+    raise KeyError(key)
+
+  def __setitem__(self, key, value):
+    if key not in self.__slots__:
+      raise KeyError(key)
+    setattr(self, key, value)
+
+  def __contains__(self, key):
+    return key in self.__slots__
+
+  def __iter__(self):
+    return iter(self.__slots__)
+
+  def __len__(self):
+    return len(self.__slots__)
+
+  def get(self, key, default=None):
+    return getattr(self, key) if key in self.__slots__ else default
+
+  def setdefault(self, key, default=None):
+    # every field is always set, so this only reads
+    return self[key]
+
+  def keys(self):
+    return self.__slots__
+
+  def values(self):
+    return [getattr(self, field) for field in self.__slots__]
+
+  def items(self):
+    return [(field, getattr(self, field)) for field in self.__slots__]
+
+  def __eq__(self, other):
+    if isinstance(other, _Model):
+      return type(self) is type(other) and self.values() == other.values()
+    if isinstance(other, dict):
+      return self.to_dict() == other
+    return NotImplemented
+
+  __hash__ = None
+
+  def __repr__(self):
+    fields = ", ".join(f"{field}={getattr(self, field)!r}" for field in self.__slots__)
+    return f"{type(self).__name__}({fields})"
+
+  def __reduce__(self):
+    # the constructors take the fields in slot order, which keeps pickles small
+    return type(self), tuple(getattr(self, field) for field in self.__slots__)
+
+class Property(_Model):
+  """
+  Property of a class
+
+  Parameters:
+    access: access modifier, e.g. 'private'
+    name: name of the property
+    type: type of the property
+  """
+
+  __slots__ = ("access", "name", "type")
+
+  def __init__(self, access, name, type):
+    # access modifiers and types repeat across a model, share one string each
+    self.access = sys.intern(access)
+    self.name = name
+    self.type = sys.intern(type)
+
+  def to_dict(self):
+    return {'access': self.access, 'name': self.name, 'type': self.type}
+
+  @classmethod
+  def from_dict(cls, data):
+    return data if isinstance(data, cls) else cls(data['access'], data['name'], data['type'])
+
+class Method(_Model):
+  """
+  Method of a class
+
+  Parameters:
+    access: access modifier, e.g. 'public'
+    name: name of the method
+    return_type: return type of the method
+  """
+
+  __slots__ = ("access", "name", "return_type")
+
+  def __init__(self, access, name, return_type):
+    self.access = sys.intern(access)
+    self.name = name
+    self.return_type = sys.intern(return_type)
+
+  def to_dict(self):
+    return {'access': self.access, 'name': self.name, 'return_type': self.return_type}
+
+  @classmethod
+  def from_dict(cls, data):
+    return data if isinstance(data, cls) else cls(data['access'], data['name'], data['return_type'])
+
+class Relationships(_Model):
+  """
+  Relationships of a class, one list of class ids per kind, filled as the
+  per-class lists of the dictionary syntax tree (see SyntaxParser._add_relationships)
+  """
+
+  __slots__ = RELATIONSHIP_KINDS
+
+  def __init__(self, implements=None, extends=None, association=None, aggregation=None, composition=None):
+    self.implements = implements if implements is not None else []
+    self.extends = extends if extends is not None else []
+    self.association = association if association is not None else []
+    self.aggregation = aggregation if aggregation is not None else []
+    self.composition = composition if composition is not None else []
+
+  def to_dict(self):
+    return {kind: list(getattr(self, kind)) for kind in RELATIONSHIP_KINDS}
+
+  @classmethod
+  def from_dict(cls, data):
+    if isinstance(data, cls):
+      return data
+    return cls(*(list(data[kind]) for kind in RELATIONSHIP_KINDS))
+
+class Class(_Model):
+  """
+  Class, abstract class or interface of the syntax tree
+
+  Parameters:
+    type: 'class', 'abstract' or 'interface'
+    name: name of the class
+    properties: dictionary of member id to Property
+    methods: dictionary of member id to Method
+    relationships: Relationships of the class
+  """
+
+  __slots__ = ("type", "name", "properties", "methods", "relationships")
+
+  def __init__(self, type="class", name="", properties=None, methods=None, relationships=None):
+    self.type = type
+    self.name = name
+    self.properties = properties if properties is not None else {}
+    self.methods = methods if methods is not None else {}
+    self.relationships = relationships if relationships is not None else Relationships()
+
+  def to_dict(self):
+    return {
+      'type': self.type,
+      'name': self.name,
+      'properties': {key: _member_dict(p) for key, p in self.properties.items()},
+      'methods': {key: _member_dict(m) for key, m in self.methods.items()},
+      'relationships': Relationships.from_dict(self.relationships).to_dict()
+    }
+
+  @classmethod
+  def from_dict(cls, data):
+    if isinstance(data, cls):
+      return data
+    return cls(
+      data['type'],
+      data['name'],
+      {_member_key(key): Property.from_dict(p) for key, p in data['properties'].items()},
+      {_member_key(key): Method.from_dict(m) for key, m in data['methods'].items()},
+      Relationships.from_dict(data['relationships'])
+    )
+
+def _member_key(key):
+  # JSON turns the integer member ids into strings
+  return int(key) if isinstance(key, str) and key.isdigit() else key
+
+def _member_dict(member):
+  return member.to_dict() if isinstance(member, _Model) else dict(member)
+
+def from_syntax_tree_dict(syntax_tree):
+  """
+  Convert a dictionary syntax tree, as written to *_syntax_tree.json, to models
+
+  Parameters:
+    syntax_tree: dictionary of class id to class dictionary (or Class)
+
+  Returns:
+    syntax_tree: dictionary of class id to Class, member ids as integers
+  """
+
+  return {class_id: Class.from_dict(_class) for class_id, _class in syntax_tree.items()}
+
+def to_syntax_tree_dict(syntax_tree):
+  """
+  Convert a syntax tree of models back to the dictionary syntax tree
+
+  Parameters:
+    syntax_tree: dictionary of class id to Class (or class dictionary)
+
+  Returns:
+    syntax_tree: dictionary of class id to class dictionary, as in *_syntax_tree.json
+  """
+
+  return {
+    class_id: _class.to_dict() if isinstance(_class, Class) else Class.from_dict(_class).to_dict()
+    for class_id, _class in syntax_tree.items()
+  }
+
+def as_models(syntax_tree):
+  """
+  Return the syntax tree as models, converting a dictionary syntax tree
+
+  Parameters:
+    syntax_tree: dictionary of class id to Class or class dictionary
+
+  Returns:
+    syntax_tree: the same tree if it already holds models, a converted copy otherwise
+  """
+
+  if all(isinstance(_class, Class) for _class in syntax_tree.values()):
+    return syntax_tree
+
+  return from_syntax_tree_dict(syntax_tree)
@@ -0,0 +1,262 @@
+from collections import deque
+
+RELATIONSHIP_KINDS = ("implements", "extends", "association", "aggregation", "composition")
+INHERITANCE_KINDS = ("extends", "implements")
+
+class RelationshipGraph:
+  """
+  Index of the relationships of a syntax tree, built once per diagram.
+  An edge goes from the class whose relationship list holds an id to the
+  class of that id, so for implements and extends from the child to the
+  parent; association, aggregation and composition keep the direction of
+  the syntax tree lists as well. Every kind has a forward (outgoing) and a
+  reverse (incoming) adjacency index, so questions such as "who implements
+  X" do not scan the tree.
+  The syntax tree keeps its per-class relationship lists, the graph is an
+  index over them and is not updated when the tree changes afterwards.
+
+  Parameters:
+    syntax_tree: the syntax tree (class id -> Class, or class dictionary)
+  """
+
+  def __init__(self, syntax_tree):
+    self.names = {class_id: _class['name'] for class_id, _class in syntax_tree.items()}
+    self.__forward = {kind: dict() for kind in RELATIONSHIP_KINDS}
+    self.__reverse = {kind: dict() for kind in RELATIONSHIP_KINDS}
+    self.__by_name = dict()
+    self.__closures = {kind: dict() for kind in RELATIONSHIP_KINDS}
+
+    for class_id, _class in syntax_tree.items():
+      self.__by_name.setdefault(_class['name'], list()).append(class_id)
+      for kind, targets in _class['relationships'].items():
+        if not targets:
+          continue
+        forward = self.__forward.setdefault(kind, dict())
+        reverse = self.__reverse.setdefault(kind, dict())
+        forward[class_id] = tuple(targets)
+        for target in targets:
+          reverse.setdefault(target, list()).append(class_id)
+
+  def __contains__(self, class_id):
+    return class_id in self.names
+
+  def __len__(self):
+    return len(self.names)
+
+  def outgoing(self, class_id, kind):
+    """
+    Ids listed in the relationship list of a class, in the order of the syntax tree
+
+    Parameters:
+      class_id: id of the class
+      kind: relationship kind, e.g. 'implements'
+
+    Returns:
+      ids: tuple of class ids
+    """
+
+    return self.__forward.get(kind, {}).get(class_id, ())
+
+  def incoming(self, class_id, kind):
+    """
+    Ids of the classes whose relationship list holds the class
+
+    Parameters:
+      class_id: id of the class
+      kind: relationship kind, e.g. 'implements'
+
+    Returns:
+      ids: tuple of class ids, in syntax tree order
+    """
+
+    return tuple(self.__reverse.get(kind, {}).get(class_id, ()))
+
+  def edges(self, kind):
+    """
+    Every edge of a relationship kind
+
+    Returns:
+      edges: list of (class id, listed id) tuples, in syntax tree order
+    """
+
+    return [(class_id, target) for class_id, targets in self.__forward.get(kind, {}).items() for target in targets]
+
+  def find(self, name):
+    """
+    Ids of the classes with a name, several when a name is drawn more than once
+
+    Returns:
+      ids: list of class ids
+    """
+
+    return list(self.__by_name.get(name, ()))
+
+  def implementors(self, interface_id):
+    """
+    Classes and interfaces directly implementing an interface
+    """
+
+    return self.incoming(interface_id, 'implements')
+
+  def subclasses(self, class_id, transitive=True):
+    """
+    Classes extending a class
+
+    Parameters:
+      class_id: id of the class
+      transitive: also the subclasses of the subclasses, breadth first
+
+    Returns:
+      ids: tuple of class ids
+    """
+
+    if not transitive:
+      return self.incoming(class_id, 'extends')
+
+    return tuple(self._reach(class_id, ('extends',), self.__reverse))
+
+  def dependents(self, class_id, kinds=RELATIONSHIP_KINDS):
+    """
+    Every class that (transitively) lists the class under one of the kinds,
+    i.e. the classes affected by a change of the class
+
+    Parameters:
+      class_id: id of the class
+      kinds: relationship kinds to follow
+
+    Returns:
+      ids: tuple of class ids, breadth first
+    """
+
+    return tuple(self._reach(class_id, kinds, self.__reverse))
+
+  def closure(self, class_id, kind):
+    """
+    Transitive closure of a class along one kind, the class itself first
+    and then its parents depth first, each id once; cycles are cut where
+    they close. Closures are computed once and shared.
+
+    Parameters:
+      class_id: id of the class
+      kind: relationship kind, e.g. 'implements'
+
+    Returns:
+      closure: tuple of class ids
+    """
+
+    closures = self.__closures.setdefault(kind, dict())
+    closure = closures.get(class_id)
+    if closure is not None:
+      return closure
+
+    forward = self.__forward.get(kind, {})
+    result = list()
+    seen = set()
+    stack = [class_id]
+    while stack:
+      node = stack.pop()
+      if node in seen:
+        continue
+      known = closures.get(node)
+      if known is not None:
+        # the closure of a parent is already known, no need to descend into it
+        for i in known:
+          if i not in seen:
+            seen.add(i)
+            result.append(i)
+        continue
+      seen.add(node)
+      result.append(node)
+      stack.extend(reversed(forward.get(node, ())))
+
+    closure = closures[class_id] = tuple(result)
+    return closure
+
+  def topological_order(self, kinds=INHERITANCE_KINDS):
+    """
+    Order the classes so that every class comes after the classes it
+    lists under the kinds (for the default kinds: parents before children).
+    Ties keep the syntax tree order; classes on or behind a cycle cannot be
+    ordered and are appended at the end in syntax tree order.
+
+    Parameters:
+      kinds: relationship kinds to order by
+
+    Returns:
+      order: list of class ids
+    """
+
+    pending = dict.fromkeys(self.names, 0)
+    for kind in kinds:
+      for class_id, targets in self.__forward.get(kind, {}).items():
+        if class_id in pending:
+          pending[class_id] += sum(1 for target in targets if target in self.names)
+
+    ready = deque(class_id for class_id, count in pending.items() if count == 0)
+    order = list()
+    while ready:
+      class_id = ready.popleft()
+      order.append(class_id)
+      del pending[class_id]
+      for kind in kinds:
+        for child in self.__reverse.get(kind, {}).get(class_id, ()):
+          if child in pending:
+            pending[child] -= 1
+            if pending[child] == 0:
+              ready.append(child)
+
+    order.extend(pending)
+    return order
+
+  def cycles(self, kinds=INHERITANCE_KINDS):
+    """
+    Find the cycles along the kinds, searched depth first in syntax tree order
+
+    Parameters:
+      kinds: relationship kinds to follow
+
+    Returns:
+      cycles: list of cycles, each a list of class ids starting and ending with the same class
+    """
+
+    if isinstance(kinds, str):
+      kinds = (kinds,)
+
+    found = list()
+    done = set()
+    for start in self.names:
+      if start in done:
+        continue
+      path = [start]
+      on_path = {start}
+      stack = [iter(self._neighbours(start, kinds, self.__forward))]
+      while stack:
+        node = next(stack[-1], None)
+        if node is None:
+          stack.pop()
+          finished = path.pop()
+          on_path.discard(finished)
+          done.add(finished)
+          continue
+        if node in on_path:
+          found.append(path[path.index(node):] + [node])
+        elif node not in done and node in self.names:
+          path.append(node)
+          on_path.add(node)
+          stack.append(iter(self._neighbours(node, kinds, self.__forward)))
+
+    return found
+
+  def _neighbours(self, class_id, kinds, index):
+    for kind in kinds:
+      yield from index.get(kind, {}).get(class_id, ())
+
+  def _reach(self, class_id, kinds, index):
+    seen = {class_id}
+    queue = deque([class_id])
+    while queue:
+      for node in self._neighbours(queue.popleft(), kinds, index):
+        if node not in seen:
+          seen.add(node)
+          queue.append(node)
+          yield node
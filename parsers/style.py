@@ -0,0 +1,116 @@
+from functools import lru_cache
+
+class Style(dict):
+  """
+  Immutable, parsed draw.io style attribute. It still reads like the
+  dictionary of the style string, e.g. style['endArrow'], and carries
+  pre-normalized fields for the attributes the parsers look at, so they
+  are neither looked up nor lowercased again per cell.
+  Get instances through parse_style, which interns them: every cell using
+  the same style string shares one Style.
+
+  Parameters:
+    items: style key value pairs, the bare token (e.g. 'swimlane') under 'type'
+    raw: the style string the items were parsed from, None if unknown
+    html: the cell is an html class cell, used to re-intern on unpickling
+
+  Attributes:
+    type: the bare token, e.g. 'swimlane', None if there is none
+    type_lower: type in lowercase
+    end_arrow: endArrow in lowercase, None if not set
+    start_arrow: startArrow in lowercase, None if not set
+    end_fill: endFill is "1"
+    dashed: dashed is "1"
+    font_style: fontStyle, None if not set
+  """
+
+  __slots__ = ("raw", "html", "type", "type_lower", "end_arrow", "start_arrow", "end_fill", "dashed", "font_style")
+
+  def __init__(self, items=(), raw=None, html=False):
+    super().__init__(items)
+    set_field = object.__setattr__
+    set_field(self, "raw", raw)
+    set_field(self, "html", html)
+
+    style_type = dict.get(self, 'type')
+    end_arrow = dict.get(self, 'endArrow')
+    start_arrow = dict.get(self, 'startArrow')
+    end_fill = dict.get(self, 'endFill')
+
+    set_field(self, "type", style_type)
+    set_field(self, "type_lower", style_type.lower() if style_type is not None else None)
+    set_field(self, "end_arrow", end_arrow.lower() if end_arrow is not None else None)
+    set_field(self, "start_arrow", start_arrow.lower() if start_arrow is not None else None)
+    set_field(self, "end_fill", end_fill is not None and end_fill.lower() == "1")
+    set_field(self, "dashed", dict.get(self, 'dashed') == "1")
+    set_field(self, "font_style", dict.get(self, 'fontStyle'))
+
+  def _immutable(self, *args, **kwargs):
+    raise TypeError("Style is immutable, parse a new style string instead")
+
+  __setitem__ = __delitem__ = __setattr__ = __delattr__ = __ior__ = _immutable
+  update = pop = popitem = clear = setdefault = _immutable
+
+  def __reduce__(self):
+    if self.raw is not None:
+      # unpickle through the intern table rather than as a fresh copy
+      return (parse_style, (self.raw, self.html))
+    return (Style, (dict(self), None, self.html))
+
+  def __copy__(self):
+    return self
+
+  def __deepcopy__(self, memo):
+    return self
+
+  def __repr__(self):
+    return f"Style({dict.__repr__(self)})"
+
+def parse_style(style_attrs, html=False):
+  """
+  Parse and intern a style attribute
+
+  Parameters:
+    style_attrs: style attribute of the element, e.g. 'endArrow=block;endFill=0;html=1;'
+    html: mark the cell as an html class cell, which sets its type to 'html'
+
+  Returns:
+    style: the shared Style of the style string
+  """
+
+  # always call with both arguments, lru_cache keys on how it was called
+  return _parse_style(style_attrs, bool(html))
+
+@lru_cache(maxsize=4096)
+def _parse_style(style_attrs, html):
+  style_dict = dict()
+
+  for s in style_attrs.split(";"):
+    if "=" in s:
+      s_list = s.split("=")
+      style_dict[s_list[0]] = s_list[1]
+    else:
+      if s:
+        style_dict['type'] = s
+
+  if html:
+    style_dict['type'] = "html"
+
+  return Style(style_dict, style_attrs, html)
+
+def as_style(style):
+  """
+  Return the style as a Style, for style trees built elsewhere (e.g. loaded
+  from JSON) that hold plain dictionaries
+
+  Parameters:
+    style: Style or dictionary
+
+  Returns:
+    style: the Style
+  """
+
+  if isinstance(style, Style):
+    return style
+
+  return Style(style)
@@ -1,5 +1,10 @@
 from bs4 import BeautifulSoup as bs
 from collections import OrderedDict 
+from lxml import etree
+from parsers.html_text import html_to_text
+from parsers.style import parse_style
+from profiling.instrumentation import NULL_INSTRUMENTATION
+import itertools
 import re
 
 class StyleParser:
@@ -8,11 +13,24 @@ class StyleParser:
 
   Parameters: 
     di_xml: the decoded and decompressed DrawIO XML
+    engine: XML engine used to walk the cells; 'lxml' (default) or 'bs4'
+    incremental: keep the parse state update_style_tree needs to reuse this parse
+    instrumentation: optional Instrumentation recording the stage
   """
 
-  def __init__(self, di_xml):
+  ENGINES = ("lxml", "bs4")
+
+  def __init__(self, di_xml, engine="lxml", incremental=False, instrumentation=NULL_INSTRUMENTATION):
+    if engine not in self.ENGINES:
+      raise ValueError(f"unknown StyleParser engine '{engine}', expected one of {self.ENGINES}")
+
     self.di_xml = di_xml
+    self.engine = engine
+    self.incremental = incremental
+    self.instrumentation = instrumentation
     self.style_tree = None
+    self.root_index = None
+    self.parse_state = None
   
   def convert_to_style_tree(self):
     """
@@ -25,48 +43,256 @@ class StyleParser:
     print("<<< CONVERTING XML TO STYLE TREE >>>")
 
     try:
-      self.style_tree = dict()
-      graph_model = bs(self.di_xml, "lxml")
-      root = graph_model.find('root')
-      root_children = root.children
+      with self.instrumentation.stage("convert_to_style_tree") as record:
+        self._build_style_tree(None, self.incremental, record)
 
-      grandparent = None
-      root_parent = None
+      return self.style_tree
+    except Exception as e:
+      print(f"StyleParser.convert_to_style_tree ERROR: {e}") 
+      return False
 
-      relationship_list = list()
+  def update_style_tree(self, previous):
+    """
+    Convert the XML to a style tree, reusing the parse of an earlier version
+    of the diagram. mxCells are matched by id: only cells whose attributes
+    changed are parsed again, and only relationships that changed or whose
+    end points sit under a cell that was added, removed or re-parented are
+    resolved again. The result equals convert_to_style_tree on the same XML;
+    unchanged cells and relationships are shared with the previous tree.
+    Falls back to a full parse when previous holds no parse state (see
+    incremental). This parser keeps its state for the next update.
 
-      child = next(root_children, None)
-      while child:
-        child_attrs = child.attrs
-
-        if "parent" in child_attrs:
-          if child_attrs['parent'] == grandparent:  # found the root parent element
-            root_parent = child_attrs['id']
-            self.style_tree['root'] = self._add_root_parent(child_attrs)
-          elif "source" in child_attrs or "target" in child_attrs:  # found a relationship element
-            if "source" not in child_attrs:  
-              print(f"'source' not present in {child_attrs['id']} relationship")
-            elif "target" not in child_attrs:
-              print(f"'target' not present in {child_attrs['id']} relationship")              
-            else:
-              relationship_list.append(child_attrs)
-          else:  # found a cell element
-            self.style_tree['root']['cells'][child_attrs['id']] = self._add_cells(child_attrs, root_parent)
-        else:  # found the grandparent element  
-          if grandparent is None:
-            grandparent = child_attrs['id']
-
-        child = next(root_children, None)
-      
-      # need to process the relationships at the end to get the right source and target
-      for child_attrs in relationship_list:
-        self.style_tree['root']['relationships'][child_attrs['id']] = self._add_relationships(child_attrs, root_parent)
+    Parameters:
+      previous: StyleParser that converted (or updated) the earlier XML
+
+    Returns:
+      style_tree: dictionary of the extracted elements from the XML
+    """
+
+    print("<<< UPDATING STYLE TREE >>>")
+
+    state = None
+    if previous is not None and previous.style_tree and previous.engine == self.engine:
+      state = previous.parse_state
+
+    try:
+      with self.instrumentation.stage("update_style_tree") as record:
+        self._build_style_tree(state, True, record)
 
       return self.style_tree
     except Exception as e:
-      print(f"StyleParser.convert_to_style_tree ERROR: {e}") 
+      print(f"StyleParser.update_style_tree ERROR: {e}")
       return False
-  
+
+  def _build_style_tree(self, previous, keep_state, record):
+    """
+    Build the style tree into self.style_tree and keep the parse state
+    (attribute signatures, root parent, root-ancestor index) for the next update
+
+    Parameters:
+      previous: parse_state of the earlier parse, None for a full parse
+      keep_state: keep the parse state for a later update
+      record: instrumentation record of the stage
+    """
+
+    self.style_tree = dict()
+    self.parse_state = None
+
+    grandparent = None
+    root_parent = None
+
+    relationship_list = list()
+    cell_signatures = dict()
+    reparsed = list()
+
+    for child_attrs in self._iter_cell_attrs():
+      if "parent" in child_attrs:
+        if child_attrs['parent'] == grandparent:  # found the root parent element
+          root_parent = child_attrs['id']
+          self.style_tree['root'] = self._add_root_parent(child_attrs)
+        elif "source" in child_attrs or "target" in child_attrs:  # found a relationship element
+          if "source" not in child_attrs:  
+            print(f"'source' not present in {child_attrs['id']} relationship")
+          elif "target" not in child_attrs:
+            print(f"'target' not present in {child_attrs['id']} relationship")              
+          else:
+            relationship_list.append(child_attrs)
+        else:  # found a cell element
+          # a cell only depends on its attributes and the root parent
+          cell_id = child_attrs['id']
+          cell = None
+          if (
+            previous is not None and previous['root_parent'] == root_parent
+            and previous['cell_signatures'].get(cell_id) == child_attrs
+          ):
+            cell = previous['cells'].get(cell_id)
+          if cell is None:
+            cell = self._add_cells(child_attrs, root_parent)
+            reparsed.append(cell_id)
+          self.style_tree['root']['cells'][cell_id] = cell
+          if keep_state:
+            cell_signatures[cell_id] = child_attrs
+      else:  # found the grandparent element  
+        if grandparent is None:
+          grandparent = child_attrs['id']
+
+    if previous is not None and previous['root_parent'] != root_parent:
+      previous = None
+
+    # need to process the relationships at the end to get the right source and target
+    if previous is not None:
+      affected = self._affected_ancestors(previous, reparsed)
+      if affected:
+        self.root_index = {
+          cell_id: ancestor for cell_id, ancestor in previous['root_index'].items() if ancestor not in affected
+        }
+      else:
+        self.root_index = dict(previous['root_index'])
+    else:
+      affected = None
+      self.root_index = dict()
+
+    relationship_signatures = dict()
+    resolved = 0
+    for child_attrs in relationship_list:
+      relationship_id = child_attrs['id']
+      relationship = None
+      if previous is not None and previous['relationship_signatures'].get(relationship_id) == child_attrs:
+        relationship = previous['relationships'].get(relationship_id)
+        if relationship is not None and (relationship['source'] in affected or relationship['target'] in affected):
+          relationship = None
+
+      if relationship is None:
+        resolved += 1
+        try:
+          relationship = self._add_relationships(child_attrs, root_parent, self.root_index)
+        except ValueError as e:
+          print(f"StyleParser: skipping relationship '{relationship_id}', {e}")
+          continue
+
+      self.style_tree['root']['relationships'][relationship_id] = relationship
+      if keep_state:
+        relationship_signatures[relationship_id] = child_attrs
+
+    if keep_state:
+      self.parse_state = {
+        'root_parent': root_parent,
+        'cells': self.style_tree['root']['cells'],
+        'relationships': self.style_tree['root']['relationships'],
+        'cell_signatures': cell_signatures,
+        'relationship_signatures': relationship_signatures,
+        'root_index': self.root_index
+      }
+
+    record.count('cells', len(self.style_tree['root']['cells']))
+    record.count('relationships', len(self.style_tree['root']['relationships']))
+    record.count('cells_parsed', len(reparsed))
+    record.count('relationships_resolved', resolved)
+
+  def _affected_ancestors(self, previous, reparsed):
+    """
+    Find the top level cells whose subtree changed shape since the previous
+    parse, i.e. that contained a cell which was removed or got a new parent.
+    Relationships ending under any other top level cell resolve as before.
+
+    Parameters:
+      previous: parse_state of the earlier parse
+      reparsed: ids of the cells parsed again, the others kept their parent
+
+    Returns:
+      affected: set of top level cell ids of the earlier parse
+    """
+
+    old_cells = previous['cells']
+    new_cells = self.style_tree['root']['cells']
+    root_parent = previous['root_parent']
+    root_index = previous['root_index']
+
+    # cells of the earlier parse that are gone, only looked for when the counts say there are some
+    added = sum(1 for cell_id in set(reparsed) if cell_id not in old_cells)
+    removed = old_cells.keys() - new_cells.keys() if len(new_cells) - added < len(old_cells) else ()
+
+    affected = set()
+    for cell_id in itertools.chain(reparsed, removed):
+      cell = old_cells.get(cell_id)
+      if cell is None:  # a new cell
+        continue
+      new_cell = new_cells.get(cell_id)
+      if new_cell is not None and new_cell['parent_id'] == cell['parent_id']:
+        continue
+
+      # walk up the earlier tree; a broken chain had no resolved relationship under it
+      current = cell_id
+      seen = set()
+      while current in old_cells and current not in seen:
+        if current in root_index:
+          affected.add(root_index[current])
+          break
+        parent = old_cells[current]['parent_id']
+        if parent == root_parent:
+          affected.add(current)
+          break
+        seen.add(current)
+        current = parent
+
+    return affected
+
+  def _iter_cell_attrs(self):
+    """
+    Parse the XML with the selected engine, falling back to bs4 when lxml
+    cannot read it
+
+    Returns:
+      iterator: attributes (dictionary) of each child element of <root>
+    """
+
+    if self.engine == "lxml":
+      try:
+        graph_model = etree.fromstring(self.di_xml.encode("utf8"))
+        return self._iter_cell_attrs_lxml(graph_model)
+      except etree.XMLSyntaxError as e:
+        print(f"StyleParser: lxml could not parse the XML ({e}), falling back to bs4")
+
+    return self._iter_cell_attrs_bs4(bs(self.di_xml, "lxml"))
+
+  def _iter_cell_attrs_lxml(self, graph_model):
+    """
+    Walk the children of <root> with lxml.etree
+
+    Parameters:
+      graph_model: parsed lxml element of the XML
+
+    Returns:
+      generator: attributes (dictionary) of each child element of <root>
+    """
+
+    root = next(graph_model.iter('root'), None)
+    if root is None:
+      raise ValueError("no <root> element found in the XML")
+
+    for child in root:
+      if isinstance(child.tag, str):  # skip comments and processing instructions
+        yield dict(child.attrib)
+
+  def _iter_cell_attrs_bs4(self, graph_model):
+    """
+    Walk the children of <root> with BeautifulSoup
+
+    Parameters:
+      graph_model: parsed BeautifulSoup document of the XML
+
+    Returns:
+      generator: attributes (dictionary) of each child element of <root>
+    """
+
+    root = graph_model.find('root')
+    root_children = root.children
+
+    child = next(root_children, None)
+    while child:
+      yield child.attrs
+      child = next(root_children, None)
+
   def _add_root_parent(self, attrs):
     """
     Format dictionary for the root parent
@@ -85,30 +311,21 @@ class StyleParser:
       'relationships': dict()
     }
   
-  def _add_relationships(self, attrs, root_parent):
+  def _add_relationships(self, attrs, root_parent, root_index):
     """
     Format dictionary for the relationships
 
     Parameters:
       attrs: the relationship element attributes
-      tree: the style tree, needed to find the parent target
       root_parent: the id of the root parent element 
+      root_index: root-ancestor index shared by all the relationships of the diagram
 
     Returns:
       root_parent_dict: dictionary containing id, parent_id, cells, connections 
     """
 
-    source = attrs['source']
-    parent_source = self.style_tree['root']['cells'][source]['parent_id']
-    while parent_source != root_parent:
-      source = parent_source
-      parent_source = self.style_tree['root']['cells'][source]['parent_id']
-    
-    target = attrs['target']
-    parent_target = self.style_tree['root']['cells'][target]['parent_id']
-    while parent_target != root_parent:
-      target = parent_target
-      parent_target = self.style_tree['root']['cells'][target]['parent_id']
+    source = self._find_root_ancestor(attrs['source'], root_parent, root_index, "source")
+    target = self._find_root_ancestor(attrs['target'], root_parent, root_index, "target")
 
     style = self._get_style(attrs['style'])
 
@@ -119,6 +336,49 @@ class StyleParser:
       'target': target,
       'style': style
     }
+
+  def _find_root_ancestor(self, cell_id, root_parent, root_index, end):
+    """
+    Find the ancestor of a cell that sits directly under the root parent,
+    recording the result for every cell on the walked path (path compression)
+
+    Parameters:
+      cell_id: id of the relationship end point
+      root_parent: the id of the root parent element 
+      root_index: dictionary of cell id to root ancestor id, updated in place
+      end: 'source' or 'target', used in the diagnostics
+
+    Returns:
+      ancestor_id: id of the top level cell containing cell_id
+    """
+
+    cells = self.style_tree['root']['cells']
+    path = list()
+    seen = set()
+
+    current = cell_id
+    while current not in root_index:
+      if current not in cells:
+        if current == cell_id:
+          raise ValueError(f"{end} '{cell_id}' is not a cell of the diagram")
+        raise ValueError(f"{end} '{cell_id}' reaches the dangling parent id '{current}'")
+      if current in seen:
+        raise ValueError(f"{end} '{cell_id}' has a cycle in its parent ids at '{current}'")
+      seen.add(current)
+
+      parent = cells[current]['parent_id']
+      if parent == root_parent:
+        root_index[current] = current
+        break
+
+      path.append(current)
+      current = parent
+
+    ancestor = root_index[current]
+    for cell in path:
+      root_index[cell] = ancestor
+
+    return ancestor
   
   def _add_cells(self, attrs, root_parent):
     """
@@ -140,13 +400,12 @@ class StyleParser:
       'style': style
     }
 
-    if "type" not in style.keys() and attrs['parent'] == root_parent: # cell design is html
-      style['type'] = "html"
+    if style.type is None and attrs['parent'] == root_parent: # cell design is html
+      cell_result['style'] = parse_style(attrs['style'], html=True)
       split_values = re.sub("<hr .*?>", "\n<hr>\n", value).lstrip("\n").split("\n")
       cell_result['values'] = [
-        self._get_text_values(bs(val, 'lxml').text) for val in split_values if val != "<hr>"
+        self._get_text_values(html_to_text(val)) for val in split_values if val != "<hr>"
       ]
-      cell_result['style']['type'] = "html"
     else:
       cell_result['values'] = self._get_text_values(value)
  
@@ -179,24 +438,14 @@ class StyleParser:
 
   def _get_style(self, style_attrs):
     """
-    Convert the style attribute to a dictionary
+    Convert the style attribute to a dictionary, parsed once per distinct
+    style string and shared between the cells using it
 
     Parameters:
       style_attrs: style attributes of the element  
 
     Returns:
-      style_dict: style attribute as a dictionary 
+      style: style attribute as an immutable Style dictionary
     """
 
-    style_list = style_attrs.split(";")
-    style_dict = dict()
-
-    for s in style_list:
-      if "=" in s:
-        s_list = s.split("=")
-        style_dict[s_list[0]] = s_list[1]
-      else:
-        if s:
-          style_dict['type'] = s
-
-    return style_dict
+    return parse_style(style_attrs)
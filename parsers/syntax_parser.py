@@ -1,59 +1,85 @@
+from parsers.models import RELATIONSHIP_KINDS, Class, Method, Property
+from parsers.style import as_style
+from profiling.instrumentation import NULL_INSTRUMENTATION
+
 class SyntaxParser:
   """
   Parse the style tree into the syntax tree
 
   Parameters: 
     style_tree: style tree of the drawio file
+    models: return the syntax tree as Class models (see parsers/models.py) instead
+      of dictionaries
+    instrumentation: optional Instrumentation recording the stage
   """
 
-  def __init__(self, style_tree):
+  def __init__(self, style_tree, models=False, instrumentation=NULL_INSTRUMENTATION):
     self.style_tree = style_tree
+    self.models = models
+    self.instrumentation = instrumentation
+    # the dictionary tree is built directly, both read the same through subscripts
+    self.__class = Class if models else _class_dict
+    self.__property = Property if models else _property_dict
+    self.__method = Method if models else _method_dict
 
   def convert_to_sytax_tree(self):
     """
-    Convert the style tree to sytnax tree
+    Convert the style tree to sytnax tree. Cells nested below a member row
+    are not part of a class body and are skipped
 
     Returns:
-      syntax_tree: the syntax tree that is used by the generators  
+      syntax_tree: the syntax tree that is used by the generators, class id to
+        Class with models and to the class dictionary otherwise
     """
 
     print("<<< CONVERTING STYLE TREE TO SYNTAX TREE >>>")    
 
     try:
-      syntax_tree = dict()
-      cells = self.style_tree['root']['cells']
-      relationships = self.style_tree['root']['relationships']
-      parent = self.style_tree['root']['id']
-
-      propertiesDone = False
-
-      _id = 0
-      for key, value in cells.items():
+      with self.instrumentation.stage("convert_to_sytax_tree") as record:
+        syntax_tree = dict()
+        cells = self.style_tree['root']['cells']
+        relationships = self.style_tree['root']['relationships']
+        parent = self.style_tree['root']['id']
+
+        propertiesDone = False
+
+        _id = 0
+        for key, value in cells.items():
+          parent_id = value['parent_id']
+          style = as_style(value['style'])
         
-        if value['parent_id'] in relationships.keys() or "endArrow" in value['style'].keys():  
-          # skip the label for relationships
-          continue
-
-        if value['parent_id'] == parent and value['style']['type'].lower() == 'swimlane' or value['style']['type'].lower() == 'html':
-          # start of a new cell 
-          syntax_tree[key] = self._tree_template(value)
-          propertiesDone = False
-          _id = 0
-        else:
-          # properties and methods in the cell 
-          if value['style']['type'].lower() == 'line' and value['parent_id'] in syntax_tree.keys():  # line seperating the properties and methods
+          if parent_id in relationships or style.end_arrow is not None:  
+            # skip the label for relationships
+            continue
+
+          cell_type = style.type_lower
+          if parent_id == parent and cell_type == 'swimlane' or cell_type == 'html':
+            # start of a new cell 
+            syntax_tree[key] = self._tree_template(value)
+            propertiesDone = False
+            _id = 0
+          elif parent_id not in syntax_tree:
+            # nested deeper than a member row, not part of the class body
+            continue
+          elif cell_type == 'line':  # line seperating the properties and methods
             propertiesDone = True
             _id = 0
           else:
+            # properties and methods in the cell, merged in place
             if not propertiesDone:  # properties
-              syntax_tree[value['parent_id']]['properties'] = {**syntax_tree[value['parent_id']]['properties'], **self._properties_template(value, _id)}
-              _id += len(value['values'])
+              members = syntax_tree[parent_id]['properties']
+              members.update(self._properties_template(value, _id))
             else: # methods
-              syntax_tree[value['parent_id']]['methods'] = {**syntax_tree[value['parent_id']]['methods'], **self._methods_template(value, _id)}
-              _id += len(value['values'])
+              members = syntax_tree[parent_id]['methods']
+              members.update(self._methods_template(value, _id))
+            _id += len(value['values'])
 
-      for relationship in relationships.keys():
-        self._add_relationships(syntax_tree, relationships[relationship])
+        for relationship in relationships.values():
+          self._add_relationships(syntax_tree, relationship)
+
+        record.count('classes', len(syntax_tree))
+        record.count('members', sum(len(c['properties']) + len(c['methods']) for c in syntax_tree.values()))
+        record.count('relationships', len(relationships))
 
       return syntax_tree
     except Exception as e:
@@ -67,24 +93,13 @@ class SyntaxParser:
       main_cell: the starting, parent cell
     
     Returns:
-      template: the starting template (dictionary)
+      template: the starting template (Class, or its dictionary)
     """
 
-    template =  {
-      'type': "class",
-      'name': main_cell['values'][0] if len(main_cell['values']) > 0 else "",
-      'properties': {},
-      'methods': {},
-      'relationships': {
-        'implements': [],
-        'extends': [],
-        'association': [],
-        'aggregation': [],
-        'composition': []
-      }
-    }
+    template = self.__class("class", main_cell['values'][0] if len(main_cell['values']) > 0 else "")
 
-    if main_cell['style']['type'] == "html":
+    style = as_style(main_cell['style'])
+    if style.type == "html":
       values_length = len(main_cell['values'])
       name = main_cell['values'][0] if values_length > 0 else None
       properties = {'values': main_cell['values'][1] if values_length > 1 else None}
@@ -95,7 +110,7 @@ class SyntaxParser:
       template['methods'] = self._methods_template(methods, 0) if not None else []
       
 
-    if "fontStyle" in main_cell['style'] and main_cell['style']['fontStyle'] == "2": 
+    if style.font_style == "2": 
       # if the fontStyle is italic, then it is an abstract class
       template['type'] = "abstract"
     elif template['name'].lower().startswith("<<interface>>"):
@@ -113,7 +128,7 @@ class SyntaxParser:
       _id: id for the keys in the dictionary
     
     Returns:
-      template: the properties tempate (dictionary) 
+      template: the properties tempate (dictionary of Property, or of their dictionaries) 
     """
 
     values = property_dict['values']
@@ -129,11 +144,11 @@ class SyntaxParser:
       access_modifier_symbol = val[0]
       temp_val = val[1:].split(":")
 
-      template[_id] = {
-        'access': self._get_access_modifier(access_modifier_symbol),
-        'name': temp_val[0].strip(),
-        'type': temp_val[1].strip(),
-      }
+      template[_id] = self.__property(
+        self._get_access_modifier(access_modifier_symbol),
+        temp_val[0].strip(),
+        temp_val[1].strip()
+      )
 
     return template
   
@@ -146,7 +161,7 @@ class SyntaxParser:
       _id: id for the keys in the dictionary
     
     Returns:
-      template: the methods tempate (dictionary) 
+      template: the methods tempate (dictionary of Method, or of their dictionaries) 
     """
     
     values = method_dict['values']
@@ -162,11 +177,11 @@ class SyntaxParser:
       access_modifier_symbol = val[0]
       temp_val = val[1:].split(":")
 
-      template[_id] = {
-        'access': self._get_access_modifier(access_modifier_symbol),
-        'name': temp_val[0].strip(),
-        'return_type': temp_val[1].strip() if len(temp_val) > 1 else "void",
-      }
+      template[_id] = self.__method(
+        self._get_access_modifier(access_modifier_symbol),
+        temp_val[0].strip(),
+        temp_val[1].strip() if len(temp_val) > 1 else "void"
+      )
 
     return template
   
@@ -194,32 +209,50 @@ class SyntaxParser:
     Add the relationship for the cells in the syntax tree
 
     Parameters:
-      syntax_tree: the syntax_tree dictionary
+      syntax_tree: the syntax tree being built, class id to Class or class dictionary
       relationship: relationship to be added to the syntax tree
     """
     
     source = relationship['source']
     target = relationship['target']
-    style = relationship['style']
+    style = as_style(relationship['style'])
 
     source_cell = syntax_tree[source]
     target_cell = syntax_tree[target]
 
-    if "endArrow" in style.keys() and (style['endArrow'].lower() == "block" or style['endArrow'].lower() == "none"):
-      if style['endArrow'].lower() == "none" or style['endFill'].lower() == "1":
+    end_arrow = style.end_arrow
+    start_arrow = style.start_arrow
+
+    if end_arrow == "block" or end_arrow == "none":
+      if end_arrow == "none" or style.end_fill:
         # association
-        target_cell['relationships']['association'] += [source]
-      elif "dashed" in style.keys() and style['dashed'] == "1":
+        target_cell['relationships']['association'].append(source)
+      elif style.dashed:
         # implements 
-        source_cell['relationships']['implements'] += [target]        
+        source_cell['relationships']['implements'].append(target)
       else:
         # extends 
-        source_cell['relationships']['extends'] += [target]        
-    elif ("endArrow" in style.keys() and style['endArrow'].lower() == "diamondthin") or \
-      ("startArrow" in style.keys() and style['startArrow'].lower() == "diamondthin"):
-      if  "endFill" in style.keys() and style['endFill'] == "1":
+        source_cell['relationships']['extends'].append(target)
+    elif end_arrow == "diamondthin" or start_arrow == "diamondthin":
+      if style.end_fill:
         # composition
-        target_cell['relationships']['composition'] += [source]        
+        target_cell['relationships']['composition'].append(source)
       else: 
         # aggregation 
-        target_cell['relationships']['aggregation'] += [source]        
+        target_cell['relationships']['aggregation'].append(source)
+
+def _class_dict(type="class", name=""):
+  # the dictionary forms of the models, in the field order of their to_dict
+  return {
+    'type': type,
+    'name': name,
+    'properties': {},
+    'methods': {},
+    'relationships': {kind: [] for kind in RELATIONSHIP_KINDS}
+  }
+
+def _property_dict(access, name, type):
+  return {'access': access, 'name': name, 'type': type}
+
+def _method_dict(access, name, return_type):
+  return {'access': access, 'name': name, 'return_type': return_type}
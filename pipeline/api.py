@@ -0,0 +1,78 @@
+import itertools
+from decode.convert_to_readable import DecodeAndDecompress
+from parsers.style_parser import StyleParser
+from parsers.models import to_syntax_tree_dict
+from parsers.syntax_parser import SyntaxParser
+from generators.java_generator import JavaCodeGenerator
+from pipeline.multipage import merge_syntax_trees, parse_pages
+from profiling.instrumentation import NULL_INSTRUMENTATION
+
+
+def generate_sources(
+    drawio, all_pages=False, include_trees=False, max_decompressed_size=None,
+    page_workers=1, instrumentation=NULL_INSTRUMENTATION
+):
+    """
+    Generate the Java sources of a diagram in memory, without touching the filesystem
+
+    Parameters:
+        drawio: raw contents of the .drawio file (bytes or str) or a binary file object
+        all_pages: merge every page into one model instead of reading the first one
+        include_trees: also return the decoded XML, style tree and syntax tree
+        max_decompressed_size: optional cap, in bytes, on each inflated page
+        page_workers: number of worker processes parsing the pages with all_pages
+        instrumentation: optional Instrumentation recording the stages
+
+    Returns:
+        result: dictionary containing sources (class name -> Java source) and
+            collisions (see merge_syntax_trees); with include_trees also xml,
+            style_tree, syntax_tree (in its dictionary form) and relationship_graph,
+            one xml and style tree per page with all_pages
+    """
+
+    if isinstance(drawio, str):
+        drawio = drawio.encode("utf8")
+
+    with instrumentation.stage("read_payload") as record:
+        payloads = DecodeAndDecompress.iter_payloads(drawio)
+        pages = list(payloads if all_pages else itertools.islice(payloads, 1))
+        if not pages:
+            raise ValueError("no <diagram> element found")
+        record.count('pages', len(pages))
+
+    collisions = list()
+    if all_pages:
+        parsed = parse_pages(pages, page_workers, max_decompressed_size=max_decompressed_size)
+        for page in parsed:
+            if page['error']:
+                raise ValueError(f"page '{page['name'] or page['id']}': {page['error']}")
+
+        with instrumentation.stage("merge_pages"):
+            syntax_tree, collisions = merge_syntax_trees(parsed)
+        decoded_xml = [page['xml'] for page in parsed]
+        style_tree = [page['style_tree'] for page in parsed]
+    else:
+        with instrumentation.stage("decode") as record:
+            decoded_xml = DecodeAndDecompress.decode_payload(pages[0]['payload'], max_decompressed_size)
+            record.count('xml_bytes', len(decoded_xml))
+
+        style_tree = StyleParser(decoded_xml, instrumentation=instrumentation).convert_to_style_tree()
+        if style_tree is False:
+            raise ValueError("could not build the style tree")
+
+        syntax_tree = SyntaxParser(style_tree, models=True, instrumentation=instrumentation).convert_to_sytax_tree()
+        if syntax_tree is None:
+            raise ValueError("could not build the syntax tree")
+
+    java_code_gen = JavaCodeGenerator(syntax_tree, None, instrumentation=instrumentation)
+    if not java_code_gen.generate_code():
+        raise ValueError("could not generate the Java code")
+
+    result = {'sources': java_code_gen.get_sources(), 'collisions': collisions}
+    if include_trees:
+        result['xml'] = decoded_xml
+        result['style_tree'] = style_tree
+        result['syntax_tree'] = to_syntax_tree_dict(syntax_tree)
+        result['relationship_graph'] = java_code_gen.get_relationship_graph()
+
+    return result
@@ -0,0 +1,241 @@
+import hashlib
+import os
+import pickle
+import time
+import zlib
+from version import OUTPUT_STAMP
+
+DEFAULT_CACHE_DIR = os.path.join(
+    os.environ.get("XDG_CACHE_HOME", os.path.join(os.path.expanduser("~"), ".cache")),
+    "java_code_generator"
+)
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+
+class DiagramCache:
+    """
+    On-disk cache of the decoded XML, style tree and syntax tree of a diagram,
+    keyed by a hash of the raw <diagram> payload and the output stamp of
+    the tool (see version.py).
+    Entries are pickled and zlib compressed; the least recently used entries
+    are evicted once the cache grows past max_bytes. Temporary files count
+    towards the size, and the ones left by a writer killed before its rename
+    are removed once they are STALE_TEMP_SECONDS old.
+
+    Parameters:
+        cache_dir: directory holding the cache entries
+        max_bytes: size bound of the cache directory
+    """
+
+    ENTRY_SUFFIX = ".bin"
+    OUTPUT_SUFFIX = ".out"
+    TEMP_SUFFIX = ".tmp"
+    STALE_TEMP_SECONDS = 60 * 60
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+
+    @staticmethod
+    def key(payload):
+        """
+        Cache key for a diagram
+
+        Parameters:
+            payload: raw text of the <diagram> element
+
+        Returns:
+            key: hex digest of the output stamp and the payload
+        """
+
+        digest = hashlib.sha256(f"{OUTPUT_STAMP}\0".encode("utf8"))
+        digest.update(payload.encode("utf8"))
+        return digest.hexdigest()
+
+    def get(self, key):
+        """
+        Load a cache entry and mark it as recently used
+
+        Parameters:
+            key: cache key of the diagram
+
+        Returns:
+            entry: dictionary containing xml, style_tree, syntax_tree or None on a miss
+        """
+
+        return self._read(key + self.ENTRY_SUFFIX)
+
+    def put(self, key, xml, style_tree, syntax_tree):
+        """
+        Store a cache entry
+
+        Parameters:
+            key: cache key of the diagram
+            xml: decoded XML
+            style_tree: style tree of the diagram
+            syntax_tree: syntax tree of the diagram
+        """
+
+        entry = {'xml': xml, 'style_tree': style_tree, 'syntax_tree': syntax_tree}
+        self._write(key + self.ENTRY_SUFFIX, entry)
+
+    def outputs_match(self, key, output_dir):
+        """
+        Check if output_dir still holds exactly what was generated for key
+
+        Parameters:
+            key: cache key of the diagram
+            output_dir: directory the code was generated into, or the path of
+                the single file (archive) it was generated into
+
+        Returns:
+            boolean: True if every recorded file is present and unchanged
+        """
+
+        record = self._read(self._output_name(key, output_dir))
+        if record is None:
+            return False
+
+        for file_name, (size, digest) in record.items():
+            path = os.path.join(output_dir, file_name) if file_name else output_dir
+            try:
+                if os.path.getsize(path) != size:
+                    return False
+                with open(path, "rb") as f:
+                    if hashlib.sha256(f.read()).hexdigest() != digest:
+                        return False
+            except OSError:
+                return False
+
+        return True
+
+    def put_outputs(self, key, output_dir, files):
+        """
+        Record the files generated for key into output_dir
+
+        Parameters:
+            key: cache key of the diagram
+            output_dir: directory the code was generated into, or the path of a single output file
+            files: list of [file_name, contents] pairs, contents as str or bytes;
+                a single ["", contents] pair when output_dir is a file
+        """
+
+        record = dict()
+        for file_name, contents in files:
+            data = contents.encode("utf8") if isinstance(contents, str) else contents
+            record[file_name] = (len(data), hashlib.sha256(data).hexdigest())
+
+        self.put_output_digests(key, output_dir, record)
+
+    def put_output_digests(self, key, output_dir, digests):
+        """
+        Record the files generated for key into output_dir by their size and
+        digest, for generators that did not keep the contents
+
+        Parameters:
+            key: cache key of the diagram
+            output_dir: directory the code was generated into
+            digests: dictionary of file name to (size, sha256 hex digest)
+        """
+
+        self._write(self._output_name(key, output_dir), dict(digests))
+
+    def clear(self):
+        """
+        Remove every cache entry
+
+        Returns:
+            removed: number of files removed
+        """
+
+        removed = 0
+        for entry in self._entries():
+            try:
+                os.remove(entry.path)
+                removed += 1
+            except OSError:
+                pass
+
+        return removed
+
+    def _output_name(self, key, output_dir):
+        output_key = hashlib.sha256(f"{key}\0{os.path.abspath(output_dir)}".encode("utf8"))
+        return output_key.hexdigest() + self.OUTPUT_SUFFIX
+
+    def _entries(self):
+        try:
+            with os.scandir(self.cache_dir) as it:
+                return [
+                    e for e in it
+                    if e.is_file() and e.name.endswith((self.ENTRY_SUFFIX, self.OUTPUT_SUFFIX, self.TEMP_SUFFIX))
+                ]
+        except FileNotFoundError:
+            return []
+
+    def _read(self, name):
+        path = os.path.join(self.cache_dir, name)
+        try:
+            with open(path, "rb") as f:
+                data = pickle.loads(zlib.decompress(f.read()))
+            os.utime(path)  # mark as recently used
+            return data
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            print(f"DiagramCache: dropping unreadable entry {name} ({e})")
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            return None
+
+    def _write(self, name, data):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        path = os.path.join(self.cache_dir, name)
+        temp_path = f"{path}.{os.getpid()}{self.TEMP_SUFFIX}"
+
+        try:
+            with open(temp_path, "wb") as f:
+                f.write(zlib.compress(pickle.dumps(data, pickle.HIGHEST_PROTOCOL)))
+            os.replace(temp_path, path)
+        except BaseException:
+            try:
+                os.remove(temp_path)
+            except OSError:
+                pass
+            raise
+
+        self._evict()
+
+    def _evict(self):
+        entries = list()
+        total = 0
+        now = time.time()
+        for entry in self._entries():
+            try:
+                stat = entry.stat()
+            except OSError:
+                continue
+            if entry.name.endswith(self.TEMP_SUFFIX):
+                if now - stat.st_mtime > self.STALE_TEMP_SECONDS:
+                    # left behind by a writer killed between its write and rename
+                    try:
+                        os.remove(entry.path)
+                    except OSError:
+                        pass
+                else:
+                    # another process may still be writing it, only count it
+                    total += stat.st_size
+                continue
+            entries.append((stat.st_mtime, stat.st_size, entry.path))
+            total += stat.st_size
+
+        entries.sort()
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+                total -= size
+            except OSError:
+                pass
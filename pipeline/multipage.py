@@ -0,0 +1,169 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from decode.convert_to_readable import DecodeAndDecompress
+from parsers.models import Class, Relationships, as_models
+from parsers.style_parser import StyleParser
+from parsers.syntax_parser import SyntaxParser
+from profiling.instrumentation import NULL_INSTRUMENTATION, Instrumentation
+
+
+def parse_page(page, max_decompressed_size=None, profile=False):
+    """
+    Decode one page and build its style and syntax trees
+
+    Parameters:
+        page: dictionary containing id, name and payload of a <diagram>
+        max_decompressed_size: optional cap, in bytes, on the inflated page
+        profile: record the stages of the page
+
+    Returns:
+        result: dictionary containing id, name, xml, style_tree, syntax_tree, error, profile
+    """
+
+    instrumentation = Instrumentation(label=page['name'] or page['id']) if profile else NULL_INSTRUMENTATION
+    result = {
+        'id': page['id'],
+        'name': page['name'],
+        'xml': None,
+        'style_tree': None,
+        'syntax_tree': None,
+        'error': None,
+        'profile': None
+    }
+
+    try:
+        with instrumentation.stage("decode") as record:
+            result['xml'] = DecodeAndDecompress.decode_payload(page['payload'], max_decompressed_size)
+            record.count('xml_bytes', len(result['xml']))
+
+        result['style_tree'] = StyleParser(result['xml'], instrumentation=instrumentation).convert_to_style_tree()
+        if result['style_tree'] is False:
+            raise RuntimeError("could not build the style tree")
+
+        result['syntax_tree'] = SyntaxParser(result['style_tree'], models=True, instrumentation=instrumentation).convert_to_sytax_tree()
+        if result['syntax_tree'] is None:
+            raise RuntimeError("could not build the syntax tree")
+    except Exception as e:
+        result['error'] = str(e)
+
+    if profile:
+        result['profile'] = instrumentation.records
+    return result
+
+
+def _parse_page_job(job):
+    """
+    Unpack a job for parse_page, used by the process pool
+    """
+
+    page, options = job
+    return parse_page(page, **options)
+
+
+def parse_pages(pages, workers=None, **options):
+    """
+    Decode and parse every page, on a process pool when there is more than one
+
+    Parameters:
+        pages: list of page dictionaries as yielded by DecodeAndDecompress.iter_payloads
+        workers: number of worker processes, defaults to the CPU count, 1 parses in process
+        options: keyword arguments forwarded to parse_page
+
+    Returns:
+        results: list of the parse_page results, in page order
+    """
+
+    jobs = [(page, options) for page in pages]
+    if workers == 1 or len(jobs) <= 1:
+        return [_parse_page_job(job) for job in jobs]
+
+    with ProcessPoolExecutor(max_workers=min(workers or os.cpu_count(), len(jobs))) as executor:
+        return list(executor.map(_parse_page_job, jobs))
+
+
+def _is_placeholder(_class):
+    # a class drawn without members only stands in for its definition
+    return not _class['properties'] and not _class['methods']
+
+
+def _same_definition(a, b):
+    return (
+        a['type'] == b['type']
+        and list(a['properties'].values()) == list(b['properties'].values())
+        and list(a['methods'].values()) == list(b['methods'].values())
+    )
+
+
+def merge_syntax_trees(pages):
+    """
+    Merge the syntax trees of several pages into one. Classes are matched
+    across pages by name: a class drawn without members (a placeholder)
+    resolves to the class defining it on another page, so relationships
+    may cross pages. Two different definitions of one name are reported
+    as a collision, the first one is kept. Cell ids already used by an
+    earlier page are prefixed with the page id.
+
+    Parameters:
+        pages: list of dictionaries containing id, name and syntax_tree, in page order
+
+    Returns:
+        merged: the merged syntax tree, of models (see parsers/models.py)
+        collisions: list of dictionaries containing name, pages (page names) and reason
+    """
+
+    merged = dict()
+    by_name = dict()   # class name -> merged id
+    defined_on = dict()  # merged id -> name of the page of its definition
+    collisions = list()
+
+    for page in pages:
+        page_name = page['name'] or page['id']
+        syntax_tree = as_models(page['syntax_tree'])
+
+        # map every class of the page onto a merged id first, so that
+        # relationships can be rewritten in a second pass
+        id_map = dict()
+        created = set()
+        for cell_id, _class in syntax_tree.items():
+            name = _class['name']
+            # classes sharing a name on one page stay apart, as they do for a single page
+            if name in by_name and by_name[name] not in created:
+                merged_id = by_name[name]
+                existing = merged[merged_id]
+                if _is_placeholder(_class):
+                    if existing['type'] == "class" and _class['type'] != "class" and _is_placeholder(existing):
+                        existing['type'] = _class['type']
+                elif _is_placeholder(existing):
+                    existing['type'] = _class['type']
+                    existing['properties'] = _class['properties']
+                    existing['methods'] = _class['methods']
+                    defined_on[merged_id] = page_name
+                elif not _same_definition(existing, _class):
+                    collisions.append({
+                        'name': name,
+                        'pages': [defined_on[merged_id], page_name],
+                        'reason': "different definitions, keeping the first"
+                    })
+                id_map[cell_id] = merged_id
+                continue
+
+            merged_id = cell_id if cell_id not in merged else f"{page['id']}:{cell_id}"
+            merged[merged_id] = Class(_class['type'], name, _class['properties'], _class['methods'], Relationships())
+            defined_on[merged_id] = page_name
+            by_name.setdefault(name, merged_id)
+            id_map[cell_id] = merged_id
+            created.add(merged_id)
+
+        for cell_id, _class in syntax_tree.items():
+            merged_id = id_map[cell_id]
+            relationships = merged[merged_id]['relationships']
+            for kind, targets in _class['relationships'].items():
+                merged_targets = relationships[kind]
+                targets = [id_map.get(target, target) for target in targets]
+                if merged_id in created:
+                    merged_targets.extend(targets)
+                else:
+                    # the class was drawn on an earlier page, do not repeat its edges
+                    merged_targets.extend(t for t in targets if t not in merged_targets)
+
+    return merged, collisions
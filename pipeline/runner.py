@@ -0,0 +1,417 @@
+import itertools
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from decode.convert_to_readable import DecodeAndDecompress
+from parsers.style_parser import StyleParser
+from parsers.models import to_syntax_tree_dict
+from parsers.syntax_parser import SyntaxParser
+from generators.java_generator import JavaCodeGenerator
+from pipeline.cache import DiagramCache
+from pipeline.multipage import merge_syntax_trees, parse_pages
+from pipeline.targets import generate_targets
+from profiling.instrumentation import NULL_INSTRUMENTATION, Instrumentation
+
+# plain .xml exports are only read when given explicitly, directories hold other XML too
+DIAGRAM_EXTENSIONS = (".drawio", ".drawio.svg", ".drawio.png", ".drawio.xml")
+
+
+def collect_diagrams(paths):
+    """
+    Expand the given files and directories into a list of diagrams
+
+    Parameters:
+        paths: files and/or directories to search for diagrams
+
+    Returns:
+        diagrams: list of [diagram_path, relative_output_dir] pairs, in input order
+    """
+
+    diagrams = list()
+    for path in paths:
+        if os.path.isdir(path):
+            for dir_path, dir_names, file_names in os.walk(path):
+                dir_names.sort()
+                for file_name in sorted(file_names):
+                    if file_name.endswith(DIAGRAM_EXTENSIONS):
+                        diagram_path = os.path.join(dir_path, file_name)
+                        relative = os.path.relpath(diagram_path, path)
+                        diagrams.append([diagram_path, diagram_stem(relative)])
+        else:
+            diagrams.append([path, diagram_stem(os.path.basename(path))])
+
+    return diagrams
+
+
+def diagram_stem(file_name):
+    """
+    Strip the diagram extension from a file name
+
+    Parameters:
+        file_name: name (or relative path) of the diagram file
+
+    Returns:
+        stem: the file name without its diagram extension
+    """
+
+    for extension in DIAGRAM_EXTENSIONS:
+        if file_name.endswith(extension):
+            return file_name[: -len(extension)]
+
+    return os.path.splitext(file_name)[0]
+
+
+def json_to_file(file_name, data):
+    """
+    Dump data to a JSON file
+
+    Parameters:
+        file_name: name of the JSON file
+        data: data to dump
+    """
+
+    with open(file_name, "w") as f:
+        f.write(json.dumps(data, indent=4))
+
+
+def run_diagram(
+    diagram_path, output_dir, dump_dir=None, cache=None, write_if_changed=False, profile=False,
+    all_pages=False, page_workers=None, archive_format=None, streaming=False, incremental=False,
+    targets=None, target_workers=None, render_workers=1
+):
+    """
+    Run decode -> style tree -> syntax tree -> Java code for one diagram
+
+    Parameters:
+        diagram_path: path to the .drawio file
+        output_dir: directory the Java files are written to
+        dump_dir: optional directory for the intermediate XML and trees
+        cache: optional DiagramCache used to skip unchanged diagrams
+        write_if_changed: leave generated files with unchanged contents untouched
+        profile: record wall time, peak memory and counters of every stage
+        all_pages: parse every page instead of the first one and merge them into one syntax tree
+        page_workers: number of worker processes parsing the pages, defaults to the CPU count
+        archive_format: write the code into the single archive f"{output_dir}.{archive_format}"
+            instead of the directory output_dir, see generators/archive.py
+        streaming: write each class as soon as it is rendered instead of keeping every file in memory
+        incremental: only render and write the classes whose fingerprint changed since the last run
+        targets: generate these targets (see generators/registry.py) from the one parse, each
+            into output_dir/<target>, instead of Java into output_dir; the options above apply to java
+        target_workers: number of worker processes running the targets, defaults to the CPU count
+        render_workers: number of worker processes rendering the Java classes, see
+            JavaCodeGenerator.generate_parallel; 1 renders them one after another
+
+    Returns:
+        result: dictionary containing path, output, ok, classes, cached, skipped, error, seconds,
+            profile, collisions (class names defined differently on several pages) and
+            changes (with incremental, the classes rendered again and why) and targets
+            (with targets, target, output, ok, files, seconds and error of every target)
+    """
+
+    start = time.perf_counter()
+    instrumentation = Instrumentation(label=diagram_path) if profile else NULL_INSTRUMENTATION
+    result = {
+        'path': diagram_path,
+        'output': _output_path(output_dir, archive_format),
+        'ok': False,
+        'classes': 0,
+        'cached': False,
+        'skipped': False,
+        'error': None,
+        'seconds': 0.0,
+        'profile': None,
+        'collisions': list(),
+        'changes': list(),
+        'targets': list()
+    }
+
+    try:
+        with instrumentation.stage("diagram"):
+            _run_diagram(
+                diagram_path, output_dir, dump_dir, cache, write_if_changed, all_pages, page_workers,
+                archive_format, streaming, incremental, targets, target_workers, render_workers, instrumentation, result
+            )
+        result['ok'] = True
+    except Exception as e:
+        result['error'] = str(e)
+
+    result['seconds'] = time.perf_counter() - start
+    if profile:
+        result['profile'] = instrumentation.records
+    return result
+
+
+def _run_diagram(
+    diagram_path, output_dir, dump_dir, cache, write_if_changed, all_pages, page_workers, archive_format,
+    streaming, incremental, targets, target_workers, render_workers, instrumentation, result
+):
+    """
+    Body of run_diagram, raises on failure and fills in result
+    """
+
+    with instrumentation.stage("read_payload") as record:
+        payloads = DecodeAndDecompress.iter_payloads(diagram_path)
+        pages = list(payloads if all_pages else itertools.islice(payloads, 1))
+        if not pages:
+            raise RuntimeError("no <diagram> element found")
+        record.count('pages', len(pages))
+        record.count('payload_bytes', sum(len(page['payload']) for page in pages))
+
+    if all_pages:
+        _run_pages(
+            diagram_path, output_dir, dump_dir, cache, write_if_changed, pages, page_workers, archive_format,
+            streaming, incremental, targets, target_workers, render_workers, instrumentation, result
+        )
+        return
+
+    diagram = pages[0]
+    key = DiagramCache.key(diagram['payload']) if cache else None
+    if cache and not dump_dir and cache.outputs_match(_outputs_key(key, targets), _output_path(output_dir, archive_format)):
+        # nothing changed since the last run, the generated files are still in place
+        result['skipped'] = True
+        return
+
+    entry = cache.get(key) if cache else None
+    if entry is not None:
+        decoded_xml = entry['xml']
+        style_tree = entry['style_tree']
+        syntax_tree = entry['syntax_tree']
+        result['cached'] = True
+    else:
+        with instrumentation.stage("decode") as record:
+            decoded_xml = DecodeAndDecompress.decode_payload(diagram['payload'])
+            record.count('xml_bytes', len(decoded_xml))
+
+        style_tree = StyleParser(decoded_xml, instrumentation=instrumentation).convert_to_style_tree()
+        if style_tree is False:
+            raise RuntimeError("could not build the style tree")
+
+        syntax_tree = SyntaxParser(style_tree, models=True, instrumentation=instrumentation).convert_to_sytax_tree()
+        if syntax_tree is None:
+            raise RuntimeError("could not build the syntax tree")
+
+        if cache:
+            cache.put(key, decoded_xml, style_tree, syntax_tree)
+
+    if dump_dir:
+        stem = os.path.join(dump_dir, diagram_stem(os.path.basename(diagram_path)))
+        os.makedirs(dump_dir, exist_ok=True)
+        DecodeAndDecompress.write_xml_file(stem, decoded_xml)
+        json_to_file(f"{stem}_style_tree.json", style_tree)
+        json_to_file(f"{stem}_syntax_tree.json", to_syntax_tree_dict(syntax_tree))
+
+    _generate(
+        syntax_tree, output_dir, cache, key, write_if_changed, archive_format, streaming, incremental, targets,
+        target_workers, render_workers, instrumentation, result
+    )
+    result['classes'] = len(syntax_tree)
+
+
+def _run_pages(
+    diagram_path, output_dir, dump_dir, cache, write_if_changed, pages, page_workers, archive_format,
+    streaming, incremental, targets, target_workers, render_workers, instrumentation, result
+):
+    """
+    Body of run_diagram for all_pages, parses the pages in parallel and merges them
+    """
+
+    # the page separator cannot occur in a payload, the suffix keeps the key apart from single page runs
+    key = DiagramCache.key("\0".join(page['payload'] for page in pages) + "\0all-pages") if cache else None
+    if cache and not dump_dir and cache.outputs_match(_outputs_key(key, targets), _output_path(output_dir, archive_format)):
+        result['skipped'] = True
+        return
+
+    entry = cache.get(key) if cache else None
+    if entry is not None:
+        parsed = [
+            dict(page, xml=xml, style_tree=style_tree)
+            for page, xml, style_tree in zip(entry['syntax_tree'], entry['xml'], entry['style_tree'])
+        ]
+        result['cached'] = True
+    else:
+        parsed = parse_pages(pages, page_workers, profile=instrumentation.enabled)
+        for page in parsed:
+            if page['profile']:
+                instrumentation.extend(page['profile'])
+        for page in parsed:
+            if page['error']:
+                raise RuntimeError(f"page '{page['name'] or page['id']}': {page['error']}")
+
+        if cache:
+            cache.put(
+                key,
+                [page['xml'] for page in parsed],
+                [page['style_tree'] for page in parsed],
+                [{'id': page['id'], 'name': page['name'], 'syntax_tree': page['syntax_tree']} for page in parsed]
+            )
+
+    with instrumentation.stage("merge_pages") as record:
+        syntax_tree, collisions = merge_syntax_trees(parsed)
+        record.count('pages', len(parsed))
+        record.count('classes', len(syntax_tree))
+        record.count('collisions', len(collisions))
+
+    for collision in collisions:
+        print(f"{diagram_path}: class '{collision['name']}' on pages {' and '.join(collision['pages'])}: {collision['reason']}")
+    result['collisions'] = collisions
+
+    if dump_dir:
+        stem = os.path.join(dump_dir, diagram_stem(os.path.basename(diagram_path)))
+        os.makedirs(dump_dir, exist_ok=True)
+        for number, page in enumerate(parsed, 1):
+            DecodeAndDecompress.write_xml_file(f"{stem}_page{number}", page['xml'])
+            json_to_file(f"{stem}_page{number}_style_tree.json", page['style_tree'])
+            json_to_file(f"{stem}_page{number}_syntax_tree.json", to_syntax_tree_dict(page['syntax_tree']))
+        json_to_file(f"{stem}_syntax_tree.json", to_syntax_tree_dict(syntax_tree))
+
+    _generate(
+        syntax_tree, output_dir, cache, key, write_if_changed, archive_format, streaming, incremental, targets,
+        target_workers, render_workers, instrumentation, result
+    )
+    result['classes'] = len(syntax_tree)
+
+
+def _generate(
+    syntax_tree, output_dir, cache, key, write_if_changed, archive_format, streaming, incremental, targets,
+    target_workers, render_workers, instrumentation, result
+):
+    """
+    Generate the code of a syntax tree, record it in the cache and fill in
+    the changes or targets of result
+    """
+
+    if targets:
+        if archive_format:
+            raise RuntimeError("targets are written into directories and cannot be archived")
+
+        options = {'java': {
+            'write_if_changed': write_if_changed, 'streaming': streaming, 'incremental': incremental,
+            'render_workers': render_workers
+        }}
+        results = generate_targets(
+            syntax_tree, output_dir, targets, target_workers, options, profile=instrumentation.enabled
+        )
+        for target in results:
+            if target['profile']:
+                instrumentation.extend(target['profile'])
+
+        result['targets'] = [
+            {name: target[name] for name in ('target', 'output', 'ok', 'files', 'seconds', 'error')} for target in results
+        ]
+        failed = [target for target in results if not target['ok']]
+        if failed:
+            raise RuntimeError("; ".join(f"{target['target']}: {target['error']}" for target in failed))
+
+        if cache:
+            digests = {
+                os.path.join(target['target'], file_name): digest
+                for target in results for file_name, digest in target['digests'].items()
+            }
+            cache.put_output_digests(_outputs_key(key, targets), output_dir, digests)
+        return
+
+    java_code_gen = JavaCodeGenerator(
+        syntax_tree, output_dir, write_if_changed=write_if_changed, archive_format=archive_format,
+        streaming=streaming, incremental=incremental, render_workers=render_workers, instrumentation=instrumentation
+    )
+    if not java_code_gen.generate_code():
+        errors = java_code_gen.get_render_errors()
+        if errors:
+            raise RuntimeError("could not render " + "; ".join(f"{error['name']}: {error['error']}" for error in errors))
+        raise RuntimeError("could not generate the Java code")
+    result['changes'] = java_code_gen.get_changes()
+
+    if cache:
+        if archive_format:
+            with open(java_code_gen.get_archive_path(), "rb") as f:
+                cache.put_outputs(key, java_code_gen.get_archive_path(), [["", f.read()]])
+        elif streaming or incremental:
+            cache.put_output_digests(key, output_dir, java_code_gen.get_output_digests())
+        else:
+            files = [[f"{name}.java", contents] for name, contents in java_code_gen.get_files()]
+            cache.put_outputs(key, output_dir, files)
+
+
+def _outputs_key(key, targets):
+    # the outputs of a set of targets are recorded apart from the plain Java run of the same diagram
+    return f"{key}\0targets={','.join(targets)}" if targets else key
+
+
+def _output_path(output_dir, archive_format):
+    # where the code of a diagram ends up, recorded in the cache
+    return f"{output_dir.rstrip('/')}.{archive_format}" if archive_format else output_dir
+
+
+def _run_diagram_job(job):
+    """
+    Unpack a job for run_diagram, used by the process pool
+    """
+
+    args, options = job
+    return run_diagram(*args, **options)
+
+
+def diagram_args(diagram_path, relative, output_root, dump_dir=None):
+    """
+    Positional arguments of run_diagram for a diagram found by collect_diagrams
+
+    Parameters:
+        diagram_path: path to the .drawio file
+        relative: relative output directory of the diagram
+        output_root: root directory, each diagram gets its own sub directory
+        dump_dir: optional directory for the intermediate XML and trees
+
+    Returns:
+        args: tuple of diagram_path, output_dir and dump_dir
+    """
+
+    return (
+        diagram_path,
+        os.path.join(output_root, relative),
+        os.path.join(dump_dir, os.path.dirname(relative)) if dump_dir else None
+    )
+
+
+def run_batch(paths, output_root, workers=None, dump_dir=None, **options):
+    """
+    Run the pipeline for every diagram found in paths on a process pool
+
+    Parameters:
+        paths: files and/or directories to search for diagrams
+        output_root: root directory, each diagram gets its own sub directory
+        workers: number of worker processes, defaults to the CPU count
+        dump_dir: optional directory for the intermediate XML and trees
+        options: keyword arguments forwarded to run_diagram for every diagram; with
+            all_pages the pages (and with targets the targets) are run on the pool when
+            there is a single diagram and serially inside each worker otherwise; when several
+            diagrams run on the pool, render_workers is forced to 1 with a warning
+
+    Returns:
+        generator: yields the result of each diagram, in input order
+    """
+
+    jobs = [
+        (diagram_args(diagram_path, relative, output_root, dump_dir), options)
+        for diagram_path, relative in collect_diagrams(paths)
+    ]
+
+    if options.get('all_pages') and 'page_workers' not in options:
+        options['page_workers'] = workers if len(jobs) <= 1 else 1
+    if options.get('targets') and 'target_workers' not in options:
+        options['target_workers'] = workers if len(jobs) <= 1 else 1
+
+    pooled = workers != 1 and len(jobs) > 1
+    if pooled and options.get('render_workers', 1) > 1:
+        # a render pool inside every diagram worker would oversubscribe the CPUs
+        print(f"run_batch WARNING: ignoring render_workers={options['render_workers']}, {len(jobs)} diagrams run on the process pool")
+        options['render_workers'] = 1
+
+    if not pooled:
+        for job in jobs:
+            yield _run_diagram_job(job)
+        return
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for result in executor.map(_run_diagram_job, jobs):
+            yield result
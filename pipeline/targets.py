@@ -0,0 +1,118 @@
+import hashlib
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from generators.registry import get_generator
+from profiling.instrumentation import NULL_INSTRUMENTATION, Instrumentation
+
+# syntax tree shared by the jobs of a worker process, set once per worker by _init_worker
+_syntax_tree = None
+
+
+def generate_target(syntax_tree, target, output_dir, options=None, profile=False):
+    """
+    Run one backend over a syntax tree, the tree is only read
+
+    Parameters:
+        syntax_tree: the syntax tree of the diagram
+        target: name of a registered target, see generators/registry.py
+        output_dir: directory the backend writes its files to
+        options: keyword arguments for the constructor of the backend
+        profile: record the stages of the backend
+
+    Returns:
+        result: dictionary containing target, output, ok, files, digests (file name
+            -> (size, sha256) of every generated file), seconds, error and profile
+    """
+
+    start = time.perf_counter()
+    instrumentation = Instrumentation(label=target) if profile else NULL_INSTRUMENTATION
+    result = {
+        'target': target,
+        'output': output_dir,
+        'ok': False,
+        'files': 0,
+        'digests': dict(),
+        'seconds': 0.0,
+        'error': None,
+        'profile': None
+    }
+
+    try:
+        generator_class = get_generator(target)
+        generator = generator_class(syntax_tree, output_dir, instrumentation=instrumentation, **(options or {}))
+        if not generator.generate_code():
+            raise RuntimeError(f"could not generate the {target} code")
+
+        result['digests'] = _output_digests(generator)
+        result['files'] = len(result['digests'])
+        result['ok'] = True
+    except Exception as e:
+        result['error'] = str(e)
+
+    result['seconds'] = time.perf_counter() - start
+    if profile:
+        result['profile'] = instrumentation.records
+    return result
+
+
+def _output_digests(generator):
+    # generators that did not keep their files (e.g. Java streaming) record the digests themselves
+    get_output_digests = getattr(generator, "get_output_digests", None)
+    digests = get_output_digests() if get_output_digests else None
+    if digests:
+        return dict(digests)
+
+    # later classes with the same name overwrite earlier ones, as on disk
+    files = {name + generator.FILE_EXTENSION: contents for name, contents in generator.get_files()}
+    digests = dict()
+    for file_name, contents in files.items():
+        data = contents.encode("utf8")
+        digests[file_name] = (len(data), hashlib.sha256(data).hexdigest())
+    return digests
+
+
+def _init_worker(syntax_tree):
+    global _syntax_tree
+    _syntax_tree = syntax_tree
+
+
+def _generate_target_job(job):
+    """
+    Unpack a job for generate_target, used by the process pool
+    """
+
+    target, output_dir, options, profile = job
+    return generate_target(_syntax_tree, target, output_dir, options, profile)
+
+
+def generate_targets(syntax_tree, output_dir, targets, workers=None, options=None, profile=False):
+    """
+    Generate several targets from one parse, each backend on its own worker
+    process and into its own sub directory output_dir/<target>. The syntax
+    tree is handed to every worker once, when the worker starts.
+
+    Parameters:
+        syntax_tree: the syntax tree of the diagram
+        output_dir: root directory of the targets
+        targets: names of the targets, see generators/registry.py
+        workers: number of worker processes, defaults to the CPU count, 1 runs the targets in process
+        options: dictionary of target name to the constructor keyword arguments of its backend
+        profile: record the stages of every backend
+
+    Returns:
+        results: list of the generate_target results, in the order of targets
+    """
+
+    options = options or dict()
+    targets = list(dict.fromkeys(targets))
+    for target in targets:
+        get_generator(target)  # fail early on unknown targets
+
+    jobs = [(target, os.path.join(output_dir, target), options.get(target), profile) for target in targets]
+    workers = min(workers or os.cpu_count(), len(jobs))
+    if workers <= 1:
+        return [generate_target(syntax_tree, *job) for job in jobs]
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(syntax_tree,)) as executor:
+        return list(executor.map(_generate_target_job, jobs))
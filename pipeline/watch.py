@@ -0,0 +1,105 @@
+import hashlib
+import os
+import time
+from pipeline.runner import collect_diagrams, diagram_args, run_diagram
+
+DEFAULT_INTERVAL = 0.2
+DEFAULT_DEBOUNCE = 0.2
+
+
+class DiagramWatcher:
+    """
+    Poll files and directories for diagrams and re-run the pipeline, in this
+    (already warm) process, for every diagram whose contents changed.
+    A diagram is only rebuilt once its size and mtime have been stable for
+    debounce seconds, so the burst of writes of one save triggers one
+    rebuild, and only if the hash of its contents differs from the last build.
+
+    Parameters:
+        paths: files and/or directories to watch
+        output_root: root directory, each diagram gets its own sub directory
+        dump_dir: optional directory for the intermediate XML and trees
+        interval: seconds between two polls
+        debounce: seconds a changed file has to stay unchanged before it is rebuilt
+        options: keyword arguments forwarded to run_diagram
+    """
+
+    def __init__(self, paths, output_root, dump_dir=None, interval=DEFAULT_INTERVAL,
+                 debounce=DEFAULT_DEBOUNCE, **options):
+        self.paths = paths
+        self.output_root = output_root
+        self.dump_dir = dump_dir
+        self.interval = interval
+        self.debounce = debounce
+        self.options = options
+        self.__state = dict()
+
+    def poll(self):
+        """
+        Look at every diagram once and rebuild the ones that changed
+
+        Returns:
+            results: list of run_diagram results of the rebuilt diagrams
+        """
+
+        now = time.monotonic()
+        results = list()
+        found = set()
+
+        for diagram_path, relative in collect_diagrams(self.paths):
+            found.add(diagram_path)
+            try:
+                stat = os.stat(diagram_path)
+            except FileNotFoundError:
+                continue
+
+            signature = (stat.st_mtime_ns, stat.st_size)
+            state = self.__state.get(diagram_path)
+            if state is None:
+                # first sighting, build right away
+                state = self.__state[diagram_path] = {'signature': signature, 'changed_at': None, 'hash': None}
+            elif state['signature'] != signature:
+                state['signature'] = signature
+                state['changed_at'] = now
+                continue
+            elif state['changed_at'] is None or now - state['changed_at'] < self.debounce:
+                continue
+
+            state['changed_at'] = None
+            try:
+                with open(diagram_path, "rb") as f:
+                    digest = hashlib.sha256(f.read()).hexdigest()
+            except FileNotFoundError:
+                continue
+
+            if digest == state['hash']:
+                # touched or saved without changes
+                continue
+
+            result = run_diagram(*diagram_args(diagram_path, relative, self.output_root, self.dump_dir), **self.options)
+            state['hash'] = digest if result['ok'] else None
+            results.append(result)
+
+        for diagram_path in set(self.__state) - found:
+            del self.__state[diagram_path]
+
+        return results
+
+    def run(self, on_result=None, max_polls=None):
+        """
+        Poll until interrupted
+
+        Parameters:
+            on_result: called with the result of every rebuilt diagram
+            max_polls: stop after this many polls, None polls forever
+        """
+
+        polls = 0
+        while max_polls is None or polls < max_polls:
+            start = time.monotonic()
+            for result in self.poll():
+                if on_result:
+                    on_result(result)
+
+            polls += 1
+            time.sleep(max(self.interval - (time.monotonic() - start), 0))
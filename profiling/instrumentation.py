@@ -0,0 +1,241 @@
+import json
+import os
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager, nullcontext
+
+
+class StageRecord:
+    """
+    Measurements of one pipeline stage
+
+    Parameters:
+        name: name of the stage, e.g. 'convert_to_style_tree'
+        label: what the stage ran on, usually the diagram path
+    """
+
+    __slots__ = ("name", "label", "start", "seconds", "peak_memory", "counts", "pid", "tid", "_running_peak")
+
+    def __init__(self, name, label=None):
+        self.name = name
+        self.label = label
+        self.start = time.time()
+        self.seconds = 0.0
+        self.peak_memory = None
+        self.counts = dict()
+        self.pid = os.getpid()
+        self.tid = threading.get_ident()
+        self._running_peak = 0
+
+    def count(self, key, value):
+        """
+        Record (or add to) a counter of the stage
+
+        Parameters:
+            key: name of the counter, e.g. 'cells'
+            value: amount to add
+        """
+
+        self.counts[key] = self.counts.get(key, 0) + value
+
+    def to_dict(self):
+        return {
+            'name': self.name,
+            'label': self.label,
+            'start': self.start,
+            'seconds': self.seconds,
+            'peak_memory': self.peak_memory,
+            'counts': self.counts,
+            'pid': self.pid,
+            'tid': self.tid
+        }
+
+
+class _NullRecord:
+    """
+    Record that discards everything, handed out when instrumentation is off
+    """
+
+    __slots__ = ()
+
+    def count(self, key, value):
+        pass
+
+
+_NULL_STAGE = nullcontext(_NullRecord())
+
+# stages open in this process, innermost last, shared by every Instrumentation: tracemalloc
+# has a single peak, so a nested stage of another instrumentation (e.g. a page parsed serially
+# inside the diagram stage) must hand the peak it resets on to the stage enclosing it
+_open_stages = list()
+# whether the outermost stage started tracemalloc and has to stop it again
+_started_tracing = False
+
+
+class NullInstrumentation:
+    """
+    Instrumentation that records nothing, the default of every pipeline class
+    """
+
+    enabled = False
+
+    def stage(self, name):
+        return _NULL_STAGE
+
+
+NULL_INSTRUMENTATION = NullInstrumentation()
+
+
+class Instrumentation:
+    """
+    Record wall time, peak memory and counters of every pipeline stage
+
+    Parameters:
+        label: what the stages run on, usually the diagram path
+        trace_memory: measure the peak memory of each stage with tracemalloc
+    """
+
+    enabled = True
+
+    def __init__(self, label=None, trace_memory=True):
+        self.label = label
+        self.trace_memory = trace_memory
+        self.records = list()
+
+    @contextmanager
+    def stage(self, name):
+        """
+        Measure the enclosed block as one stage
+
+        Parameters:
+            name: name of the stage
+
+        Returns:
+            context manager: yields the StageRecord, use its count() to add counters
+        """
+
+        global _started_tracing
+
+        record = StageRecord(name, self.label)
+        tracing = self.trace_memory
+        if tracing:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+                _started_tracing = True
+            current, peak = tracemalloc.get_traced_memory()
+            if _open_stages:
+                # keep the peak of the enclosing stage before resetting it
+                parent = _open_stages[-1]
+                parent._running_peak = max(parent._running_peak, peak)
+            tracemalloc.reset_peak()
+            baseline = current
+
+        _open_stages.append(record)
+        start = time.perf_counter()
+        try:
+            yield record
+        finally:
+            record.seconds = time.perf_counter() - start
+            _open_stages.remove(record)
+
+            if tracing:
+                _, peak = tracemalloc.get_traced_memory()
+                peak = max(peak, record._running_peak)
+                record.peak_memory = max(peak - baseline, 0)
+                if _open_stages:
+                    parent = _open_stages[-1]
+                    parent._running_peak = max(parent._running_peak, peak)
+
+            if not _open_stages and _started_tracing:
+                tracemalloc.stop()
+                _started_tracing = False
+
+            self.records.append(record.to_dict())
+
+    def extend(self, records):
+        """
+        Add records collected elsewhere, e.g. in a worker process
+
+        Parameters:
+            records: list of record dictionaries
+        """
+
+        self.records.extend(records)
+
+    def clear(self):
+        """
+        Drop the records, e.g. once they have been written
+        """
+
+        self.records.clear()
+
+    def summary(self):
+        """
+        Aggregate the records by stage name
+
+        Returns:
+            summary: dictionary of stage name to calls, seconds, peak_memory and summed counts
+        """
+
+        summary = dict()
+        for record in self.records:
+            stage = summary.setdefault(record['name'], {'calls': 0, 'seconds': 0.0, 'peak_memory': None, 'counts': dict()})
+            stage['calls'] += 1
+            stage['seconds'] += record['seconds']
+            if record['peak_memory'] is not None:
+                stage['peak_memory'] = max(stage['peak_memory'] or 0, record['peak_memory'])
+            for key, value in record['counts'].items():
+                stage['counts'][key] = stage['counts'].get(key, 0) + value
+
+        return summary
+
+    def to_json(self):
+        """
+        Returns:
+            report: dictionary containing the summary and every record
+        """
+
+        return {'summary': self.summary(), 'records': self.records}
+
+    def to_chrome_trace(self):
+        """
+        Convert the records to the Chrome trace event format (chrome://tracing, Perfetto)
+
+        Returns:
+            trace: dictionary containing the traceEvents
+        """
+
+        events = list()
+        for record in self.records:
+            args = dict(record['counts'])
+            if record['label'] is not None:
+                args['label'] = record['label']
+            if record['peak_memory'] is not None:
+                args['peak_memory'] = record['peak_memory']
+
+            events.append({
+                'name': record['name'],
+                'cat': "pipeline",
+                'ph': "X",
+                'ts': record['start'] * 1e6,
+                'dur': record['seconds'] * 1e6,
+                'pid': record['pid'],
+                'tid': record['tid'],
+                'args': args
+            })
+
+        return {'traceEvents': events, 'displayTimeUnit': "ms"}
+
+    def write(self, file_path, trace_format="json"):
+        """
+        Write the records to file
+
+        Parameters:
+            file_path: path of the output file
+            trace_format: 'json' for the summary and records, 'chrome' for a Chrome trace
+        """
+
+        data = self.to_chrome_trace() if trace_format == "chrome" else self.to_json()
+        with open(file_path, "w") as f:
+            f.write(json.dumps(data, indent=4))
@@ -0,0 +1,49 @@
+import pytest
+
+RELATIONSHIP_KINDS = ("implements", "extends", "association", "aggregation", "composition")
+
+
+def make_class(name, _type="class", properties=(), methods=(), **relationships):
+    """
+    Build a class of the dictionary syntax tree, as in *_syntax_tree.json
+
+    Parameters:
+        name: name of the class
+        _type: type of class; 'class', 'abstract', 'interface'
+        properties: names of its private int properties
+        methods: names of its public void methods
+        relationships: ids listed per relationship kind, e.g. implements=["a"]
+
+    Returns:
+        _class: the class dictionary
+    """
+
+    return {
+        'type': _type,
+        'name': name,
+        'properties': {i: {'access': "private", 'name': p, 'type': "int"} for i, p in enumerate(properties)},
+        'methods': {i: {'access': "public", 'name': m, 'return_type': "void"} for i, m in enumerate(methods)},
+        'relationships': {kind: list(relationships.get(kind, ())) for kind in RELATIONSHIP_KINDS}
+    }
+
+
+@pytest.fixture
+def diamond():
+    # d implements b and c, which both extend the interface a
+    return {
+        'a': make_class("A", "interface", methods=["a"]),
+        'b': make_class("B", "interface", methods=["b"], implements=["a"]),
+        'c': make_class("C", "interface", methods=["c"], implements=["a"]),
+        'd': make_class("D", implements=["b", "c"]),
+    }
+
+
+@pytest.fixture
+def interface_cycle():
+    # x -> y -> z -> x, w implements x; z declares x() again
+    return {
+        'x': make_class("X", "interface", methods=["x"], implements=["y"]),
+        'y': make_class("Y", "interface", methods=["y"], implements=["z"]),
+        'z': make_class("Z", "interface", methods=["x"], implements=["x"]),
+        'w': make_class("W", implements=["x"]),
+    }
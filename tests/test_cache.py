@@ -0,0 +1,41 @@
+import os
+import time
+from pipeline.cache import DiagramCache
+
+
+def temp_file(cache_dir, name, size, age):
+    path = cache_dir / f"{name}.bin.123.tmp"
+    path.write_bytes(b"x" * size)
+    mtime = time.time() - age
+    os.utime(path, (mtime, mtime))
+    return path
+
+
+def test_stale_temporary_files_are_removed(tmp_path):
+    cache = DiagramCache(str(tmp_path))
+    stale = temp_file(tmp_path, "stale", 10, DiagramCache.STALE_TEMP_SECONDS + 60)
+    fresh = temp_file(tmp_path, "fresh", 10, 0)
+
+    key = DiagramCache.key("<mxGraphModel/>")
+    cache.put(key, "<mxGraphModel/>", {}, {})
+
+    assert not stale.exists()
+    assert fresh.exists()
+    assert cache.get(key)['xml'] == "<mxGraphModel/>"
+
+
+def test_temporary_files_count_towards_the_size(tmp_path):
+    cache = DiagramCache(str(tmp_path), max_bytes=1000)
+    temp_file(tmp_path, "fresh", 1000, 0)
+
+    cache.put(DiagramCache.key("a"), "a", {}, {})
+    assert sorted(os.listdir(tmp_path)) == ["fresh.bin.123.tmp"]
+
+
+def test_clear_removes_temporary_files(tmp_path):
+    cache = DiagramCache(str(tmp_path))
+    cache.put(DiagramCache.key("a"), "a", {}, {})
+    temp_file(tmp_path, "fresh", 10, 0)
+
+    assert cache.clear() == 2
+    assert os.listdir(tmp_path) == []
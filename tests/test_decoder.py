@@ -0,0 +1,122 @@
+import gc
+import io
+import struct
+import warnings
+import zlib
+from urllib.parse import quote
+from xml.sax.saxutils import quoteattr
+import pytest
+from benchmarks.synthetic_diagram import encode_drawio, synthesize_diagram_xml
+from decode.convert_to_readable import PNG_SIGNATURE, DecodeAndDecompress
+
+XML = synthesize_diagram_xml(classes=5, members=2, seed=3)
+
+
+def decode(contents):
+    return [
+        (diagram['id'], diagram['name'], diagram['xml'])
+        for diagram in DecodeAndDecompress.iter_diagrams(contents)
+    ]
+
+
+def png_chunk(chunk_type, data):
+    return struct.pack(">I4s", len(data), chunk_type) + data + struct.pack(">I", zlib.crc32(chunk_type + data))
+
+
+def png(*chunks):
+    header = png_chunk(b"IHDR", struct.pack(">IIBBBBB", 1, 1, 8, 0, 0, 0, 0))
+    return PNG_SIGNATURE + header + b"".join(chunks) + png_chunk(b"IEND", b"")
+
+
+def test_compressed_mxfile():
+    contents = encode_drawio(XML, compressed=True, pages=2).encode("utf8")
+    assert decode(contents) == [("page-0", "Page-1", XML), ("page-1", "Page-2", XML)]
+
+
+def test_uncompressed_mxfile_payload_is_the_model():
+    contents = encode_drawio(XML, compressed=False, pages=2).encode("utf8")
+    payloads = list(DecodeAndDecompress.iter_payloads(contents))
+
+    assert [page['payload'] for page in payloads] == [XML, XML]
+    assert decode(contents) == [("page-0", "Page-1", XML), ("page-1", "Page-2", XML)]
+
+
+def test_uncompressed_mxfile_with_comment_goes_through_the_parser():
+    contents = encode_drawio(XML, compressed=False).replace("<diagram", "<!-- note --><diagram", 1)
+    assert decode(contents.encode("utf8")) == [("page-0", "Page-1", XML)]
+
+
+@pytest.mark.parametrize("name", ['"A -> B"', "'A > B'"])
+def test_uncompressed_page_name_with_angle_bracket(name):
+    model = '<mxGraphModel><root><mxCell id="0"/><mxCell id="1" parent="0"/></root></mxGraphModel>'
+    contents = f'<mxfile><diagram id="a" name={name}>{model}</diagram></mxfile>'.encode("utf8")
+
+    assert decode(contents) == [("a", name[1:-1], model)]
+
+
+def test_plain_xml_export():
+    assert decode(XML.encode("utf8")) == [(None, None, XML)]
+
+
+@pytest.mark.parametrize("compressed", (True, False))
+def test_svg(compressed):
+    mxfile = encode_drawio(XML, compressed=compressed)
+    contents = (
+        f'<svg xmlns="http://www.w3.org/2000/svg" width="10" height="10" content={quoteattr(mxfile)}>'
+        '<g/></svg>'
+    )
+    assert decode(contents.encode("utf8")) == [("page-0", "Page-1", XML)]
+
+
+def test_svg_without_diagram():
+    with pytest.raises(ValueError, match="does not embed"):
+        decode(b'<svg xmlns="http://www.w3.org/2000/svg"><g/></svg>')
+
+
+def test_png_text_chunk():
+    mxfile = quote(encode_drawio(XML), safe="")
+    contents = png(png_chunk(b"tEXt", b"Software\0draw.io"), png_chunk(b"tEXt", b"mxfile\0" + mxfile.encode("latin-1")))
+    assert decode(contents) == [("page-0", "Page-1", XML)]
+
+
+def test_png_compressed_text_chunk():
+    mxfile = encode_drawio(XML, compressed=False).encode("latin-1")
+    contents = png(png_chunk(b"zTXt", b"mxfile\0\0" + zlib.compress(mxfile)))
+    assert decode(contents) == [("page-0", "Page-1", XML)]
+
+
+def test_png_international_text_chunk():
+    mxfile = encode_drawio(XML).encode("utf8")
+    contents = png(png_chunk(b"iTXt", b"mxfile\0\1\0en\0\0" + zlib.compress(mxfile)))
+    assert decode(io.BytesIO(contents)) == [("page-0", "Page-1", XML)]
+
+
+def test_png_without_diagram():
+    with pytest.raises(ValueError, match="does not embed"):
+        decode(png(png_chunk(b"tEXt", b"Software\0draw.io")))
+
+
+@pytest.mark.parametrize("payload", (XML, quote(XML, safe="")))
+def test_decode_payload_passes_xml_through(payload):
+    assert DecodeAndDecompress.decode_payload(payload) == XML
+
+
+def test_decode_payload_size_cap():
+    with pytest.raises(ValueError, match="exceeds"):
+        DecodeAndDecompress.decode_payload(XML, max_decompressed_size=len(XML) - 1)
+
+
+@pytest.mark.parametrize("contents", [
+    encode_drawio(XML, compressed=False).replace("<diagram", "<!-- note --><diagram", 1).encode("utf8"),
+    png(png_chunk(b"tEXt", b"mxfile\0" + quote(encode_drawio(XML)).encode("latin-1")))
+], ids=["parsed", "png"])
+def test_files_are_closed(contents, tmp_path):
+    path = tmp_path / "diagram.drawio"
+    path.write_bytes(contents)
+
+    with warnings.catch_warnings(record=True) as caught:
+        warnings.simplefilter("always", ResourceWarning)
+        assert DecodeAndDecompress.convert(str(path)) == XML
+        gc.collect()
+
+    assert [w for w in caught if issubclass(w.category, ResourceWarning)] == []
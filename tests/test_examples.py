@@ -0,0 +1,71 @@
+import json
+import os
+import pytest
+from decode.convert_to_readable import DecodeAndDecompress
+from generators.java_generator import JavaCodeGenerator
+from parsers.style_parser import StyleParser
+from parsers.syntax_parser import SyntaxParser
+
+EXAMPLES = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "examples")
+
+ROOT = '<mxCell id="0"/><mxCell id="1" parent="0"/>'
+CLASS_STYLE = "swimlane;fontStyle=0;childLayout=stackLayout;horizontal=1;startSize=26;"
+TEXT_STYLE = "text;align=left;verticalAlign=top;spacingLeft=4;"
+LINE_STYLE = "line;html=1;strokeWidth=1;"
+
+
+def cell(cell_id, parent, value="", style=TEXT_STYLE):
+    return f'<mxCell id="{cell_id}" value="{value}" style="{style}" parent="{parent}" vertex="1"/>'
+
+
+def diagram(*cells):
+    return f"<mxGraphModel><root>{ROOT}{''.join(cells)}</root></mxGraphModel>"
+
+
+def parse(xml):
+    style_tree = StyleParser(xml).convert_to_style_tree()
+    assert style_tree is not False
+    return SyntaxParser(style_tree).convert_to_sytax_tree()
+
+
+@pytest.fixture(scope="module")
+def syntax_tree():
+    xml = DecodeAndDecompress.convert(os.path.join(EXAMPLES, "simple_class_diagram.drawio"))
+    return parse(xml)
+
+
+def test_syntax_tree_matches_example(syntax_tree):
+    with open(os.path.join(EXAMPLES, "simple_class_syntax_tree.json")) as f:
+        expected = json.load(f)
+
+    # JSON turns the integer member ids into strings
+    assert json.loads(json.dumps(syntax_tree)) == expected
+
+
+def test_java_code_matches_example(syntax_tree, tmp_path):
+    generator = JavaCodeGenerator(syntax_tree, str(tmp_path))
+    assert generator.generate_code()
+
+    expected_dir = os.path.join(EXAMPLES, "example_code")
+    assert sorted(os.listdir(tmp_path)) == sorted(os.listdir(expected_dir))
+
+    for file_name in os.listdir(expected_dir):
+        with open(os.path.join(expected_dir, file_name)) as f:
+            expected = f.read()
+        with open(os.path.join(tmp_path, file_name)) as f:
+            assert f.read() == expected, file_name
+
+
+def test_cell_nested_below_member_row_is_skipped():
+    syntax_tree = parse(diagram(
+        cell("c", "1", "Account", CLASS_STYLE),
+        cell("p", "c", "-balance: int"),
+        cell("nested", "p", "+hidden: int"),
+        cell("l", "c", "", LINE_STYLE),
+        cell("m", "c", "+deposit: void"),
+    ))
+
+    assert list(syntax_tree) == ["c"]
+    account = syntax_tree["c"]
+    assert [p['name'] for p in account['properties'].values()] == ["balance"]
+    assert [m['name'] for m in account['methods'].values()] == ["deposit"]
@@ -0,0 +1,106 @@
+import copy
+import json
+import os
+import pytest
+from conftest import make_class
+from generators.fingerprints import MANIFEST_NAME, change_reason, fingerprint
+from generators.java_generator import JavaCodeGenerator
+
+
+@pytest.fixture
+def syntax_tree():
+    # Square implements Polygon, which extends the interface Shape; Account stands apart
+    return {
+        'shape': make_class("Shape", "interface", methods=["area"]),
+        'polygon': make_class("Polygon", "interface", methods=["corners"], implements=["shape"]),
+        'base': make_class("Base", properties=["id"]),
+        'square': make_class("Square", properties=["side"], extends=["base"], implements=["polygon"]),
+        'account': make_class("Account", properties=["balance"]),
+    }
+
+
+def generate(syntax_tree, output_dir):
+    generator = JavaCodeGenerator(syntax_tree, str(output_dir), incremental=True)
+    assert generator.generate_code()
+    return {change['name']: change['reason'] for change in generator.get_changes()}, generator.get_written_files()
+
+
+def test_change_reason(tmp_path):
+    path = tmp_path / "A.java"
+    path.write_text("class A {}\n")
+    stat = os.stat(path)
+    entry = {'own': "o", 'inherited': "i", 'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+
+    assert change_reason(None, "o", "i", path) == "new class"
+    assert change_reason(entry, "O", "i", path) == "class changed"
+    assert change_reason(entry, "o", "I", path) == "parents or interfaces changed"
+    assert change_reason(entry, "o", "i", path) is None
+    assert change_reason(entry, "o", "i", tmp_path / "missing.java") == "file missing"
+
+    path.write_text("class A { int b; }\n")
+    assert change_reason(entry, "o", "i", path) == "file modified on disk"
+
+
+def test_fingerprint_depends_on_order():
+    assert fingerprint([("a", "b")]) == fingerprint([("a", "b")])
+    assert fingerprint([("a", "b"), ("c", "d")]) != fingerprint([("c", "d"), ("a", "b")])
+
+
+def test_unchanged_run_writes_nothing(syntax_tree, tmp_path):
+    changes, written = generate(syntax_tree, tmp_path)
+    assert set(changes.values()) == {"new class"}
+    assert len(written) == len(syntax_tree)
+
+    changes, written = generate(syntax_tree, tmp_path)
+    assert changes == {}
+    assert written == []
+
+
+def test_interface_change_propagates_through_the_closure(syntax_tree, tmp_path):
+    generate(syntax_tree, tmp_path)
+
+    syntax_tree['shape']['methods'][1] = {'access': "public", 'name': "perimeter", 'return_type': "double"}
+    changes, written = generate(syntax_tree, tmp_path)
+
+    assert changes == {
+        'Shape': "class changed",
+        'Polygon': "parents or interfaces changed",
+        'Square': "parents or interfaces changed"
+    }
+    assert sorted(written) == ["Polygon.java", "Shape.java", "Square.java"]
+    assert "perimeter" in (tmp_path / "Square.java").read_text()
+
+
+def test_renamed_parent_only_touches_its_children(syntax_tree, tmp_path):
+    generate(syntax_tree, tmp_path)
+
+    syntax_tree['base']['name'] = "Entity"
+    changes, _ = generate(syntax_tree, tmp_path)
+
+    assert changes == {'Entity': "new class", 'Square': "parents or interfaces changed", 'Base': "removed, file left in place"}
+    assert (tmp_path / "Base.java").exists()
+
+
+def test_files_changed_on_disk_are_generated_again(syntax_tree, tmp_path):
+    generate(syntax_tree, tmp_path)
+    expected = (tmp_path / "Account.java").read_text()
+
+    (tmp_path / "Account.java").write_text("edited by hand\n")
+    (tmp_path / "Base.java").unlink()
+    changes, _ = generate(syntax_tree, tmp_path)
+
+    assert changes == {'Account': "file modified on disk", 'Base': "file missing"}
+    assert (tmp_path / "Account.java").read_text() == expected
+
+
+def test_other_output_version_regenerates_everything(syntax_tree, tmp_path):
+    generate(syntax_tree, tmp_path)
+
+    manifest_path = tmp_path / MANIFEST_NAME
+    manifest = json.loads(manifest_path.read_text())
+    manifest['version'] = "0.0.0+output.0"
+    manifest_path.write_text(json.dumps(manifest))
+
+    changes, written = generate(copy.deepcopy(syntax_tree), tmp_path)
+    assert set(changes.values()) == {"generator version changed"}
+    assert len(written) == len(syntax_tree)
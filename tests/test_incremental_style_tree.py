@@ -0,0 +1,92 @@
+import json
+import random
+import pytest
+from lxml import etree
+from benchmarks.synthetic_diagram import CELL_FORMATS, RELATIONSHIP_STYLES, ROW_STYLE, synthesize_diagram_xml
+from parsers.style_parser import StyleParser
+from profiling.instrumentation import Instrumentation
+
+EDITS_PER_DIAGRAM = 25
+VALUES = ("Renamed", "+ name: String", "- id: int", "# run(): void", "<<interface>>Shape", "<b>Html</b><hr>+ x: int")
+
+
+def random_edit(rng, root):
+    """
+    Apply one random edit to the <root> element of a diagram
+    """
+
+    cells = root.findall("mxCell")[2:]  # the two layer cells stay in place
+    vertices = [c for c in cells if c.get("edge") != "1"]
+    edges = [c for c in cells if c.get("edge") == "1"]
+    ids = [c.get("id") for c in vertices] + ["1"]
+
+    edit = rng.choice(("rename", "reparent", "add_cell", "remove", "add_edge", "endpoint", "reorder", "restyle"))
+    if edit == "rename" and vertices:
+        rng.choice(vertices).set("value", rng.choice(VALUES))
+    elif edit == "reparent" and vertices:
+        rng.choice(vertices).set("parent", rng.choice(ids))
+    elif edit == "add_cell":
+        new = etree.Element("mxCell", id=f"new{rng.randrange(10 ** 9)}", value=rng.choice(VALUES),
+                            style=ROW_STYLE, parent=rng.choice(ids), vertex="1")
+        root.insert(rng.randint(2, len(root)), new)
+    elif edit == "remove" and cells:
+        root.remove(rng.choice(cells))
+    elif edit == "add_edge":
+        new = etree.Element("mxCell", id=f"edge{rng.randrange(10 ** 9)}", value="",
+                            style=rng.choice(list(RELATIONSHIP_STYLES.values())), parent="1", edge="1",
+                            source=rng.choice(ids), target=rng.choice(ids))
+        root.append(new)
+    elif edit == "endpoint" and edges:
+        rng.choice(edges).set(rng.choice(("source", "target")), rng.choice(ids))
+    elif edit == "reorder" and len(cells) > 1:
+        moved = rng.choice(cells)
+        root.remove(moved)
+        root.insert(rng.randint(2, len(root)), moved)
+    elif edit == "restyle" and edges:
+        rng.choice(edges).set("style", rng.choice(list(RELATIONSHIP_STYLES.values())))
+
+
+def dump(style_tree):
+    # the order of the cells and relationships is part of the result
+    return json.dumps(style_tree)
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_update_style_tree_equals_full_parse(seed):
+    rng = random.Random(seed)
+    xml = synthesize_diagram_xml(
+        classes=rng.randint(2, 12), members=rng.randint(0, 3), depth=rng.randint(1, 3),
+        cell_format=rng.choice(CELL_FORMATS), seed=seed
+    )
+    model = etree.fromstring(xml.encode("utf8"))
+    root = model.find("root")
+
+    previous = StyleParser(xml, incremental=True)
+    assert previous.convert_to_style_tree() is not False
+
+    for step in range(EDITS_PER_DIAGRAM):
+        for _ in range(rng.randint(1, 3)):
+            random_edit(rng, root)
+        edited = etree.tostring(model, encoding="unicode")
+
+        updated = StyleParser(edited)
+        expected = StyleParser(edited).convert_to_style_tree()
+        assert dump(updated.update_style_tree(previous)) == dump(expected), f"edit {step}"
+        previous = updated
+
+
+def test_update_style_tree_only_parses_changed_cells():
+    xml = synthesize_diagram_xml(classes=20, members=3, depth=2, seed=1)
+    previous = StyleParser(xml, incremental=True)
+    previous.convert_to_style_tree()
+
+    instrumentation = Instrumentation(trace_memory=False)
+    unchanged = StyleParser(xml, instrumentation=instrumentation)
+    unchanged.update_style_tree(previous)
+    assert instrumentation.records[-1]['counts']['cells_parsed'] == 0
+
+    model = etree.fromstring(xml.encode("utf8"))
+    model.find("root").findall("mxCell")[2].set("value", "Renamed")
+    edited = etree.tostring(model, encoding="unicode")
+    StyleParser(edited, instrumentation=instrumentation).update_style_tree(unchanged)
+    assert instrumentation.records[-1]['counts']['cells_parsed'] == 1
@@ -0,0 +1,48 @@
+import tracemalloc
+from profiling.instrumentation import Instrumentation
+
+SIZE = 8 * 1024 * 1024
+
+
+def allocate():
+    data = bytearray(SIZE)
+    del data
+
+
+def peaks(instrumentation):
+    return {record['name']: record['peak_memory'] for record in instrumentation.records}
+
+
+def test_nested_instrumentation_keeps_the_enclosing_peak():
+    outer = Instrumentation(label="diagram")
+    inner = Instrumentation(label="page")
+
+    with outer.stage("diagram"):
+        with inner.stage("parse"):
+            allocate()
+        with inner.stage("merge"):
+            pass
+
+    assert peaks(inner)['parse'] >= SIZE
+    assert peaks(outer)['diagram'] >= SIZE
+
+
+def test_tracing_stops_with_the_outermost_stage():
+    instrumentation = Instrumentation()
+
+    with instrumentation.stage("outer"):
+        with instrumentation.stage("inner"):
+            pass
+        assert tracemalloc.is_tracing()
+
+    assert not tracemalloc.is_tracing()
+
+
+def test_tracing_started_elsewhere_keeps_running():
+    tracemalloc.start()
+    try:
+        with Instrumentation().stage("stage"):
+            pass
+        assert tracemalloc.is_tracing()
+    finally:
+        tracemalloc.stop()
@@ -0,0 +1,34 @@
+from generators.java_generator import JavaCodeGenerator
+
+
+def generate(syntax_tree, output_dir):
+    generator = JavaCodeGenerator(syntax_tree, str(output_dir))
+    assert generator.generate_code()
+    return generator, {name: contents for name, contents in generator.get_files()}
+
+
+def test_closure_is_deduplicated_depth_first(diamond, tmp_path):
+    generator, _ = generate(diamond, tmp_path)
+
+    assert generator.get_interface_closure(['b', 'c']) == ['b', 'a', 'c']
+    assert generator.get_interface_closure(['a', 'b']) == ['a', 'b']
+    assert generator.get_interface_cycles() == []
+
+
+def test_diamond_gets_one_stub_per_method(diamond, tmp_path):
+    _, files = generate(diamond, tmp_path)
+
+    for name in ("a", "b", "c"):
+        assert files['D'].count(f"public void {name}()") == 1
+
+
+def test_interface_cycle_is_reported_and_rendered(interface_cycle, tmp_path):
+    generator, files = generate(interface_cycle, tmp_path)
+
+    cycles = generator.get_interface_cycles()
+    assert len(cycles) == 1
+    assert cycles[0][0] == cycles[0][-1]
+    assert sorted(cycles[0][1:]) == ['x', 'y', 'z']
+
+    # X and Z both declare x()
+    assert files['W'].count("public void x()") == 1
@@ -0,0 +1,90 @@
+from conftest import make_class
+from pipeline.multipage import merge_syntax_trees
+
+
+def page(page_id, syntax_tree, name=None):
+    return {'id': page_id, 'name': name, 'syntax_tree': syntax_tree}
+
+
+def names(merged):
+    return {merged_id: _class['name'] for merged_id, _class in merged.items()}
+
+
+def test_placeholder_resolves_to_definition_on_another_page():
+    merged, collisions = merge_syntax_trees([
+        page("p1", {'a': make_class("Account", properties=["balance"])}, "Model"),
+        page("p2", {'x': make_class("Account"), 'b': make_class("Savings", extends=["x"])}, "Details"),
+    ])
+
+    assert collisions == []
+    assert names(merged) == {'a': "Account", 'b': "Savings"}
+    assert merged['b']['relationships']['extends'] == ['a']
+    assert [p['name'] for p in merged['a']['properties'].values()] == ["balance"]
+
+
+def test_definition_replaces_an_earlier_placeholder():
+    merged, collisions = merge_syntax_trees([
+        page("p1", {'a': make_class("Shape")}),
+        page("p2", {'s': make_class("Shape", "interface", methods=["area"])}),
+    ])
+
+    assert collisions == []
+    assert list(merged) == ['a']
+    assert merged['a']['type'] == "interface"
+    assert [m['name'] for m in merged['a']['methods'].values()] == ["area"]
+
+
+def test_placeholder_carries_the_type_of_an_interface():
+    merged, _ = merge_syntax_trees([
+        page("p1", {'a': make_class("Shape")}),
+        page("p2", {'s': make_class("Shape", "interface")}),
+    ])
+
+    assert merged['a']['type'] == "interface"
+
+
+def test_different_definitions_are_a_collision_keeping_the_first():
+    merged, collisions = merge_syntax_trees([
+        page("p1", {'a': make_class("Account", properties=["balance"])}, "Model"),
+        page("p2", {'b': make_class("Account", properties=["owner"])}),
+    ])
+
+    assert collisions == [{
+        'name': "Account",
+        'pages': ["Model", "p2"],
+        'reason': "different definitions, keeping the first"
+    }]
+    assert list(merged) == ['a']
+    assert [p['name'] for p in merged['a']['properties'].values()] == ["balance"]
+
+
+def test_same_definition_on_two_pages_is_no_collision_and_keeps_edges_once():
+    account = make_class("Account", properties=["balance"])
+    merged, collisions = merge_syntax_trees([
+        page("p1", {'a': account, 'o': make_class("Owner", association=["a"])}),
+        page("p2", {'a': make_class("Account", properties=["balance"]), 'o': make_class("Owner", association=["a"])}),
+    ])
+
+    assert collisions == []
+    assert names(merged) == {'a': "Account", 'o': "Owner"}
+    assert merged['o']['relationships']['association'] == ['a']
+
+
+def test_clashing_cell_ids_are_prefixed_with_the_page_id():
+    merged, collisions = merge_syntax_trees([
+        page("p1", {'c': make_class("Account", properties=["balance"])}),
+        page("p2", {'c': make_class("Bank", properties=["name"]), 'd': make_class("Branch", composition=["c"])}),
+    ])
+
+    assert collisions == []
+    assert names(merged) == {'c': "Account", 'p2:c': "Bank", 'd': "Branch"}
+    assert merged['d']['relationships']['composition'] == ['p2:c']
+
+
+def test_classes_sharing_a_name_on_one_page_stay_apart():
+    merged, collisions = merge_syntax_trees([
+        page("p1", {'a': make_class("Node", properties=["x"]), 'b': make_class("Node", properties=["y"])}),
+    ])
+
+    assert collisions == []
+    assert names(merged) == {'a': "Node", 'b': "Node"}
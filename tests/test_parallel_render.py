@@ -0,0 +1,58 @@
+import pytest
+from benchmarks.synthetic_diagram import synthesize_diagram_xml
+from generators.java_generator import JavaCodeGenerator
+from parsers.models import Class, Property, Relationships
+from parsers.style_parser import StyleParser
+from parsers.syntax_parser import SyntaxParser
+
+
+@pytest.fixture(scope="module")
+def syntax_tree():
+    style_tree = StyleParser(synthesize_diagram_xml(classes=40, members=3, cell_format="mixed")).convert_to_style_tree()
+    return SyntaxParser(style_tree).convert_to_sytax_tree()
+
+
+def broken_tree(syntax_tree):
+    """
+    The syntax tree with a class failing to render (a private property without
+    a name has no getter) and one failing before rendering (a missing parent)
+    """
+
+    tree = dict(syntax_tree)
+    tree['unnamed'] = Class(name="Unnamed", properties={0: Property("private", "", "int")})
+    tree['orphan'] = Class(name="Orphan", relationships=Relationships(extends=["missing"]))
+    return tree
+
+
+def render(syntax_tree, render_workers, file_path=None):
+    generator = JavaCodeGenerator(syntax_tree, file_path, render_workers=render_workers)
+    return generator, generator.generate_code()
+
+
+def test_parallel_render_equals_serial(syntax_tree):
+    serial, serial_ok = render(syntax_tree, 1)
+    parallel, parallel_ok = render(syntax_tree, 2)
+
+    assert serial_ok and parallel_ok
+    assert parallel.get_files() == serial.get_files()
+    assert parallel.get_classes() == serial.get_classes()
+    assert parallel.get_properties() == serial.get_properties()
+    assert parallel.get_methods() == serial.get_methods()
+    assert parallel.get_render_errors() == []
+
+
+@pytest.mark.parametrize("render_workers", [2, 3])
+def test_failing_classes_are_reported_per_class(syntax_tree, render_workers, tmp_path):
+    generator, ok = render(broken_tree(syntax_tree), render_workers, str(tmp_path))
+
+    assert not ok
+    errors = {error['name']: error['error'] for error in generator.get_render_errors()}
+    assert sorted(errors) == ["Orphan", "Unnamed"]
+    assert "missing" in errors['Orphan']
+
+    # every other class is written and nothing of the failed ones is collected
+    serial, _ = render(syntax_tree, 1)
+    assert generator.get_files() == serial.get_files()
+    assert generator.get_classes() == serial.get_classes()
+    assert generator.get_properties() == serial.get_properties()
+    assert sorted(p.name for p in tmp_path.iterdir()) == sorted(f"{name}.java" for name, _ in serial.get_files())
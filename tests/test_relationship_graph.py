@@ -0,0 +1,36 @@
+from generators.java_generator import JavaCodeGenerator
+from parsers.relationship_graph import RelationshipGraph
+
+
+def test_closure_is_deduplicated_depth_first(diamond):
+    graph = RelationshipGraph(diamond)
+
+    assert graph.closure('d', 'implements') == ('d', 'b', 'a', 'c')
+    assert graph.closure('b', 'implements') == ('b', 'a')
+    assert graph.closure('a', 'implements') == ('a',)
+    assert graph.implementors('a') == ('b', 'c')
+    assert graph.topological_order() == ['a', 'b', 'c', 'd']
+
+
+def test_closure_reuses_known_closures(diamond):
+    graph = RelationshipGraph(diamond)
+
+    graph.closure('b', 'implements')
+    assert graph.closure('d', 'implements') == ('d', 'b', 'a', 'c')
+
+
+def test_cycles(diamond, interface_cycle):
+    graph = RelationshipGraph(interface_cycle)
+
+    assert graph.cycles('implements') == [['x', 'y', 'z', 'x']]
+    assert RelationshipGraph(diamond).cycles('implements') == []
+    assert graph.closure('w', 'implements') == ('w', 'x', 'y', 'z')
+    # classes on or behind the cycle are appended in syntax tree order
+    assert graph.topological_order() == ['x', 'y', 'z', 'w']
+
+
+def test_generator_reports_the_cycles_of_the_graph(interface_cycle):
+    generator = JavaCodeGenerator(interface_cycle, None)
+    assert generator.generate_code()
+
+    assert generator.get_interface_cycles() == [['x', 'y', 'z', 'x']]
@@ -0,0 +1,32 @@
+import os
+import shutil
+import pytest
+import pipeline.runner as runner
+
+EXAMPLE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "examples", "simple_class_diagram.drawio")
+
+
+@pytest.fixture
+def diagrams(tmp_path):
+    directory = tmp_path / "diagrams"
+    directory.mkdir()
+    for name in ("first", "second"):
+        shutil.copy(EXAMPLE, directory / f"{name}.drawio")
+    return str(directory)
+
+
+def test_render_workers_are_kept_without_a_diagram_pool(diagrams, tmp_path, monkeypatch, capsys):
+    options = list()
+    monkeypatch.setattr(runner, "_run_diagram_job", lambda job: options.append(dict(job[1])))
+
+    list(runner.run_batch([diagrams], str(tmp_path / "out"), workers=1, render_workers=2))
+
+    assert [o['render_workers'] for o in options] == [2, 2]
+    assert "WARNING" not in capsys.readouterr().out
+
+
+def test_render_workers_are_ignored_on_the_diagram_pool(diagrams, tmp_path, capsys):
+    results = list(runner.run_batch([diagrams], str(tmp_path / "out"), workers=2, render_workers=2, cache=None))
+
+    assert [result['ok'] for result in results] == [True, True]
+    assert "run_batch WARNING: ignoring render_workers=2" in capsys.readouterr().out
@@ -0,0 +1,29 @@
+import json
+import os
+import shutil
+import main
+from pipeline.watch import DiagramWatcher
+from profiling.instrumentation import Instrumentation
+
+EXAMPLE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "examples", "simple_class_diagram.drawio")
+
+
+def test_watch_writes_and_clears_the_profile_of_every_rebuild(tmp_path, monkeypatch):
+    for name in ("first", "second"):
+        shutil.copy(EXAMPLE, tmp_path / f"{name}.drawio")
+
+    run = DiagramWatcher.run
+    monkeypatch.setattr(DiagramWatcher, "run", lambda self, on_result: run(self, on_result, max_polls=1))
+    profile_path = tmp_path / "profile.json"
+    args = main.parse_args([
+        str(tmp_path / "first.drawio"), str(tmp_path / "second.drawio"), "-o", str(tmp_path / "out"),
+        "--watch", "--no-cache", "--profile", str(profile_path)
+    ])
+
+    profile = Instrumentation()
+    main.watch(args, None, profile)
+
+    assert profile.records == []
+    with open(profile_path) as f:
+        labels = {record['label'] for record in json.load(f)['records']}
+    assert labels == {str(tmp_path / "second.drawio")}
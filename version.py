@@ -0,0 +1,10 @@
+__version__ = "1.0.0"
+
+# Version of what the pipeline produces from a diagram, its parsed trees and
+# generated files. Bump it in every change that alters either for an existing
+# diagram: the decode/parse cache and the --incremental manifests are keyed by it
+# and would otherwise keep serving the output of the previous version.
+OUTPUT_VERSION = 4
+
+# stamp of the output of this build, stored with cache keys and manifests
+OUTPUT_STAMP = f"{__version__}+output.{OUTPUT_VERSION}"